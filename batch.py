@@ -0,0 +1,89 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from koalitionen import minimale_koalitionen
+from sitzverteilung import berechne_verteilung_details
+from wahlkreisdaten import PARTEIEN
+
+# Auswertung vieler Umfrageszenarien in einer Anfrage. Die Szenarien werden in
+# Blöcken verarbeitet, damit auch große NDJSON-Eingaben nie vollständig im
+# Speicher liegen. Innerhalb eines Blocks werden gleiche Direktmandate-Anfragen
+# zusammengefasst und parallel (begrenzt) ausgeführt.
+
+BLOCKGROESSE = 64
+
+
+def lies_szenario(roh, standard_engine):
+    # Szenario: {"id": ..., "eingabe": {"CDU": 31, ...}, "engine": "local"}
+    if isinstance(roh, (str, bytes)):
+        roh = json.loads(roh)
+    if not isinstance(roh, dict) or not isinstance(roh.get("eingabe"), dict):
+        raise ValueError("Szenario benötigt ein Objekt 'eingabe'.")
+    eingabe = {}
+    for p, wert in roh["eingabe"].items():
+        if p not in PARTEIEN:
+            raise ValueError(f"Unbekannte Partei: {p}")
+        if isinstance(wert, bool) or not isinstance(wert, (int, float)):
+            raise ValueError(f"Ungültiger Wert für {p}: {wert!r}")
+        eingabe[p] = wert
+    return roh.get("id"), eingabe, roh.get("engine", standard_engine)
+
+
+def werte_aus(szenarien, ermittle_direktmandate, pruefe_eingabe, standard_engine, max_parallel=4):
+    # Liefert die Ergebnisse in der Reihenfolge der Szenarien
+    szenarien = enumerate(szenarien)
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while True:
+            block = list(islice(szenarien, BLOCKGROESSE))
+            if not block:
+                break
+            yield from _werte_block_aus(block, pool, ermittle_direktmandate, pruefe_eingabe, standard_engine)
+
+
+def _werte_block_aus(block, pool, ermittle_direktmandate, pruefe_eingabe, standard_engine):
+    gelesen = []
+    anfragen = {}
+    for index, roh in block:
+        try:
+            szenario_id, eingabe, engine = lies_szenario(roh, standard_engine)
+        except (ValueError, TypeError) as e:
+            gelesen.append((index, None, None, None, f"Fehler: {e}"))
+            continue
+        fehler = pruefe_eingabe(eingabe, engine)
+        schluessel = (engine, tuple(eingabe.get(p, 0) for p in PARTEIEN))
+        if not fehler and schluessel not in anfragen:
+            anfragen[schluessel] = pool.submit(ermittle_direktmandate, eingabe, engine)
+        gelesen.append((index, szenario_id, eingabe, schluessel, fehler))
+
+    ergebnisse = []
+    for index, szenario_id, eingabe, schluessel, fehler in gelesen:
+        ergebnis = {"index": index, "id": szenario_id}
+        ergebnisse.append(ergebnis)
+        if fehler:
+            ergebnis["fehler"] = fehler
+            continue
+        try:
+            direktmandate, quelle = anfragen[schluessel].result()
+            details = berechne_verteilung_details(eingabe, direktmandate)
+        except Exception as e:
+            ergebnis["fehler"] = f"Fehler bei API-Anfrage: {e}"
+            continue
+        sitze = details["sitze"]
+        ergebnis.update({
+            "sitze": {p: sitze.get(p, 0) for p in PARTEIEN},
+            "gesamtzahl": sitze["Gesamtzahl der Sitze"],
+            "ueberhangmandate": details["ueberhangmandate"],
+            "ausgleichsmandate": details["ausgleichsmandate"],
+            "direktmandate": direktmandate,
+        })
+        if quelle:
+            ergebnis["hinweis"] = quelle.strip()
+
+    # Koalitionen für alle erfolgreichen Szenarien des Blocks in einem Schritt
+    erfolgreich = [e for e in ergebnisse if "sitze" in e]
+    if erfolgreich:
+        matrix = [[e["sitze"][p] for p in PARTEIEN] for e in erfolgreich]
+        for ergebnis, koalitionen in zip(erfolgreich, minimale_koalitionen(matrix)):
+            ergebnis["koalitionen"] = [k["koalition"] for k in koalitionen]
+    yield from ergebnisse
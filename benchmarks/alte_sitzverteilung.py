@@ -0,0 +1,111 @@
+import math
+
+# Eingefrorene Kopien der Sitzberechnungen vor dem Umbau, nur als
+# Vergleichspunkt für benchmarks/bench_sitzverteilung.py. Nicht ändern: die
+# Messung soll zeigen, was der alte Code gekostet hat.
+#
+# sainte_lague_alt: berechne_verteilung aus prognose_tool_ltw26.py (Baseline),
+# alle Quotienten sortiert, Größe des Landtags Sitz für Sitz gesucht.
+# hare_niemeyer_alt: berechne_verteilung aus prognose_tool_ltw26_alt.py
+# (entfernt), Hochrechnung mit round().
+
+
+def sainte_lague_alt(eingabe, direktmandate):
+    # Nur Parteien ≥ 5 % (außer Sonstige)
+    parteien_mit_sitzen = [
+        p for p in eingabe if eingabe[p] >= 5 and p != "Sonstige"]
+
+    # Prozentuale Anteile der berücksichtigten Parteien (normiert)
+    gesamt_prozent = sum(eingabe[p] for p in parteien_mit_sitzen)
+    anteile = {p: eingabe[p] / gesamt_prozent for p in parteien_mit_sitzen}
+
+    grundsitze = 120
+
+    def saint_lague_verteilung(stimmen, sitzzahl):
+        teilerserie = [2 * i + 1 for i in range(sitzzahl * len(stimmen))]
+        quoten = []
+
+        for partei, stimmanteil in stimmen.items():
+            absolute_stimmen = stimmanteil * 1_000_000
+            for teiler in teilerserie[:sitzzahl]:
+                quoten.append((partei, absolute_stimmen / teiler))
+
+        quoten.sort(key=lambda x: x[1], reverse=True)
+
+        sitze = {p: 0 for p in stimmen}
+        for i in range(sitzzahl):
+            partei = quoten[i][0]
+            sitze[partei] += 1
+
+        return sitze
+
+    # Erste Verteilung mit 120 Sitzen
+    sitze_vor_rest = saint_lague_verteilung(anteile, grundsitze)
+
+    # Überhangmandate berechnen
+    ueberhang = {
+        p: max(0, direktmandate.get(p, 0) - sitze_vor_rest.get(p, 0))
+        for p in parteien_mit_sitzen
+    }
+    ges_ueberhang = sum(ueberhang.values())
+
+    # Neue Mindestgröße für den Landtag
+    min_sitze = max(grundsitze, sum(sitze_vor_rest.values()) + ges_ueberhang)
+
+    # Wiederverteilung mit Anpassung bis Direktmandate abgedeckt sind
+    while True:
+        sitze = saint_lague_verteilung(anteile, min_sitze)
+        if all(sitze[p] >= direktmandate.get(p, 0) for p in parteien_mit_sitzen):
+            break
+        min_sitze += 1
+
+    # Restliche Parteien (auch < 5 %) auf 0 setzen
+    for p in eingabe:
+        if p != "Sonstige" and p not in sitze:
+            sitze[p] = 0
+
+    sitze["Sonstige"] = 0
+    sitze["Gesamtzahl der Sitze"] = sum(sitze.values())
+
+    return sitze
+
+
+def hare_niemeyer_alt(eingabe, direktmandate):
+    # Parteien, die über 5% liegen (ohne BSW, Sonstige)
+    parteien = [p for p in eingabe if eingabe[p]
+                >= 5 and p not in ["BSW", "Sonstige"]]
+    gesamt_prozent = sum(eingabe[p] for p in parteien)
+    anteile = {p: eingabe[p] / gesamt_prozent for p in parteien}
+
+    # Schritt 1: Verteilung der 120 Grundsitze (ohne Direktmandate)
+    grundsitze = 120
+    sitze_vor_rest = {p: math.floor(anteile[p] * grundsitze) for p in parteien}
+    rest = grundsitze - sum(sitze_vor_rest.values())
+    reste = {p: (anteile[p] * grundsitze) - sitze_vor_rest[p]
+             for p in parteien}
+    for p in sorted(reste, key=reste.get, reverse=True)[:rest]:
+        sitze_vor_rest[p] += 1
+
+    # Schritt 2: Berechne Überhangmandate je Partei
+    ueberhang = {
+        p: max(0, direktmandate.get(p, 0) - sitze_vor_rest.get(p, 0))
+        for p in parteien
+    }
+    ges_ueberhang = sum(ueberhang.values())
+
+    # Schritt 3: Berechne erforderliche neue Sitzanzahl (mind. 120)
+    min_sitze = grundsitze + ges_ueberhang
+
+    # Schritt 4: Verteile Sitze proportional auf neue Sitzanzahl
+    sitze = {p: round(anteile[p] * min_sitze) for p in parteien}
+
+    # Schritt 5: Korrigiere Ausgleichsmandate, falls nötig
+    # Stelle sicher, dass keine Partei weniger Sitze als Direktmandate erhält
+    while any(sitze[p] < direktmandate.get(p, 0) for p in parteien):
+        min_sitze += 1
+        sitze = {p: round(anteile[p] * min_sitze) for p in parteien}
+
+    # Schritt 6: Abschließende Werte einfügen
+    sitze.update({"BSW": 0, "Sonstige": 0})
+    sitze["Gesamtzahl der Sitze"] = sum(sitze.values())
+    return sitze
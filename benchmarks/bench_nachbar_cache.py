@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Mikro-Benchmark des Ähnlichkeits-Caches (nachbar_cache.NachbarCache): der
+# Cache wird mit zufälligen Umfragen um ein typisches Ergebnis gefüllt, dann
+# werden Latenzen von suche() für Treffer und Fehlzugriffe gemessen und die
+# gefundenen Nachbarn stichprobenartig gegen eine vollständige Suche geprüft.
+# Vergleich mit der abgelegten Baseline wie in bench_sitzverteilung.py.
+# Aufruf: python benchmarks/bench_nachbar_cache.py [--eintraege 50000]
+#         [--toleranz 0.5] [--speichere-baseline]
+
+VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(VERZEICHNIS, ".."))
+
+from nachbar_cache import NachbarCache  # noqa: E402
+from wahlkreisdaten import PARTEIEN  # noqa: E402
+
+BASELINE = os.path.join(VERZEICHNIS, "baseline_nachbar_cache.json")
+
+BASIS = np.array([29, 20, 19, 10, 7, 5, 4, 6], dtype=float)
+DIREKTMANDATE = {"CDU": 55, "B90/Grüne": 12, "AfD": 3}
+
+
+def umfragen(rng, anzahl, streuung):
+    return np.maximum(0, np.round(BASIS + rng.normal(0, streuung, (anzahl, len(PARTEIEN))), 1))
+
+
+def quantile(zeiten):
+    zeiten = np.sort(zeiten) * 1e6
+    return {"p50_us": round(float(np.percentile(zeiten, 50)), 1),
+            "p99_us": round(float(np.percentile(zeiten, 99)), 1),
+            "max_us": round(float(zeiten[-1]), 1)}
+
+
+def miss(eintraege, anfragen, streuung):
+    rng = np.random.default_rng(2026)
+    cache = NachbarCache(toleranz=1.0, max_eintraege=eintraege)
+    start = time.perf_counter()
+    for zeile in umfragen(rng, eintraege, streuung):
+        cache.speichere(dict(zip(PARTEIEN, zeile)), DIREKTMANDATE)
+    speichern = (time.perf_counter() - start) / eintraege
+
+    vektoren = cache._vektoren
+    zeiten = {"treffer": [], "fehlzugriff": []}
+    abweichungen = 0
+    for i, zeile in enumerate(umfragen(rng, anfragen, streuung)):
+        eingabe = dict(zip(PARTEIEN, zeile))
+        start = time.perf_counter()
+        ergebnis = cache.suche(eingabe)
+        zeiten["fehlzugriff" if ergebnis is None else "treffer"].append(time.perf_counter() - start)
+        if i < 500:
+            erwartet = bool((np.abs(vektoren - zeile).max(axis=1) <= cache.toleranz + 1e-9).any())
+            abweichungen += erwartet != (ergebnis is not None)
+    return {
+        "eintraege": eintraege,
+        "anfragen": anfragen,
+        "streuung": streuung,
+        "speichern_us": round(speichern * 1e6, 1),
+        "trefferquote": round(len(zeiten["treffer"]) / anfragen, 3),
+        "suche": {art: quantile(werte) for art, werte in zeiten.items() if werte},
+        "abweichungen_zur_vollen_suche": abweichungen,
+    }
+
+
+def vergleiche(aktuell, baseline, toleranz):
+    regressionen = []
+    if aktuell["abweichungen_zur_vollen_suche"]:
+        regressionen.append(f"{aktuell['abweichungen_zur_vollen_suche']} Abweichungen zur vollständigen Suche")
+    for art, werte in aktuell["suche"].items():
+        alt = baseline.get("suche", {}).get(art, {}).get("p99_us")
+        if alt is not None and werte["p99_us"] > alt * (1 + toleranz):
+            regressionen.append(f"suche/{art} p99: {werte['p99_us']} µs statt {alt} µs")
+    return regressionen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des Ähnlichkeits-Caches")
+    parser.add_argument("--eintraege", type=int, default=50000)
+    parser.add_argument("--anfragen", type=int, default=5000)
+    parser.add_argument("--streuung", type=float, default=3.0, help="Standardabweichung der Umfragen in Prozentpunkten")
+    parser.add_argument("--ausgabe", default="bench_nachbar_cache.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--toleranz", type=float, default=0.5,
+                        help="erlaubte relative Verlangsamung gegenüber der Baseline")
+    parser.add_argument("--speichere-baseline", action="store_true")
+    args = parser.parse_args()
+
+    ergebnis = miss(args.eintraege, args.anfragen, args.streuung)
+    print(f"{ergebnis['eintraege']} Einträge, speichern {ergebnis['speichern_us']} µs, "
+          f"Trefferquote {ergebnis['trefferquote']:.1%}")
+    for art, werte in ergebnis["suche"].items():
+        print(f"  suche/{art:<12} p50 {werte['p50_us']:>7.1f} µs  p99 {werte['p99_us']:>7.1f} µs")
+    ziel = args.baseline if args.speichere_baseline else args.ausgabe
+    with open(ziel, "w", encoding="utf-8") as datei:
+        json.dump(ergebnis, datei, ensure_ascii=False, indent=2)
+    print(f"Ergebnisse gespeichert: {ziel}")
+    if args.speichere_baseline or not os.path.exists(args.baseline):
+        return 1 if ergebnis["abweichungen_zur_vollen_suche"] else 0
+
+    with open(args.baseline, encoding="utf-8") as datei:
+        regressionen = vergleiche(ergebnis, json.load(datei), args.toleranz)
+    for meldung in regressionen:
+        print(f"REGRESSION {meldung}")
+    if not regressionen:
+        print("Keine Regression gegenüber der Baseline.")
+    return 1 if regressionen else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
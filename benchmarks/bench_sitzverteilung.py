@@ -0,0 +1,261 @@
+import argparse
+import heapq
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+# Mikro-Benchmark der Sitzberechnung für alle registrierten Verfahren
+# (sitzverteilung.VERFAHREN) und für den Vergleich aller Verfahren in einem
+# Durchgang, dazu als Vergleichspunkt die eingefrorenen alten Rechner
+# (benchmarks/alte_sitzverteilung.py: Sainte-Laguë mit sortierten Quotienten
+# und Hare-Niemeyer mit round()-Hochrechnung aus dem entfernten
+# prognose_tool_ltw26_alt.py). Gemessen werden Latenz je Aufruf, Speicherspitze und Allokationen
+# sowie die Schritte der Suche nach der Größe des Landtags. Die Ergebnisse
+# werden als JSON gespeichert und mit der abgelegten Baseline verglichen.
+#
+# Absolute Zeiten schwanken zwischen Rechnern und Läufen, verglichen werden
+# daher Latenzen relativ zu einer festen Referenzschleife (Median mehrerer
+# Läufe). Die Toleranz wächst mit der gemessenen Streuung. Sitze, Höchstzahlen,
+# Größenschritte und Allokationen sind deterministisch und müssen exakt gleich
+# bleiben.
+# Aufruf: python benchmarks/bench_sitzverteilung.py [--ausgabe datei.json]
+#         [--toleranz 0.25] [--laeufe 9] [--speichere-baseline]
+
+VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(VERZEICHNIS, ".."))
+sys.path.insert(0, VERZEICHNIS)
+
+import alte_sitzverteilung as alt  # noqa: E402
+from sitzverteilung import VERFAHREN, _verteile, berechne_verteilung, vergleiche_verfahren  # noqa: E402
+
+BASELINE = os.path.join(VERZEICHNIS, "baseline_sitzverteilung.json")
+
+# Felder, die sich ohne Änderung am Verfahren nicht ändern dürfen
+DETERMINISTISCH = ("sitze", "hoechstzahlen", "groessenschritte", "bloecke")
+
+# Alte Rechner und das neue Verfahren, mit dem sie verglichen werden
+ALTE_RECHNER = {
+    "alt_sainte_lague": (alt.sainte_lague_alt, "sainte-lague"),
+    "alt_hare_niemeyer": (alt.hare_niemeyer_alt, "hare-niemeyer"),
+}
+
+SZENARIEN = {
+    "typisch": (
+        {"CDU": 29, "B90/Grüne": 20, "AfD": 20, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 5},
+        {"CDU": 55, "B90/Grüne": 12, "AfD": 3},
+    ),
+    "hoher_ueberhang": (
+        {"CDU": 29, "B90/Grüne": 20, "AfD": 20, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 5},
+        {"CDU": 70},
+    ),
+    "viele_kleine": (
+        {"CDU": 22, "B90/Grüne": 14, "AfD": 14, "SPD": 12, "Linke": 10, "FDP": 9, "BSW": 9, "Sonstige": 10},
+        {"CDU": 40, "B90/Grüne": 20, "AfD": 6, "SPD": 4},
+    ),
+    "ltw2021": (
+        {"CDU": 24.1, "B90/Grüne": 32.6, "AfD": 9.7, "SPD": 11, "Linke": 3.6, "FDP": 10.5, "BSW": 0, "Sonstige": 8.5},
+        {"CDU": 12, "B90/Grüne": 58},
+    ),
+}
+
+
+def schritte(eingabe, direktmandate, verfahren):
+    # Höchstzahlverfahren bestimmen die Größe direkt aus den Rängen (0 Schritte),
+    # Hare-Niemeyer sucht sie schrittweise
+    verteilung = _verteile(eingabe, direktmandate, verfahren)
+    strom = verteilung["strom"]
+    werte = {
+        "groessenschritte": strom.groessenschritte,
+        "ausgleichsmandate": verteilung["sitze"]["Gesamtzahl der Sitze"] - verteilung["mindestgroesse"],
+    }
+    if hasattr(strom, "reihenfolge"):
+        werte["hoechstzahlen"] = len(strom.reihenfolge)
+    return werte
+
+
+def schritte_alt(funktion, eingabe, direktmandate):
+    # Zählt die Ausführungen von "min_sitze += 1" im alten Code
+    zeilen, start = inspect.getsourcelines(funktion)
+    ziel = start + next(i for i, z in enumerate(zeilen) if "min_sitze += 1" in z)
+    zaehler = 0
+
+    def lokal(frame, ereignis, arg):
+        nonlocal zaehler
+        if ereignis == "line" and frame.f_lineno == ziel:
+            zaehler += 1
+        return lokal
+
+    def aufruf(frame, ereignis, arg):
+        return lokal if frame.f_code is funktion.__code__ else None
+
+    sys.settrace(aufruf)
+    try:
+        funktion(eingabe, direktmandate)
+    finally:
+        sys.settrace(None)
+    return {"groessenschritte": zaehler}
+
+
+def allokationen(funktion):
+    # Ein Aufruf vorab, damit einmalige Allokationen (Caches, interne Strings)
+    # nicht davon abhängen, was zuvor gemessen wurde
+    funktion()
+    tracemalloc.start()
+    try:
+        vorher = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        funktion()
+        _, spitze = tracemalloc.get_traced_memory()
+        nachher = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    bloecke = sum(max(d.count_diff, 0) for d in nachher.compare_to(vorher, "filename"))
+    return {"spitze_kib": round(spitze / 1024, 1), "bloecke": bloecke}
+
+
+def referenz():
+    # Feste Arbeit ähnlicher Art (Heap mit Quotienten, Dict), unabhängig vom
+    # Code unter Test; misst nur die Geschwindigkeit des Rechners
+    heap = [(-v / 1, i, 0) for i, v in enumerate((29e4, 20e4, 20e4, 10e4, 7e4, 5e4))]
+    heapq.heapify(heap)
+    zaehler = {}
+    for _ in range(150):
+        q, i, k = heapq.heappop(heap)
+        zaehler[i] = zaehler.get(i, 0) + 1
+        heapq.heappush(heap, (q * (2 * k + 1) / (2 * k + 3), i, k + 1))
+    return zaehler
+
+
+def laufzeiten(funktion, wiederholungen, laeufe):
+    return [t / wiederholungen * 1e6 for t in timeit.repeat(funktion, number=wiederholungen, repeat=laeufe)]
+
+
+def zusammenfassung(zeiten, bezug):
+    # Median in µs, relativ zur Referenz, und die Streuung (Quartilsabstand / Median)
+    median = statistics.median(zeiten)
+    q1, _, q3 = statistics.quantiles(zeiten, n=4)
+    return {"mikrosekunden": round(median, 2), "relativ": round(median / bezug, 4),
+            "streuung": round((q3 - q1) / median, 4)}
+
+
+def miss(wiederholungen, laeufe):
+    # Referenz vor und nach den Messungen, damit eine Drift beide Seiten trifft
+    referenzzeiten = laufzeiten(referenz, wiederholungen, laeufe)
+    zeiten = {}
+    ergebnisse = {}
+    for name, (eingabe, direktmandate) in SZENARIEN.items():
+        ergebnisse[name] = {}
+        for verfahren in VERFAHREN:
+            aufruf = lambda: berechne_verteilung(eingabe, direktmandate, verfahren)  # noqa: E731
+            zeiten[name, verfahren] = laufzeiten(aufruf, wiederholungen, laeufe)
+            ergebnisse[name][verfahren] = {
+                **allokationen(aufruf),
+                **schritte(eingabe, direktmandate, verfahren),
+                "sitze": aufruf(),
+            }
+        # Alle Verfahren in einem Durchgang (gemeinsame Hürde und Normierung)
+        alle = lambda: vergleiche_verfahren(eingabe, direktmandate)  # noqa: E731
+        zeiten[name, "vergleich"] = laufzeiten(alle, wiederholungen, laeufe)
+        ergebnisse[name]["vergleich"] = {
+            **allokationen(alle),
+            "groessenschritte": sum(werte["groessenschritte"] for werte in ergebnisse[name].values()),
+            "sitze": {v: d["sitze"]["Gesamtzahl der Sitze"] for v, d in alle().items()},
+        }
+        for kennung, (funktion, _) in ALTE_RECHNER.items():
+            aufruf = lambda: funktion(eingabe, direktmandate)  # noqa: E731
+            # Der alte Sainte-Laguë-Rechner braucht Millisekunden je Aufruf,
+            # daher nur ein Hundertstel der Wiederholungen
+            zeiten[name, kennung] = laufzeiten(aufruf, max(1, wiederholungen // 100), laeufe)
+            ergebnisse[name][kennung] = {
+                **allokationen(aufruf),
+                **schritte_alt(funktion, eingabe, direktmandate),
+                "sitze": aufruf(),
+            }
+    referenzzeiten += laufzeiten(referenz, wiederholungen, laeufe)
+    bezug = statistics.median(referenzzeiten)
+    for (name, kennung), werte in zeiten.items():
+        ergebnisse[name][kennung].update(zusammenfassung(werte, bezug))
+    return {
+        "umgebung": {"python": platform.python_version(), "plattform": platform.platform()},
+        "wiederholungen": wiederholungen,
+        "laeufe": laeufe,
+        "referenz": zusammenfassung(referenzzeiten, bezug),
+        "szenarien": ergebnisse,
+    }
+
+
+def vergleiche(aktuell, baseline, toleranz):
+    # Geänderte deterministische Felder sind immer eine Regression, die
+    # relative Latenz nur oberhalb der Toleranz. Zur Toleranz kommt die doppelte
+    # Streuung (der größere Wert aus Messung und Baseline).
+    regressionen = []
+    for name, verfahren in aktuell["szenarien"].items():
+        for kennung, werte in verfahren.items():
+            alt_werte = baseline["szenarien"].get(name, {}).get(kennung)
+            if alt_werte is None:
+                continue
+            for feld in DETERMINISTISCH:
+                if feld in alt_werte and werte.get(feld) != alt_werte[feld]:
+                    regressionen.append(f"{name}/{kennung}: {feld} geändert {alt_werte[feld]} -> {werte.get(feld)}")
+            if "relativ" not in alt_werte:
+                continue
+            streuung = max(werte["streuung"], alt_werte["streuung"])
+            grenze = alt_werte["relativ"] * (1 + toleranz + 2 * streuung)
+            if werte["relativ"] > grenze:
+                regressionen.append(f"{name}/{kennung}: {werte['relativ']:.3f}x Referenz statt "
+                                    f"{alt_werte['relativ']:.3f}x (Grenze {grenze:.3f}x)")
+    return regressionen
+
+
+def drucke(ergebnis):
+    referenz = ergebnis["referenz"]
+    print(f"Referenzschleife: {referenz['mikrosekunden']:.2f} µs (Streuung {referenz['streuung']:.1%})")
+    print(f"{'Szenario':<17} {'Verfahren':<15} {'µs/Aufruf':>10} {'x Ref.':>7} {'Streuung':>9} {'KiB':>7} "
+          f"{'Blöcke':>7} {'Schritte':>9} {'Sitze':>6}")
+    for name, verfahren in ergebnis["szenarien"].items():
+        for kennung, werte in verfahren.items():
+            sitze = werte["sitze"].get("Gesamtzahl der Sitze", "-")
+            print(f"{name:<17} {kennung:<15} {werte['mikrosekunden']:>10.2f} {werte['relativ']:>7.3f} "
+                  f"{werte['streuung']:>9.1%} {werte['spitze_kib']:>7.1f} "
+                  f"{werte['bloecke']:>7} {werte['groessenschritte']:>9} {sitze:>6}")
+        for kennung, (_, verfahren_neu) in ALTE_RECHNER.items():
+            faktor = verfahren[kennung]["mikrosekunden"] / verfahren[verfahren_neu]["mikrosekunden"]
+            print(f"{name:<17} {verfahren_neu} neu gegenüber {kennung}: {faktor:.1f}x schneller")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Sitzberechnung")
+    parser.add_argument("--wiederholungen", type=int, default=2000)
+    parser.add_argument("--ausgabe", default="bench_sitzverteilung.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--laeufe", type=int, default=9, help="Messläufe je Aufruf, verglichen wird der Median")
+    parser.add_argument("--toleranz", type=float, default=0.25,
+                        help="erlaubte relative Verlangsamung gegenüber der Baseline (zuzüglich Streuung)")
+    parser.add_argument("--speichere-baseline", action="store_true")
+    args = parser.parse_args()
+
+    ergebnis = miss(args.wiederholungen, args.laeufe)
+    drucke(ergebnis)
+    ziel = args.baseline if args.speichere_baseline else args.ausgabe
+    with open(ziel, "w", encoding="utf-8") as datei:
+        json.dump(ergebnis, datei, ensure_ascii=False, indent=2)
+    print(f"Ergebnisse gespeichert: {ziel}")
+    if args.speichere_baseline or not os.path.exists(args.baseline):
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as datei:
+        regressionen = vergleiche(ergebnis, json.load(datei), args.toleranz)
+    for meldung in regressionen:
+        print(f"REGRESSION {meldung}")
+    if not regressionen:
+        print("Keine Regression gegenüber der Baseline.")
+    return 1 if regressionen else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
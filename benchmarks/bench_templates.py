@@ -0,0 +1,48 @@
+import os
+import sys
+import timeit
+
+from flask import render_template_string
+
+# Renderzeit pro Anfrage: Jinja-Quelltext bei jeder Anfrage kompilieren (wie
+# früher mit render_template_string) gegenüber den beim Start kompilierten
+# Templates. Aufruf: python benchmarks/bench_templates.py [Wiederholungen]
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("LLM_CACHE_PFAD", "")
+
+import prognose_tool_ltw26 as app_modul  # noqa: E402
+from prognose_tool_ltw26 import app, html_template, rendere, seite_kompiliert  # noqa: E402
+
+EINGABE = {"CDU": 31, "B90/Grüne": 20, "AfD": 20, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 3, "Sonstige": 4}
+
+
+def miss(name, funktion, wiederholungen):
+    sekunden = min(timeit.repeat(funktion, number=wiederholungen, repeat=5)) / wiederholungen
+    print(f"{name:<45} {sekunden * 1e6:10.1f} µs")
+
+
+def main():
+    wiederholungen = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ergebnis = app_modul.verteilung_mit_schwellen(EINGABE, app_modul.schaetze_direktmandate(EINGABE))
+    ergebnis["Hinweis"] = "Diese Verteilung ist eine Schätzung."
+
+    with app.test_request_context("/"):
+        miss("Startseite, render_template_string", lambda: render_template_string(
+            html_template, engine="llm"), wiederholungen)
+        miss("Startseite, vorkompiliert", lambda: rendere(
+            seite_kompiliert, engine="llm"), wiederholungen)
+        miss("Ergebnisseite, render_template_string", lambda: render_template_string(
+            html_template, result=ergebnis, eingabe=EINGABE, engine="llm"), wiederholungen)
+        miss("Ergebnisseite, vorkompiliert", lambda: rendere(
+            seite_kompiliert, result=ergebnis, eingabe=EINGABE, engine="llm"), wiederholungen)
+
+    client = app.test_client()
+    etag = client.get("/").headers["ETag"]
+    miss("GET / (ganze Anfrage)", lambda: client.get("/"), wiederholungen)
+    miss("GET / mit If-None-Match (304)", lambda: client.get(
+        "/", headers={"If-None-Match": etag}), wiederholungen)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+from lasttest import freier_port
+from openai_stub import OpenAIStub
+
+# Kaltstart der App: Importzeit je Modul (python -X importtime), Zeit vom
+# Prozessstart bis zur ersten beantworteten Anfrage und bis zur ersten
+# gpt-4o-Prognose (gegen den lokalen Stub, mit der ausgelieferten Umgebung,
+# also inkl. Vorladen im gunicorn-Hauptprozess und Vorwärmen nach der ersten
+# Antwort). Vergleich mit der abgelegten Baseline wie in
+# bench_sitzverteilung.py; schwere Pakete, die beim Start nicht geladen werden
+# dürfen, gelten immer als Regression.
+# Aufruf: python benchmarks/kaltstart.py [--wiederholungen 5] [--toleranz 0.5]
+#         [--speichere-baseline]
+
+VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+PROJEKT = os.path.join(VERZEICHNIS, "..")
+BASELINE = os.path.join(VERZEICHNIS, "baseline_kaltstart.json")
+
+# Werden erst beim ersten LLM-Aufruf bzw. beim Vorwärmen gebraucht
+NICHT_BEIM_START = ("openai", "httpx", "pydantic")
+
+# Wie in lasttest.py, ohne Threads; "procfile" ist der Befehl aus dem Procfile
+BEFEHLE = {
+    "werkzeug": [sys.executable, "-c", "import sys, prognose_tool_ltw26 as m; "
+                 "m.app.run(host='127.0.0.1', port=int(sys.argv[1]))", "{port}"],
+    "procfile": [sys.executable, "prognose_tool_ltw26.py"],
+}
+
+UMFRAGE = {"CDU": 29, "B90/Grüne": 20, "AfD": 19, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 6}
+
+
+def umgebung(**zusatz):
+    return dict(os.environ, OPENAI_API_KEY="stub", LLM_CACHE_PFAD="", UMFRAGEN_PFAD="", LLM_BUDGET_PFAD="",
+                PROGNOSE_STREAMING="0", **zusatz)
+
+
+def importzeiten():
+    # Kumulierte Importzeit der direkt importierten Module in Millisekunden
+    ergebnis = subprocess.run([sys.executable, "-X", "importtime", "-c", "import prognose_tool_ltw26"],
+                              cwd=PROJEKT, env=umgebung(), capture_output=True, text=True, check=True)
+    module = {}
+    geladen = set()
+    for zeile in ergebnis.stderr.splitlines():
+        treffer = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)", zeile)
+        if not treffer:
+            continue
+        kumuliert, einrueckung, name = treffer.groups()
+        geladen.add(name.split(".")[0])
+        if len(einrueckung) <= 3:
+            module[name] = round(int(kumuliert) / 1000, 2)
+    return module, sorted(geladen & set(NICHT_BEIM_START))
+
+
+def warte_auf(url, frist, daten=None):
+    while time.monotonic() < frist:
+        try:
+            with urllib.request.urlopen(url, data=daten, timeout=30) as antwort:
+                return antwort.read()
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError(f"{url} nicht rechtzeitig erreichbar")
+
+
+def starte(name, base_url):
+    port = freier_port()
+    befehl = [teil.format(port=port) for teil in BEFEHLE[name]]
+    # Standardumgebung wie im Betrieb (LLM_VORWAERMEN bleibt ungesetzt)
+    env = umgebung(PORT=str(port), OPENAI_BASE_URL=base_url, DIREKTMANDATE_ENGINE="llm")
+    start = time.perf_counter()
+    prozess = subprocess.Popen(befehl, cwd=PROJEKT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        warte_auf(f"http://127.0.0.1:{port}/", time.monotonic() + 60)
+        erste_seite = time.perf_counter() - start
+        t = time.perf_counter()
+        body = warte_auf(f"http://127.0.0.1:{port}/prognose", time.monotonic() + 60,
+                         urllib.parse.urlencode(dict(UMFRAGE, engine="llm")).encode())
+        erste_prognose = time.perf_counter() - t
+        if b"<strong>Hinweis:</strong> Fehler" in body:
+            raise RuntimeError("Erste Prognose fehlgeschlagen")
+    finally:
+        prozess.terminate()
+        prozess.wait(10)
+    return erste_seite, erste_prognose
+
+
+def miss(wiederholungen):
+    module, schwer = importzeiten()
+    stub = OpenAIStub("fest:0")
+    base_url = stub.starte()
+    befehle = {}
+    try:
+        for name in BEFEHLE:
+            messungen = [starte(name, base_url) for _ in range(wiederholungen)]
+            befehle[name] = {
+                "erste_seite_ms": round(statistics.median(m[0] for m in messungen) * 1000, 1),
+                "erste_prognose_ms": round(statistics.median(m[1] for m in messungen) * 1000, 1),
+            }
+    finally:
+        stub.stoppe()
+    return {
+        "python": sys.version.split()[0],
+        "wiederholungen": wiederholungen,
+        "import_ms": module.get("prognose_tool_ltw26"),
+        "module_ms": dict(sorted(module.items(), key=lambda e: -e[1])),
+        "schwere_pakete_beim_start": schwer,
+        "befehle": befehle,
+    }
+
+
+def vergleiche(aktuell, baseline, toleranz):
+    regressionen = [f"{paket} wird beim Start geladen" for paket in aktuell["schwere_pakete_beim_start"]]
+    werte = [("import", aktuell["import_ms"], baseline.get("import_ms"))]
+    for name, zeiten in aktuell["befehle"].items():
+        for kennung, wert in zeiten.items():
+            werte.append((f"{name}/{kennung}", wert, baseline.get("befehle", {}).get(name, {}).get(kennung)))
+    for name, wert, alt in werte:
+        if alt is not None and wert > alt * (1 + toleranz):
+            regressionen.append(f"{name}: {wert} ms statt {alt} ms (Grenze {alt * (1 + toleranz):.1f} ms)")
+    return regressionen
+
+
+def drucke(ergebnis):
+    print(f"Import prognose_tool_ltw26: {ergebnis['import_ms']} ms")
+    for name, ms in list(ergebnis["module_ms"].items())[:12]:
+        print(f"  {name:<28} {ms:>8.1f} ms")
+    print(f"{'Befehl':<12} {'erste Seite':>12} {'erste Prognose':>15}")
+    for name, zeiten in ergebnis["befehle"].items():
+        print(f"{name:<12} {zeiten['erste_seite_ms']:>9.0f} ms {zeiten['erste_prognose_ms']:>12.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kaltstart-Benchmark der App")
+    parser.add_argument("--wiederholungen", type=int, default=5)
+    parser.add_argument("--ausgabe", default="kaltstart.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--toleranz", type=float, default=0.5,
+                        help="erlaubte relative Verlangsamung gegenüber der Baseline")
+    parser.add_argument("--speichere-baseline", action="store_true")
+    args = parser.parse_args()
+
+    ergebnis = miss(args.wiederholungen)
+    drucke(ergebnis)
+    ziel = args.baseline if args.speichere_baseline else args.ausgabe
+    with open(ziel, "w", encoding="utf-8") as datei:
+        json.dump(ergebnis, datei, ensure_ascii=False, indent=2)
+    print(f"Ergebnisse gespeichert: {ziel}")
+    if args.speichere_baseline or not os.path.exists(args.baseline):
+        return 1 if ergebnis["schwere_pakete_beim_start"] else 0
+
+    with open(args.baseline, encoding="utf-8") as datei:
+        regressionen = vergleiche(ergebnis, json.load(datei), args.toleranz)
+    for meldung in regressionen:
+        print(f"REGRESSION {meldung}")
+    if not regressionen:
+        print("Keine Regression gegenüber der Baseline.")
+    return 1 if regressionen else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import argparse
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from openai_stub import OpenAIStub
+
+# Lasttest für POST /prognose, vollständig offline: Der OpenAI-Stub läuft im
+# Prozess, die App wird je Serving-Konfiguration als eigener Prozess gestartet
+# und per OPENAI_BASE_URL auf den Stub gelenkt. Je Parallelitätsstufe werden
+# Durchsatz, p50/p95/p99 und Fehlerquoten gemessen.
+# Aufruf: python benchmarks/lasttest.py [--stufen 1,4,16,64] [--dauer 10]
+#         [--latenz lognormal:800:0.4] [--fehlerquote 0.02] [--kaputt-quote 0.01]
+
+VERZEICHNIS = os.path.dirname(os.path.abspath(__file__))
+PROJEKT = os.path.join(VERZEICHNIS, "..")
+
+STARTER = ("import sys, prognose_tool_ltw26 as m; m.app.run(host='127.0.0.1', port=int(sys.argv[1]), "
+           "threaded=sys.argv[2] == '1', processes=int(sys.argv[3]))")
+
+# {port} und {worker} werden beim Start ersetzt; "modul" muss installiert sein
+KONFIGURATIONEN = {
+    "werkzeug-einzeln": {"befehl": [sys.executable, "-c", STARTER, "{port}", "0", "1"]},
+    "werkzeug-threads": {"befehl": [sys.executable, "-c", STARTER, "{port}", "1", "1"]},
+    "werkzeug-prozesse": {"befehl": [sys.executable, "-c", STARTER, "{port}", "0", "{worker}"]},
+    # Threads wie oben, aber deutlich mehr gleichzeitige LLM-Aufrufe auf der asynchronen Schleife
+    "werkzeug-threads-async64": {"befehl": [sys.executable, "-c", STARTER, "{port}", "1", "1"],
+                                 "env": {"LLM_MAX_PARALLEL": "64"}},
+    # Mit Budget von 600 Anfragen je Minute und ohne Ersatzquelle: Überlast wird zu 429
+    "werkzeug-threads-zulassung": {"befehl": [sys.executable, "-c", STARTER, "{port}", "1", "1"],
+                                   "env": {"LLM_RPM": "600", "LLM_FALLBACK": ""}},
+    # Einstiegspunkt aus dem Procfile: vorab geforkte gunicorn-Worker mit gemeinsamem Budget
+    "produktion": {"modul": "gunicorn", "befehl": [sys.executable, "prognose_tool_ltw26.py"],
+                   "env": {"PORT": "{port}", "WEB_CONCURRENCY": "{worker}"}},
+    "produktion-zulassung": {"modul": "gunicorn", "befehl": [sys.executable, "prognose_tool_ltw26.py"],
+                             "env": {"PORT": "{port}", "WEB_CONCURRENCY": "{worker}", "LLM_RPM": "600",
+                                     "LLM_FALLBACK": "", "LLM_BUDGET_PFAD": "{budget}"}},
+    "gunicorn-sync": {"modul": "gunicorn", "befehl": [
+        sys.executable, "-m", "gunicorn", "-w", "{worker}", "-b", "127.0.0.1:{port}", "prognose_tool_ltw26:app"]},
+    "gunicorn-gthread": {"modul": "gunicorn", "befehl": [
+        sys.executable, "-m", "gunicorn", "-w", "{worker}", "-k", "gthread", "--threads", "16",
+        "-b", "127.0.0.1:{port}", "prognose_tool_ltw26:app"]},
+}
+
+BASIS_UMFRAGE = {"CDU": 29, "B90/Grüne": 20, "AfD": 19, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 6}
+
+
+def zufaellige_umfrage(rng):
+    # Ganzzahlige Anteile mit Summe 100 um die Basisumfrage; die Streuung
+    # sorgt dafür, dass fast jede Anfrage am Cache vorbei zum Stub geht
+    gewichte = {p: rng.gammavariate(w * 10, 1) for p, w in BASIS_UMFRAGE.items()}
+    summe = sum(gewichte.values())
+    roh = {p: 100 * g / summe for p, g in gewichte.items()}
+    werte = {p: int(r) for p, r in roh.items()}
+    for p in sorted(roh, key=lambda p: roh[p] - werte[p], reverse=True)[:100 - sum(werte.values())]:
+        werte[p] += 1
+    return werte
+
+
+def freier_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def starte_app(konfiguration, port, worker, base_url):
+    # Budget der Zulassung praktisch unbegrenzt und je Prozess, außer die
+    # Konfiguration setzt es; ohne Ähnlichkeits-Cache, damit jede neue Umfrage zum Stub geht
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=base_url, LLM_CACHE_PFAD="",
+               UMFRAGEN_PFAD="", DIREKTMANDATE_ENGINE="llm", PROGNOSE_STREAMING="0", HTML_KOMPRESSION="0",
+               LLM_RPM="1000000", LLM_TPM="1000000000", LLM_BUDGET_PFAD="", NACHBAR_TOLERANZ="0")
+    budget = os.path.join(tempfile.gettempdir(), f"lasttest_budget_{port}.sqlite3")
+    env.update({name: wert.format(port=port, worker=worker, budget=budget)
+                for name, wert in konfiguration.get("env", {}).items()})
+    befehl = [teil.format(port=port, worker=worker) for teil in konfiguration["befehl"]]
+    prozess = subprocess.Popen(befehl, cwd=PROJEKT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    frist = time.monotonic() + 30
+    while time.monotonic() < frist:
+        if prozess.poll() is not None:
+            raise RuntimeError(f"App beendet mit Code {prozess.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return prozess
+        except OSError:
+            time.sleep(0.2)
+    prozess.terminate()
+    raise RuntimeError("App nicht rechtzeitig erreichbar")
+
+
+def einordnen(status, body):
+    if status != 200:
+        return "http"
+    if b"<strong>Hinweis:</strong> Fehler: Ung" in body:
+        return "antwort"
+    if b"<strong>Hinweis:</strong> Fehler" in body:
+        return "api"
+    return None
+
+
+def stufe(url, parallel, dauer, timeout, seed):
+    messungen = []
+    lock = threading.Lock()
+    ende = time.monotonic() + dauer
+
+    def nutzer(nummer):
+        rng = random.Random(seed * 100_003 + nummer)
+        lokal = []
+        while time.monotonic() < ende:
+            daten = urllib.parse.urlencode(dict(zufaellige_umfrage(rng), engine="llm")).encode()
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, data=daten, timeout=timeout) as antwort:
+                    fehler = einordnen(antwort.status, antwort.read())
+            except urllib.error.HTTPError as e:
+                fehler = einordnen(e.code, b"")
+            except OSError:
+                fehler = "verbindung"
+            lokal.append((time.perf_counter() - start, fehler))
+        with lock:
+            messungen.extend(lokal)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=nutzer, args=(i,)) for i in range(parallel)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return auswerten(messungen, time.perf_counter() - start, parallel)
+
+
+def perzentil(sortiert, q):
+    if not sortiert:
+        return None
+    return sortiert[min(len(sortiert) - 1, int(q / 100 * len(sortiert)))]
+
+
+def auswerten(messungen, sekunden, parallel):
+    latenzen = sorted(dauer * 1000 for dauer, _ in messungen)
+    fehler = {}
+    for _, art in messungen:
+        if art:
+            fehler[art] = fehler.get(art, 0) + 1
+    anzahl = len(messungen)
+    return {
+        "parallel": parallel,
+        "anfragen": anzahl,
+        "durchsatz": round(anzahl / sekunden, 2),
+        "p50_ms": round(perzentil(latenzen, 50), 1) if latenzen else None,
+        "p95_ms": round(perzentil(latenzen, 95), 1) if latenzen else None,
+        "p99_ms": round(perzentil(latenzen, 99), 1) if latenzen else None,
+        "fehlerquote": round(sum(fehler.values()) / anzahl, 4) if anzahl else None,
+        "fehler": fehler,
+    }
+
+
+def drucke_zeile(name, werte):
+    def ms(wert):
+        return "-" if wert is None else f"{wert:.0f}"
+
+    print(f"{name:<26} {werte['parallel']:>5} {werte['anfragen']:>8} {werte['durchsatz']:>8.1f} "
+          f"{ms(werte['p50_ms']):>7} {ms(werte['p95_ms']):>7} {ms(werte['p99_ms']):>7} "
+          f"{100 * (werte['fehlerquote'] or 0):>6.1f}%  {werte['fehler'] or ''}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Lasttest für /prognose")
+    parser.add_argument("--konfigurationen", default=",".join(KONFIGURATIONEN),
+                        help="kommagetrennt, Auswahl aus: " + ", ".join(KONFIGURATIONEN))
+    parser.add_argument("--worker", type=int, default=4)
+    parser.add_argument("--stufen", default="1,4,16,64", help="Parallelität je Stufe")
+    parser.add_argument("--dauer", type=float, default=10, help="Sekunden je Stufe")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--latenz", default="lognormal:800:0.4", help="Latenz des Stubs (siehe openai_stub.py)")
+    parser.add_argument("--fehlerquote", type=float, default=0.0)
+    parser.add_argument("--kaputt-quote", type=float, default=0.0)
+    parser.add_argument("--fehlercode", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ausgabe", default="lasttest.json")
+    args = parser.parse_args()
+
+    stub = OpenAIStub(args.latenz, args.fehlerquote, args.kaputt_quote, args.fehlercode, args.seed)
+    base_url = stub.starte()
+    stufen = [int(s) for s in args.stufen.split(",")]
+    ergebnis = {"stub": {"latenz": args.latenz, "fehlerquote": args.fehlerquote,
+                         "kaputt_quote": args.kaputt_quote, "fehlercode": args.fehlercode},
+                "worker": args.worker, "dauer": args.dauer, "konfigurationen": {}}
+
+    print(f"{'Konfiguration':<26} {'Par.':>5} {'Anfr.':>8} {'Anfr/s':>8} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'Fehler':>7}")
+    for name in args.konfigurationen.split(","):
+        konfiguration = KONFIGURATIONEN[name]
+        modul = konfiguration.get("modul")
+        if modul and importlib.util.find_spec(modul) is None:
+            print(f"{name:<26} übersprungen: {modul} ist nicht installiert")
+            ergebnis["konfigurationen"][name] = {"uebersprungen": f"{modul} ist nicht installiert"}
+            continue
+        port = freier_port()
+        prozess = starte_app(konfiguration, port, args.worker, base_url)
+        try:
+            vorher = stub.statistik()["anfragen"]
+            stufen_ergebnisse = []
+            for parallel in stufen:
+                werte = stufe(f"http://127.0.0.1:{port}/prognose", parallel, args.dauer, args.timeout, args.seed)
+                stufen_ergebnisse.append(werte)
+                drucke_zeile(name, werte)
+            ergebnis["konfigurationen"][name] = {
+                "stufen": stufen_ergebnisse,
+                "stub_anfragen": stub.statistik()["anfragen"] - vorher,
+            }
+        finally:
+            prozess.terminate()
+            prozess.wait(10)
+    stub.stoppe()
+
+    with open(args.ausgabe, "w", encoding="utf-8") as datei:
+        json.dump(ergebnis, datei, ensure_ascii=False, indent=2)
+    print(f"Ergebnisse gespeichert: {args.ausgabe}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lokaler Ersatz für den Chat-Completions-Endpunkt der OpenAI-API, damit
+# Lasttests ohne Netz und ohne Kosten laufen. Latenz, Fehlerquote und der
+# Anteil kaputter (kein gültiges JSON) Antworten sind einstellbar. Die App wird
+# mit OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 darauf umgelenkt.
+# Aufruf: python benchmarks/openai_stub.py --port 8100 --latenz lognormal:800:0.4
+
+ANTWORT = {"CDU": 52, "B90/Grüne": 14, "AfD": 4, "SPD": 0, "Linke": 0, "FDP": 0, "BSW": 0, "Sonstige": 0}
+KAPUTTE_ANTWORT = '{"CDU": 52, "B90/Grüne": 1'
+
+
+def latenzverteilung(text):
+    # "fest:MS", "gleich:MIN:MAX", "normal:MITTEL:STREUUNG", "lognormal:MEDIAN:SIGMA",
+    # "exponentiell:MITTEL"; Werte in Millisekunden, Ergebnis in Sekunden
+    art, *werte = text.split(":")
+    werte = [float(w) for w in werte]
+    if art == "fest":
+        return lambda rng: werte[0] / 1000
+    if art == "gleich":
+        return lambda rng: rng.uniform(werte[0], werte[1]) / 1000
+    if art == "normal":
+        return lambda rng: max(0.0, rng.gauss(werte[0], werte[1])) / 1000
+    if art == "lognormal":
+        return lambda rng: werte[0] * rng.lognormvariate(0, werte[1]) / 1000
+    if art == "exponentiell":
+        return lambda rng: rng.expovariate(1 / werte[0]) / 1000
+    raise ValueError(f"Unbekannte Latenzverteilung: {text}")
+
+
+class OpenAIStub:
+
+    def __init__(self, latenz="fest:0", fehlerquote=0.0, kaputt_quote=0.0, fehlercode=500, seed=None):
+        self.latenz = latenzverteilung(latenz)
+        self.fehlerquote = fehlerquote
+        self.kaputt_quote = kaputt_quote
+        self.fehlercode = fehlercode
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self.anfragen = 0
+        self.fehler = 0
+        self.kaputt = 0
+
+    def _ziehe(self):
+        # Ein Zufallsgenerator für alle Threads, daher unter dem Lock
+        with self._lock:
+            self.anfragen += 1
+            dauer = self.latenz(self._rng)
+            wurf = self._rng.random()
+            if wurf < self.fehlerquote:
+                self.fehler += 1
+                return dauer, "fehler"
+            if wurf < self.fehlerquote + self.kaputt_quote:
+                self.kaputt += 1
+                return dauer, "kaputt"
+            return dauer, "ok"
+
+    def antwort(self, anfrage):
+        dauer, art = self._ziehe()
+        time.sleep(dauer)
+        if art == "fehler":
+            return self.fehlercode, {"error": {"message": "Stub-Fehler", "type": "server_error"}}
+        inhalt = KAPUTTE_ANTWORT if art == "kaputt" else json.dumps(ANTWORT, ensure_ascii=False)
+        prompt_tokens = sum(len(m.get("content", "")) for m in anfrage.get("messages", [])) // 4
+        # n Antworten je Anfrage wie bei der echten API (Ensemble-Modus der App)
+        n = anfrage.get("n") or 1
+        return 200, {
+            "id": f"chatcmpl-stub-{self.anfragen}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": anfrage.get("model", "gpt-4o"),
+            "choices": [{
+                "index": index,
+                "message": {"role": "assistant", "content": inhalt},
+                "finish_reason": "stop",
+            } for index in range(n)],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": 40 * n,
+                "total_tokens": prompt_tokens + 40 * n,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+
+    def statistik(self):
+        with self._lock:
+            return {"anfragen": self.anfragen, "fehler": self.fehler, "kaputt": self.kaputt}
+
+    def starte(self, host="127.0.0.1", port=0):
+        # Liefert die Basis-URL für den OpenAI-Client
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                laenge = int(self.headers.get("Content-Length", 0))
+                try:
+                    anfrage = json.loads(self.rfile.read(laenge) or b"{}")
+                except json.JSONDecodeError:
+                    anfrage = {}
+                if self.path.rstrip("/").endswith("/chat/completions"):
+                    status, daten = stub.antwort(anfrage)
+                else:
+                    status, daten = 404, {"error": {"message": f"Unbekannter Pfad: {self.path}"}}
+                self._sende(status, daten)
+
+            def do_GET(self):
+                self._sende(200, stub.statistik())
+
+            def _sende(self, status, daten):
+                body = json.dumps(daten, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="openai-stub", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/v1"
+
+    def stoppe(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Stub für OpenAI Chat Completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latenz", default="lognormal:800:0.4")
+    parser.add_argument("--fehlerquote", type=float, default=0.0)
+    parser.add_argument("--kaputt-quote", type=float, default=0.0)
+    parser.add_argument("--fehlercode", type=int, default=500)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    stub = OpenAIStub(args.latenz, args.fehlerquote, args.kaputt_quote, args.fehlercode, args.seed)
+    print(f"OPENAI_BASE_URL={stub.starte(args.host, args.port)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.stoppe()
+
+
+if __name__ == "__main__":
+    main()
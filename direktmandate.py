@@ -0,0 +1,85 @@
+import numpy as np
+
+from wahlkreisdaten import PARTEIEN, LTW21_LANDESERGEBNIS, lies_ltw21
+
+# Lokale Schätzung der Direktmandate: Die Wahlkreisergebnisse der Landtagswahl
+# 2021 werden mit einem Swing auf die eingegebene Prognose übertragen, danach
+# gewinnt in jedem Wahlkreis die stärkste Partei.
+
+SWING_MODELLE = ("uniform", "proportional")
+
+WAHLKREISE, ERGEBNISSE_LTW21 = lies_ltw21()
+LANDESERGEBNIS_LTW21 = np.array([LTW21_LANDESERGEBNIS[p] for p in PARTEIEN])
+
+# "Sonstige" ist ein Sammelbecken und kann keinen Wahlkreis gewinnen
+_KANN_GEWINNEN = np.array([p != "Sonstige" for p in PARTEIEN])
+
+# Ein Direktmandat je Wahlkreis
+DIREKTMANDATE = 70
+
+
+def runde_auf_summe(werte, summe):
+    # Größte Reste: ganze Zahlen mit vorgegebener Summe
+    ganz = np.floor(werte).astype(int)
+    rest = summe - ganz.sum()
+    if rest > 0:
+        ganz[np.argsort(-(werte - ganz), kind="stable")[:rest]] += 1
+    return ganz
+
+
+def _prognosevektor(eingabe):
+    return np.array([float(eingabe.get(p, 0)) for p in PARTEIEN])
+
+
+def wahlkreisergebnisse(eingabe, modell="proportional"):
+    return _swing(_prognosevektor(eingabe), modell)
+
+
+def _swing(ziel, modell):
+    # ziel: Landesprognose(n) in Prozent mit Form (..., 8), Ergebnis (..., 70, 8)
+    faktor, zusatz = _swing_parameter(ziel, modell)
+    return ERGEBNISSE_LTW21 * faktor[..., None, :] + zusatz[..., None, :]
+
+
+def _swing_parameter(ziel, modell):
+    # Jedes Swing-Modell ist linear je Partei: Wahlkreis 2021 * faktor + zusatz
+    if modell == "uniform":
+        # Gleiche Veränderung in Prozentpunkten in allen Wahlkreisen
+        return np.ones_like(ziel), ziel - LANDESERGEBNIS_LTW21
+    if modell == "proportional":
+        # Gleiche relative Veränderung; Parteien ohne Ergebnis 2021 (BSW)
+        # erhalten überall ihren Landeswert
+        basis = LANDESERGEBNIS_LTW21 > 0
+        faktor = np.divide(ziel, LANDESERGEBNIS_LTW21,
+                           out=np.zeros(ziel.shape), where=basis)
+        return faktor, np.where(basis, 0.0, ziel)
+    raise ValueError(f"Unbekanntes Swing-Modell: {modell}")
+
+
+def wahlkreissieger(ergebnisse):
+    # Index der stärksten Partei je Wahlkreis (bei Gleichstand die erste in PARTEIEN)
+    return np.argmax(np.where(_KANN_GEWINNEN, ergebnisse, -np.inf), axis=-1)
+
+
+def schaetze_direktmandate(eingabe, modell="proportional"):
+    sieger = wahlkreissieger(wahlkreisergebnisse(eingabe, modell))
+    anzahl = np.bincount(sieger, minlength=len(PARTEIEN))
+    return {p: int(n) for p, n in zip(PARTEIEN, anzahl)}
+
+
+def schaetze_direktmandate_matrix(prognosen, modell="proportional"):
+    # Viele Prognosen auf einmal: (N, 8) Prozentwerte -> (N, 8) Direktmandate.
+    # Spaltenweise statt über die volle (N, 70, 8)-Matrix, das ist deutlich
+    # schneller als argmax über die kurze letzte Achse.
+    faktor, zusatz = _swing_parameter(prognosen, modell)
+    bester = np.full((len(prognosen), len(WAHLKREISE)), -np.inf)
+    sieger = np.zeros(bester.shape, dtype=np.intp)
+    for j in np.flatnonzero(_KANN_GEWINNEN):
+        wert = np.multiply.outer(faktor[:, j], ERGEBNISSE_LTW21[:, j]) + zusatz[:, j, None]
+        besser = wert > bester
+        np.copyto(bester, wert, where=besser)
+        sieger[besser] = j
+    n = len(prognosen)
+    versatz = np.arange(n)[:, None] * len(PARTEIEN)
+    return np.bincount((sieger + versatz).ravel(),
+                       minlength=n * len(PARTEIEN)).reshape(n, len(PARTEIEN))
@@ -0,0 +1,231 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from wahlkreisdaten import PARTEIEN, LTW21_LANDESERGEBNIS, lies_btw25, lies_ltw21, lies_zuordnung
+
+# Rückrechnung (Backtest) und Kalibrierung der Swing-Modelle für die
+# Direktmandate. Aus den Wahlkreisergebnissen einer Wahl und dem Landesergebnis
+# einer anderen werden deren Wahlkreisergebnisse geschätzt und mit den
+# tatsächlichen verglichen; die beiden Gebietseinteilungen werden über die
+# Zuordnung in wahlkreisdaten verbunden.
+#
+# Jedes Modell hat eine Elastizität β, die regionale Unterschiede skaliert
+# (β = 1: klassischer Swing, β = 0: überall das Landesergebnis):
+#   uniform       ziel + β · (wahlkreis − land)
+#   proportional  ziel · (wahlkreis / land)^β
+#   logit         logit⁻¹(logit(ziel) + β · (logit(wahlkreis) − logit(land)))
+# Alle Modelle und Elastizitäten werden zugleich als Arrays (β x Wahlkreise x
+# Parteien) berechnet, ohne Schleife über Wahlkreise.
+
+SWING_MODELLE = ("uniform", "proportional", "logit")
+ELASTIZITAETEN = np.round(np.linspace(0, 2, 201), 3)
+ZIELE = ("sieger", "mae")
+
+_KANN_GEWINNEN = np.array([p != "Sonstige" for p in PARTEIEN])
+_EPS = 1e-4
+
+
+class Zuordnung:
+    # Dünn besetzte Zuordnung LTW -> BTW, für die Rechnung einmal als Matrix
+
+    def __init__(self, btw_anzahl, ltw_anzahl):
+        self.btw, self.ltw, self.anteil = lies_zuordnung()
+        matrix = np.zeros((btw_anzahl, ltw_anzahl))
+        np.add.at(matrix, (self.btw, self.ltw), self.anteil)
+        # BTW-Wahlkreis = Mittel der (Teile der) Landtagswahlkreise darin,
+        # Landtagswahlkreise gelten als gleich groß
+        self._zu_btw = matrix / matrix.sum(axis=1, keepdims=True)
+        # LTW-Wahlkreis = nach Anteil gewichtetes Mittel seiner BTW-Wahlkreise
+        self._zu_ltw = (matrix / matrix.sum(axis=0, keepdims=True)).T
+
+    def ltw_zu_btw(self, werte):
+        return self._zu_btw @ werte
+
+    def btw_zu_ltw(self, werte):
+        return self._zu_ltw @ werte
+
+
+def _logit(p):
+    p = np.clip(p, _EPS, 1 - _EPS)
+    return np.log(p / (1 - p))
+
+
+def swing(basis, land, ziel, modell, elastizitaeten):
+    # basis: (Wahlkreise, 8) Prozent, land und ziel: (8,) Prozent,
+    # elastizitaeten: (B,) -> Ergebnis (B, Wahlkreise, 8) Prozent
+    beta = np.asarray(elastizitaeten, dtype=float)[:, None, None]
+    if modell == "uniform":
+        werte = np.maximum(ziel + beta * (basis - land), 0)
+    elif modell == "proportional":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            verhaeltnis = np.where(land > 0, basis / np.where(land > 0, land, 1), 1.0)
+            werte = ziel * np.where(verhaeltnis > 0, verhaeltnis ** beta, 0.0)
+    elif modell == "logit":
+        werte = 100 / (1 + np.exp(-(_logit(ziel / 100) + beta * (_logit(basis / 100) - _logit(land / 100)))))
+        werte = np.where(ziel > 0, werte, 0.0)
+        werte = 100 * werte / werte.sum(axis=-1, keepdims=True)
+    else:
+        raise ValueError(f"Unbekanntes Swing-Modell: {modell}")
+    # Parteien ohne Basisergebnis (BSW 2021) erhalten überall den Zielwert
+    return np.where(land > 0, werte, ziel)
+
+
+def sieger(ergebnisse):
+    return np.argmax(np.where(_KANN_GEWINNEN, ergebnisse, -np.inf), axis=-1)
+
+
+def _bewerte(schaetzung, ist):
+    # schaetzung: (B, D, 8), ist: (D, 8) -> Kennzahlen je Elastizität
+    fehler = schaetzung - ist
+    s_sieger = sieger(schaetzung)
+    i_sieger = sieger(ist)
+    anzahl = len(PARTEIEN)
+    sitze = (s_sieger[..., None] == np.arange(anzahl)).sum(axis=1)
+    ist_sitze = np.bincount(i_sieger, minlength=anzahl)
+    return {
+        "mae": np.abs(fehler).mean(axis=(1, 2)),
+        "rmse": np.sqrt((fehler ** 2).mean(axis=(1, 2))),
+        "trefferquote": (s_sieger == i_sieger).mean(axis=1),
+        # Falsch zugeordnete Direktmandate (Summe der Abweichungen / 2)
+        "sitzfehler": np.abs(sitze - ist_sitze).sum(axis=1) // 2,
+        "mae_wahlkreis": np.abs(fehler).mean(axis=2),
+        "sieger": s_sieger,
+        "sitze": sitze,
+    }
+
+
+class Backtests:
+    # Lädt die Daten einmal; `lauf` rechnet alle Modelle und Elastizitäten
+
+    def __init__(self):
+        self.ltw_namen, self.ltw = lies_ltw21()
+        self.btw_namen, self.btw, self.btw_land = lies_btw25()
+        self.ltw_land = np.array([LTW21_LANDESERGEBNIS[p] for p in PARTEIEN])
+        self.zuordnung = Zuordnung(len(self.btw_namen), len(self.ltw_namen))
+        # name -> (basis, basis_land, ziel_land, Projektion auf das Zielgebiet, ist, Wahlkreisnamen)
+        self.faelle = {
+            # LTW 2021 mit dem Landesergebnis der BTW 2025 fortschreiben, auf die BTW-Wahlkreise abbilden
+            "ltw21_btw25": (self.ltw, self.ltw_land, self.btw_land,
+                            self.zuordnung.ltw_zu_btw, self.btw, self.btw_namen),
+            # BTW 2025 auf die Landtagswahlkreise übertragen und auf das Landesergebnis 2021 zurückrechnen
+            "btw25_ltw21": (self.zuordnung.btw_zu_ltw(self.btw), self.btw_land, self.ltw_land,
+                            None, self.ltw, self.ltw_namen),
+        }
+
+    def lauf(self, fall, modell, elastizitaeten=ELASTIZITAETEN):
+        basis, land, ziel, projektion, ist, _ = self.faelle[fall]
+        schaetzung = swing(basis, land, ziel, modell, elastizitaeten)
+        if projektion is not None:
+            schaetzung = projektion(schaetzung)
+        return _bewerte(schaetzung, ist)
+
+
+def _beste(kennzahlen, ziel):
+    # Lexikographisch: erst das Ziel, dann der jeweils andere Fehler
+    if ziel == "sieger":
+        return int(np.lexsort((kennzahlen["mae"], kennzahlen["sitzfehler"]))[0])
+    return int(np.lexsort((kennzahlen["sitzfehler"], kennzahlen["mae"]))[0])
+
+
+def kalibriere(faelle=None, modelle=SWING_MODELLE, elastizitaeten=ELASTIZITAETEN, ziel="sieger",
+               wahlkreise=False, backtests=None):
+    if ziel not in ZIELE:
+        raise ValueError(f"Unbekanntes Ziel: {ziel}")
+    backtests = backtests or Backtests()
+    faelle = faelle or list(backtests.faelle)
+    elastizitaeten = np.asarray(elastizitaeten, dtype=float)
+    start = time.perf_counter()
+
+    ergebnis = {"ziel": ziel, "elastizitaeten": len(elastizitaeten), "faelle": {}, "gemeinsam": {}}
+    summen = {}
+    for fall in faelle:
+        namen = backtests.faelle[fall][5]
+        ist = backtests.faelle[fall][4]
+        modelle_ergebnis = {}
+        for modell in modelle:
+            k = backtests.lauf(fall, modell, elastizitaeten)
+            # Gemeinsame Anpassung über alle Fälle: Fehler je Elastizität addieren
+            summe = summen.setdefault(modell, {"mae": 0, "sitzfehler": 0})
+            summe["mae"] = summe["mae"] + k["mae"] / len(faelle)
+            summe["sitzfehler"] = summe["sitzfehler"] + k["sitzfehler"]
+            i = _beste(k, ziel)
+            eintrag = {
+                "elastizitaet": float(elastizitaeten[i]),
+                "mae": round(float(k["mae"][i]), 3),
+                "rmse": round(float(k["rmse"][i]), 3),
+                "trefferquote": round(float(k["trefferquote"][i]), 4),
+                "sitzfehler": int(k["sitzfehler"][i]),
+                "direktmandate": dict(zip(PARTEIEN, map(int, k["sitze"][i]))),
+            }
+            # Zum Vergleich der klassische Swing (β = 1), falls im Raster
+            klassisch = np.flatnonzero(np.isclose(elastizitaeten, 1))
+            if len(klassisch):
+                j = klassisch[0]
+                eintrag["klassisch"] = {"mae": round(float(k["mae"][j]), 3),
+                                        "trefferquote": round(float(k["trefferquote"][j]), 4),
+                                        "sitzfehler": int(k["sitzfehler"][j])}
+            if wahlkreise:
+                eintrag["wahlkreise"] = _wahlkreisbericht(namen, ist, k, i)
+            modelle_ergebnis[modell] = eintrag
+        ergebnis["faelle"][fall] = {
+            "ist_direktmandate": dict(zip(PARTEIEN, map(int, np.bincount(sieger(ist), minlength=len(PARTEIEN))))),
+            "modelle": modelle_ergebnis,
+        }
+    for modell, summe in summen.items():
+        i = _beste(summe, ziel)
+        ergebnis["gemeinsam"][modell] = {
+            "elastizitaet": float(elastizitaeten[i]),
+            "mae": round(float(summe["mae"][i]), 3),
+            "sitzfehler": int(summe["sitzfehler"][i]),
+        }
+    ergebnis["dauer_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return ergebnis
+
+
+def _wahlkreisbericht(namen, ist, kennzahlen, i):
+    ist_sieger = sieger(ist)
+    bericht = []
+    for d, name in enumerate(namen):
+        s = kennzahlen["sieger"][i][d]
+        bericht.append({
+            "wahlkreis": name,
+            "ist_sieger": PARTEIEN[ist_sieger[d]],
+            "geschaetzt": PARTEIEN[s],
+            "treffer": bool(s == ist_sieger[d]),
+            "mae": round(float(kennzahlen["mae_wahlkreis"][i][d]), 2),
+        })
+    return bericht
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest und Kalibrierung der Swing-Modelle")
+    parser.add_argument("--ziel", choices=ZIELE, default="sieger")
+    parser.add_argument("--wahlkreise", action="store_true", help="Bericht je Wahlkreis ausgeben")
+    parser.add_argument("--ausgabe", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    ergebnis = kalibriere(ziel=args.ziel, wahlkreise=args.wahlkreise or bool(args.ausgabe))
+    for fall, daten in ergebnis["faelle"].items():
+        print(f"{fall}: tatsächliche Direktmandate {daten['ist_direktmandate']}")
+        print(f"  {'Modell':<13} {'β':>5} {'MAE':>7} {'RMSE':>7} {'Treffer':>8} {'Sitzf.':>7}   β=1: MAE / Treffer")
+        for modell, e in daten["modelle"].items():
+            k = e.get("klassisch", {})
+            print(f"  {modell:<13} {e['elastizitaet']:>5.2f} {e['mae']:>7.3f} {e['rmse']:>7.3f} "
+                  f"{e['trefferquote']:>8.1%} {e['sitzfehler']:>7}   {k.get('mae', '-')} / {k.get('trefferquote', '-')}")
+            if args.wahlkreise:
+                for w in e["wahlkreise"]:
+                    if not w["treffer"]:
+                        print(f"      falsch: {w['wahlkreis']:<30} ist {w['ist_sieger']:<10} "
+                              f"geschätzt {w['geschaetzt']:<10} MAE {w['mae']}")
+    print("gemeinsame Anpassung:", ergebnis["gemeinsam"])
+    print(f"Rechenzeit: {ergebnis['dauer_ms']} ms für {ergebnis['elastizitaeten']} Elastizitäten")
+    if args.ausgabe:
+        with open(args.ausgabe, "w", encoding="utf-8") as datei:
+            json.dump(ergebnis, datei, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
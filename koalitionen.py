@@ -0,0 +1,102 @@
+import numpy as np
+
+from wahlkreisdaten import PARTEIEN
+
+# Koalitionsrechner: Alle 127 Teilmengen der 7 Parteien, die Sitze erhalten
+# können, sind als Bitmasken vorberechnet. Für beliebig viele
+# Sitzverteilungen (Zeilen) zugleich ergeben sich Sitze und kleinstes Mitglied
+# jeder Koalition aus der Koalition ohne ihr niedrigstes Bit, also mit einer
+# Array-Operation je Koalition statt einer Schleife über Szenarien. Mehrheit
+# heißt mehr als die Hälfte der Gesamtzahl der Sitze; eine Koalition ist
+# minimal, wenn sie ohne jede einzelne ihrer Parteien keine Mehrheit mehr hätte.
+
+KOALITIONSPARTEIEN = [p for p in PARTEIEN if p != "Sonstige"]
+_SPALTEN = [PARTEIEN.index(p) for p in KOALITIONSPARTEIEN]
+
+MASKEN = np.arange(1, 2 ** len(KOALITIONSPARTEIEN))
+# (127, 7): Partei j gehört zu Koalition i
+ZUGEHOERIGKEIT = (MASKEN[:, None] >> np.arange(len(KOALITIONSPARTEIEN))) & 1
+GROESSE = ZUGEHOERIGKEIT.sum(axis=1)
+# Koalition ohne ihr niedrigstes Bit (-1: leer) und die Partei dieses Bits
+_REST = (MASKEN & (MASKEN - 1)) - 1
+_PARTEI = np.log2(MASKEN & -MASKEN).astype(int)
+NAMEN = [" + ".join(p for p, dabei in zip(KOALITIONSPARTEIEN, zeile) if dabei) for zeile in ZUGEHOERIGKEIT]
+
+
+def sitzmatrix(sitze):
+    # (N, 7) aus (N, 8)-Arrays in der Reihenfolge von PARTEIEN oder aus (N, 7)
+    sitze = np.atleast_2d(np.asarray(sitze))
+    if sitze.shape[1] == len(PARTEIEN):
+        sitze = sitze[:, _SPALTEN]
+    return sitze.astype(np.int64)
+
+
+def werte_matrix(sitze):
+    # Liefert Koalitionssitze, Vorsprung auf die Mehrheit (negativ: fehlende
+    # Sitze) und Minimalität, jeweils als (N, 127)
+    sitze = sitzmatrix(sitze)
+    mehrheit = sitze.sum(axis=1) // 2 + 1
+    # Koalitionen als Zeilen, damit jede Operation auf zusammenhängendem Speicher läuft
+    spalten = np.ascontiguousarray(sitze.T)
+    koalitionssitze = np.empty((len(MASKEN), len(sitze)), dtype=np.int64)
+    kleinste = np.empty_like(koalitionssitze)
+    for i, (rest, partei) in enumerate(zip(_REST, _PARTEI)):
+        if rest < 0:
+            koalitionssitze[i] = kleinste[i] = spalten[partei]
+        else:
+            np.add(koalitionssitze[rest], spalten[partei], out=koalitionssitze[i])
+            np.minimum(kleinste[rest], spalten[partei], out=kleinste[i])
+    koalitionssitze, kleinste = koalitionssitze.T, kleinste.T
+    vorsprung = koalitionssitze - mehrheit[:, None]
+    # Ohne ein Mitglied fehlt die Mehrheit genau dann, wenn jedes Mitglied
+    # mehr Sitze hat als der Vorsprung (Parteien ohne Sitze sind nie nötig)
+    minimal = (vorsprung >= 0) & (kleinste > vorsprung)
+    return koalitionssitze, vorsprung, minimal
+
+
+def minimale_koalitionen(sitze):
+    # Je Zeile die minimalen Koalitionen mit Mehrheit, nach Größe und Sitzen sortiert
+    koalitionssitze, vorsprung, minimal = werte_matrix(sitze)
+    ergebnis = []
+    for zeile in range(len(minimal)):
+        indizes = np.flatnonzero(minimal[zeile])
+        indizes = indizes[np.lexsort((-koalitionssitze[zeile, indizes], GROESSE[indizes]))]
+        ergebnis.append([{
+            "koalition": NAMEN[i],
+            "parteien": [p for p, dabei in zip(KOALITIONSPARTEIEN, ZUGEHOERIGKEIT[i]) if dabei],
+            "sitze": int(koalitionssitze[zeile, i]),
+            "vorsprung": int(vorsprung[zeile, i]),
+        } for i in indizes])
+    return ergebnis
+
+
+def analysiere_koalitionen(sitze):
+    # Eine Sitzverteilung als Dict wie von berechne_verteilung
+    zeile = [sitze.get(p, 0) for p in KOALITIONSPARTEIEN]
+    gesamt = sitze.get("Gesamtzahl der Sitze", sum(zeile))
+    return {
+        "mehrheit": gesamt // 2 + 1,
+        "minimal": minimale_koalitionen([zeile])[0],
+    }
+
+
+def koalitionswahrscheinlichkeiten(sitze, schwelle=0.0):
+    # Über viele Szenarien bzw. Ziehungen: Anteil mit Mehrheit und mit
+    # minimaler Mehrheit je Koalition, dazu der mittlere Vorsprung. Aufgeführt
+    # werden Koalitionen, die in mehr als `schwelle` der Zeilen minimal sind.
+    _, vorsprung, minimal = werte_matrix(sitze)
+    if not len(vorsprung):
+        return []
+    mehrheit = vorsprung >= 0
+    p_mehrheit = mehrheit.mean(axis=0)
+    p_minimal = minimal.mean(axis=0)
+    vorsprung_mittel = vorsprung.mean(axis=0)
+    # Koalitionen, die nie minimal sind, enthalten stets eine überflüssige Partei
+    indizes = np.flatnonzero(p_minimal > schwelle)
+    indizes = indizes[np.lexsort((GROESSE[indizes], -p_mehrheit[indizes], -p_minimal[indizes]))]
+    return [{
+        "koalition": NAMEN[i],
+        "p_mehrheit": round(float(p_mehrheit[i]), 5),
+        "p_minimal": round(float(p_minimal[i]), 5),
+        "vorsprung_mittel": round(float(vorsprung_mittel[i]), 2),
+    } for i in indizes]
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from wahlkreisdaten import PARTEIEN
+
+# Cache für die Direktmandate aus der LLM-Anfrage: LRU mit begrenzter Größe und
+# Ablaufzeit, zusätzlich in SQLite gespeichert, damit er Neustarts übersteht.
+# Mehrere Worker eines Hosts teilen sich die SQLite-Datei: Fehlt ein Eintrag im
+# eigenen Speicher, wird in der Datei nachgesehen, ob ein anderer Worker ihn
+# schon geschrieben hat. Zeilen löscht nur der Ablauf (TTL); die LRU-Grenze
+# gilt nur für den eigenen Speicher, andere Worker nutzen die Zeile weiter.
+
+
+def kontext_hash(modell, temperatur, prompt):
+    # Einträge gelten nur für dasselbe Modell, dieselbe Temperatur und denselben
+    # Prompt. Ändert sich eines davon, werden alte Einträge verworfen.
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{modell}|{temperatur}|{prompt_hash}".encode("utf-8")).hexdigest()
+
+
+def normierte_eingabe(eingabe):
+    # Feste Parteireihenfolge, fehlende Parteien als 0
+    return [eingabe.get(p, 0) for p in PARTEIEN]
+
+
+class LLMCache:
+
+    def __init__(self, kontext, pfad=None, max_eintraege=1000, ttl=86400):
+        self.kontext = kontext
+        self.max_eintraege = max_eintraege
+        self.ttl = ttl
+        self.treffer = 0
+        self.fehlzugriffe = 0
+        self.verdraengungen = 0
+        self._eintraege = OrderedDict()
+        # Zugriffszeiten aus hole(), gesammelt bis zum nächsten Schreiben
+        self._zugriffe = {}
+        self._lock = threading.Lock()
+        self.pfad = pfad
+        self._db = None
+        if pfad:
+            self.verbinde()
+            self._lade()
+
+    def verbinde(self):
+        # Eigene Verbindung je Prozess, nach einem fork erneut aufrufen
+        if not self.pfad:
+            return
+        self.schliesse()
+        self._db = sqlite3.connect(self.pfad, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "schluessel TEXT PRIMARY KEY, kontext TEXT, erstellt REAL, zugriff REAL, wert TEXT, eingabe TEXT)")
+            spalten = {zeile[1] for zeile in self._db.execute("PRAGMA table_info(llm_cache)")}
+            if "eingabe" not in spalten:
+                self._db.execute("ALTER TABLE llm_cache ADD COLUMN eingabe TEXT")
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_erstellt ON llm_cache (erstellt)")
+
+    def _lade(self):
+        grenze = time.time() - self.ttl
+        with self._db:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE kontext != ? OR erstellt < ?", (self.kontext, grenze))
+            zeilen = self._db.execute(
+                "SELECT schluessel, erstellt, wert FROM llm_cache ORDER BY zugriff DESC LIMIT ?",
+                (self.max_eintraege,)).fetchall()
+        for schluessel, erstellt, wert in reversed(zeilen):
+            self._eintraege[schluessel] = (erstellt, json.loads(wert))
+
+    def schluessel(self, eingabe):
+        daten = json.dumps([self.kontext, normierte_eingabe(eingabe)])
+        return hashlib.sha256(daten.encode("utf-8")).hexdigest()
+
+    def schliesse(self):
+        # Vor einem fork im Hauptprozess und beim Beenden
+        if self._db is not None:
+            with self._lock:
+                with self._db:
+                    self._schreibe_zugriffe()
+            self._db.close()
+            self._db = None
+
+    def _aus_datei(self, schluessel):
+        # Unter dem Lock: Eintrag eines anderen Workers aus der SQLite-Datei
+        if not self._db:
+            return None
+        zeile = self._db.execute("SELECT erstellt, wert FROM llm_cache WHERE schluessel = ? AND kontext = ?",
+                                 (schluessel, self.kontext)).fetchone()
+        if zeile is None:
+            return None
+        return zeile[0], json.loads(zeile[1])
+
+    def enthaelt(self, schluessel):
+        # Prüft ohne Zähler und LRU-Reihenfolge zu verändern
+        with self._lock:
+            eintrag = self._eintraege.get(schluessel) or self._aus_datei(schluessel)
+            return eintrag is not None and time.time() - eintrag[0] <= self.ttl
+
+    def hole(self, schluessel):
+        jetzt = time.time()
+        with self._lock:
+            eintrag = self._eintraege.get(schluessel)
+            if eintrag is None:
+                eintrag = self._aus_datei(schluessel)
+                if eintrag is not None:
+                    self._eintraege[schluessel] = eintrag
+                    self._begrenze()
+            if eintrag is not None and jetzt - eintrag[0] > self.ttl:
+                self._entferne(schluessel)
+                eintrag = None
+            if eintrag is None:
+                self.fehlzugriffe += 1
+                return None
+            self.treffer += 1
+            self._eintraege.move_to_end(schluessel)
+            # Kein Schreiben je Treffer: die LRU-Reihenfolge steht im Speicher,
+            # die Datei erfährt die Zugriffszeit erst mit dem nächsten Schreiben
+            if self._db:
+                self._zugriffe[schluessel] = jetzt
+            return eintrag[1]
+
+    def speichere(self, schluessel, wert, eingabe=None):
+        # eingabe (optional) wird mitgespeichert, damit andere Worker den
+        # Eintrag über eintraege_seit() auch für ähnliche Eingaben nutzen können
+        jetzt = time.time()
+        with self._lock:
+            self._eintraege[schluessel] = (jetzt, wert)
+            self._eintraege.move_to_end(schluessel)
+            if self._db:
+                with self._db:
+                    self._schreibe_zugriffe()
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                        (schluessel, self.kontext, jetzt, jetzt, json.dumps(wert),
+                         None if eingabe is None else json.dumps(normierte_eingabe(eingabe))))
+            self._begrenze()
+
+    def _begrenze(self):
+        # Nur aus dem eigenen Speicher verdrängen, die Zeile in der Datei bleibt
+        while len(self._eintraege) > self.max_eintraege:
+            self._eintraege.popitem(last=False)
+            self.verdraengungen += 1
+
+    def _schreibe_zugriffe(self):
+        # Unter dem Lock und in einer Transaktion
+        if self._zugriffe:
+            self._db.executemany("UPDATE llm_cache SET zugriff = ? WHERE schluessel = ?",
+                                 [(zeit, schluessel) for schluessel, zeit in self._zugriffe.items()])
+            self._zugriffe.clear()
+
+    def eintraege_seit(self, seit):
+        # (erstellt, Eingabe, Wert) aller Einträge mit Eingabe, die nach `seit`
+        # in die SQLite-Datei geschrieben wurden, auch von anderen Workern
+        if not self._db:
+            return []
+        with self._lock:
+            zeilen = self._db.execute(
+                "SELECT erstellt, eingabe, wert FROM llm_cache "
+                "WHERE kontext = ? AND erstellt > ? AND erstellt >= ? AND eingabe IS NOT NULL ORDER BY erstellt",
+                (self.kontext, seit, time.time() - self.ttl)).fetchall()
+        return [(erstellt, dict(zip(PARTEIEN, json.loads(eingabe))), json.loads(wert))
+                for erstellt, eingabe, wert in zeilen]
+
+    def _entferne(self, schluessel):
+        # Abgelaufener Eintrag: aus dem Speicher und aus der Datei
+        del self._eintraege[schluessel]
+        self._zugriffe.pop(schluessel, None)
+        if self._db:
+            with self._db:
+                self._db.execute("DELETE FROM llm_cache WHERE schluessel = ?", (schluessel,))
+
+    def statistik(self):
+        with self._lock:
+            return {
+                "eintraege": len(self._eintraege),
+                "max_eintraege": self.max_eintraege,
+                "ttl": self.ttl,
+                "treffer": self.treffer,
+                "fehlzugriffe": self.fehlzugriffe,
+                "verdraengungen": self.verdraengungen,
+            }
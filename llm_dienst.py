@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+# Gemeinsame Ereignisschleife für alle LLM-Anfragen. Die Flask-Worker übergeben
+# ihre Anfrage an die Schleife und warten nur noch auf das Ergebnis; die
+# eigentlichen HTTP-Aufrufe laufen asynchron über einen einzigen Client.
+# Gleichzeitige Anfragen mit demselben Schlüssel teilen sich einen Aufruf
+# (Single-Flight), die Zahl paralleler Aufrufe ist global begrenzt. Schleife
+# und Client entstehen erst beim ersten Aufruf oder beim Vorwärmen.
+
+
+class LLMDienst:
+
+    def __init__(self, client_fabrik, max_parallel=8):
+        self._client_fabrik = client_fabrik
+        self.max_parallel = max_parallel
+        self._client = None
+        self._schleife = None
+        self._semaphore = None
+        self._laufend = {}
+        self._start_lock = threading.Lock()
+        self.aufrufe = 0
+        self.zusammengefasst = 0
+        self.aktiv = 0
+
+    def _starte(self):
+        with self._start_lock:
+            if self._schleife is not None:
+                return
+            schleife = asyncio.new_event_loop()
+            threading.Thread(target=schleife.run_forever, name="llm-dienst", daemon=True).start()
+            self._semaphore = asyncio.run_coroutine_threadsafe(
+                self._erzeuge_semaphore(), schleife).result()
+            self._schleife = schleife
+
+    async def _erzeuge_semaphore(self):
+        return asyncio.Semaphore(self.max_parallel)
+
+    def vorwaermen(self):
+        # Schleife starten und Client anlegen, bevor die erste Anfrage kommt
+        self._starte()
+        asyncio.run_coroutine_threadsafe(self._hole_client(), self._schleife).result()
+
+    async def _hole_client(self):
+        if self._client is None:
+            self._client = self._client_fabrik()
+        return self._client
+
+    def laeuft(self, schluessel):
+        # Ein Aufruf mit diesem Schlüssel ist unterwegs, ein weiterer würde sich anschließen
+        return schluessel in self._laufend
+
+    @property
+    def bereit(self):
+        return self._client is not None
+
+    def anfrage(self, schluessel, aufruf, timeout=None):
+        # `aufruf` ist eine Coroutine-Funktion, die den Client erhält
+        self._starte()
+        future = asyncio.run_coroutine_threadsafe(
+            self._einmalig(schluessel, aufruf), self._schleife)
+        return future.result(timeout)
+
+    async def _einmalig(self, schluessel, aufruf):
+        task = self._laufend.get(schluessel)
+        if task is None:
+            task = asyncio.ensure_future(self._begrenzt(aufruf))
+            self._laufend[schluessel] = task
+            task.add_done_callback(lambda _: self._laufend.pop(schluessel, None))
+        else:
+            self.zusammengefasst += 1
+        # shield: bricht ein Wartender ab, läuft der gemeinsame Aufruf weiter
+        return await asyncio.shield(task)
+
+    async def _begrenzt(self, aufruf):
+        async with self._semaphore:
+            client = await self._hole_client()
+            self.aufrufe += 1
+            self.aktiv += 1
+            try:
+                return await aufruf(client)
+            finally:
+                self.aktiv -= 1
+
+    def beende(self, timeout=10):
+        # Laufende Aufrufe höchstens `timeout` Sekunden abwarten, dann Client
+        # schließen und Schleife anhalten; ein späterer Aufruf startet neu
+        with self._start_lock:
+            schleife, self._schleife = self._schleife, None
+        if schleife is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._schliesse(timeout), schleife).result(timeout + 5)
+        finally:
+            schleife.call_soon_threadsafe(schleife.stop)
+
+    async def _schliesse(self, timeout):
+        if self._laufend:
+            await asyncio.wait(list(self._laufend.values()), timeout=timeout)
+        client, self._client = self._client, None
+        schliesse = getattr(client, "close", None)
+        if schliesse is not None:
+            await schliesse()
+
+    def statistik(self):
+        return {
+            "max_parallel": self.max_parallel,
+            "aktiv": self.aktiv,
+            "laufend": len(self._laufend),
+            "aufrufe": self.aufrufe,
+            "zusammengefasst": self.zusammengefasst,
+        }
@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+# Schutz für die LLM-Aufrufe: Frist je Anfrage, ein zweiter (gehedgter) Aufruf,
+# wenn der erste länger als ein Perzentil der bisherigen Antwortzeiten braucht,
+# und ein Leistungsschalter, der nach mehreren Fehlern in Folge keine Aufrufe
+# mehr durchlässt, bis nach einer Pause ein einzelner Probeaufruf gelingt.
+# Antworten mit ungültigem Inhalt (ValueError) zählen nicht als Ausfall.
+
+
+class SchalterOffen(Exception):
+    pass
+
+
+class FristUeberschritten(Exception):
+    pass
+
+
+class Leistungsschalter:
+
+    def __init__(self, fehler_schwelle=5, pause=30, uhr=time.monotonic):
+        self.fehler_schwelle = fehler_schwelle
+        self.pause = pause
+        self._uhr = uhr
+        self._lock = threading.Lock()
+        self.zustand = "geschlossen"
+        self.fehler_in_folge = 0
+        self.geoeffnet_um = None
+        self._probe_laeuft = False
+        self.oeffnungen = 0
+        self.abgewiesen = 0
+
+    def _pause_vorbei(self):
+        return self._uhr() - self.geoeffnet_um >= self.pause
+
+    def pruefe(self):
+        # Weist Anfragen schon vor der Warteschlange ab, ohne den Probeaufruf zu belegen
+        with self._lock:
+            if self.zustand == "offen" and not self._pause_vorbei():
+                self.abgewiesen += 1
+                raise SchalterOffen("Leistungsschalter offen, gpt-4o wird vorübergehend nicht gefragt")
+
+    def erlaube(self):
+        with self._lock:
+            if self.zustand == "offen" and self._pause_vorbei():
+                self.zustand = "halboffen"
+            elif self.zustand == "geschlossen":
+                return
+            if self.zustand == "offen" or self._probe_laeuft:
+                self.abgewiesen += 1
+                raise SchalterOffen(f"Leistungsschalter offen nach {self.fehler_in_folge} Fehlern in Folge")
+            self._probe_laeuft = True
+
+    def erfolg(self):
+        with self._lock:
+            self.zustand = "geschlossen"
+            self.fehler_in_folge = 0
+            self._probe_laeuft = False
+
+    def abbruch(self):
+        # Abgebrochener Aufruf: weder Erfolg noch Fehler, gibt nur den Probeaufruf frei
+        with self._lock:
+            self._probe_laeuft = False
+
+    def fehler(self):
+        with self._lock:
+            self.fehler_in_folge += 1
+            self._probe_laeuft = False
+            if self.zustand == "halboffen" or (
+                    self.zustand == "geschlossen" and self.fehler_in_folge >= self.fehler_schwelle):
+                self.zustand = "offen"
+                self.geoeffnet_um = self._uhr()
+                self.oeffnungen += 1
+
+    def statistik(self):
+        with self._lock:
+            return {
+                "zustand": self.zustand,
+                "fehler_in_folge": self.fehler_in_folge,
+                "fehler_schwelle": self.fehler_schwelle,
+                "pause": self.pause,
+                "oeffnungen": self.oeffnungen,
+                "abgewiesen": self.abgewiesen,
+            }
+
+
+class Latenzfenster:
+    # Antwortzeiten der letzten erfolgreichen Aufrufe
+
+    def __init__(self, groesse=200, mindestens=20):
+        self._werte = deque(maxlen=groesse)
+        self.mindestens = mindestens
+
+    def erfasse(self, sekunden):
+        self._werte.append(sekunden)
+
+    def perzentil(self, q):
+        werte = sorted(self._werte)
+        if len(werte) < self.mindestens:
+            return None
+        return werte[min(len(werte) - 1, int(q / 100 * len(werte)))]
+
+
+class LLMSchutz:
+
+    def __init__(self, frist=20, hedge_perzentil=95, hedge_start=2.0, schalter=None, fenster=None,
+                 hedge_erlaubt=None):
+        self.frist = frist
+        # hedge_perzentil 0 schaltet das Hedging ab; bis genug Messwerte da sind gilt hedge_start
+        self.hedge_perzentil = hedge_perzentil
+        self.hedge_start = hedge_start
+        self.schalter = schalter or Leistungsschalter()
+        self.fenster = fenster or Latenzfenster()
+        # Optionale Prüfung vor jedem Hedge-Aufruf, z. B. ob das Budget beim Anbieter reicht
+        self.hedge_erlaubt = hedge_erlaubt
+        self.aufrufe = 0
+        self.hedges = 0
+        self.hedges_ohne_budget = 0
+        self.hedges_gewonnen = 0
+        self.fristen_ueberschritten = 0
+
+    def hedge_verzoegerung(self):
+        if self.hedge_perzentil <= 0:
+            return None
+        wert = self.fenster.perzentil(self.hedge_perzentil)
+        return self.hedge_start if wert is None else wert
+
+    async def rufe(self, versuch):
+        # `versuch` ist eine Coroutine-Funktion ohne Argumente; sie wird beim
+        # Hedging ein zweites Mal gestartet, das erste gültige Ergebnis gewinnt
+        self.schalter.erlaube()
+        self.aufrufe += 1
+        # Während des Probeaufrufs kein Hedging, um die API nicht doppelt zu belasten
+        verzoegerung = self.hedge_verzoegerung() if self.schalter.zustand == "geschlossen" else None
+        try:
+            ergebnis = await asyncio.wait_for(self._mit_hedging(versuch, verzoegerung), self.frist)
+        except asyncio.TimeoutError:
+            self.fristen_ueberschritten += 1
+            self.schalter.fehler()
+            raise FristUeberschritten(f"keine Antwort innerhalb von {self.frist:g} s")
+        except ValueError:
+            self.schalter.erfolg()
+            raise
+        except asyncio.CancelledError:
+            self.schalter.abbruch()
+            raise
+        except Exception:
+            self.schalter.fehler()
+            raise
+        self.schalter.erfolg()
+        return ergebnis
+
+    async def _gemessen(self, versuch):
+        start = time.perf_counter()
+        ergebnis = await versuch()
+        self.fenster.erfasse(time.perf_counter() - start)
+        return ergebnis
+
+    async def _mit_hedging(self, versuch, verzoegerung):
+        aufgaben = [asyncio.ensure_future(self._gemessen(versuch))]
+        try:
+            if verzoegerung is not None:
+                fertig, _ = await asyncio.wait(aufgaben, timeout=verzoegerung)
+                if not fertig and self.hedge_erlaubt is not None and not self.hedge_erlaubt():
+                    self.hedges_ohne_budget += 1
+                elif not fertig:
+                    self.hedges += 1
+                    aufgaben.append(asyncio.ensure_future(self._gemessen(versuch)))
+            offen = set(aufgaben)
+            fehler = None
+            while offen:
+                fertig, offen = await asyncio.wait(offen, return_when=asyncio.FIRST_COMPLETED)
+                for aufgabe in fertig:
+                    if aufgabe.exception() is None:
+                        if aufgabe is not aufgaben[0]:
+                            self.hedges_gewonnen += 1
+                        return aufgabe.result()
+                    fehler = fehler or aufgabe.exception()
+            raise fehler
+        finally:
+            for aufgabe in aufgaben:
+                aufgabe.cancel()
+
+    def statistik(self):
+        verzoegerung = self.hedge_verzoegerung()
+        return {
+            "frist": self.frist,
+            "aufrufe": self.aufrufe,
+            "fristen_ueberschritten": self.fristen_ueberschritten,
+            "hedging": {
+                "perzentil": self.hedge_perzentil,
+                "verzoegerung_ms": None if verzoegerung is None else round(verzoegerung * 1000),
+                "gestartet": self.hedges,
+                "gewonnen": self.hedges_gewonnen,
+                "ohne_budget": self.hedges_ohne_budget,
+                "gewinnquote": round(self.hedges_gewonnen / self.hedges, 4) if self.hedges else None,
+            },
+            "schalter": self.schalter.statistik(),
+        }
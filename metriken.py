@@ -0,0 +1,232 @@
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+
+# Zähler und Latenz-Histogramme im Textformat von Prometheus (ohne weitere
+# Abhängigkeit). Jede Messung kostet nur eine Listensuche und ein Lock, daher
+# kann die Instrumentierung im Betrieb eingeschaltet bleiben.
+#
+# Die Werte entstehen je Prozess. Mit mehreren Workern (teile()) legt jeder
+# Prozess seinen Stand regelmäßig als Datei in einem gemeinsamen Verzeichnis
+# ab; /metrics summiert Zähler und Histogramme aller Worker, auch bereits
+# beendeter. Momentanwerte (gauge) erscheinen je laufendem Worker mit dem
+# Label worker=<pid>.
+
+STANDARD_GRENZEN = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+logger = logging.getLogger(__name__)
+
+
+def _labels(paare):
+    if not paare:
+        return ""
+    inhalt = ",".join(f'{n}="{_maskiere(w)}"' for n, w in paare)
+    return "{" + inhalt + "}"
+
+
+def _maskiere(wert):
+    return str(wert).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _zahl(wert):
+    return repr(float(wert)) if isinstance(wert, float) else str(wert)
+
+
+class Zaehler:
+    typ = "counter"
+
+    def __init__(self, name, hilfe, labels=()):
+        self.name = name
+        self.hilfe = hilfe
+        self.labels = tuple(labels)
+        # Zähler ohne Labels erscheinen von Anfang an mit 0
+        self._werte = {} if self.labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def erhoehe(self, wert=1, **labels):
+        schluessel = tuple(labels[n] for n in self.labels)
+        with self._lock:
+            self._werte[schluessel] = self._werte.get(schluessel, 0) + wert
+
+    def wert(self, **labels):
+        return self._werte.get(tuple(labels[n] for n in self.labels), 0)
+
+    def proben(self):
+        # (Name, Labelpaare, Wert) je Zeile der Exposition
+        with self._lock:
+            werte = sorted(self._werte.items())
+        for schluessel, wert in werte:
+            yield self.name, list(zip(self.labels, schluessel)), wert
+
+
+class Histogramm:
+    typ = "histogram"
+
+    def __init__(self, name, hilfe, labels=(), grenzen=STANDARD_GRENZEN):
+        self.name = name
+        self.hilfe = hilfe
+        self.labels = tuple(labels)
+        self.grenzen = tuple(grenzen)
+        # je Labelkombination: [Anzahl je Bucket (ohne +Inf), Summe, Anzahl]
+        self._werte = {}
+        self._lock = threading.Lock()
+
+    def beobachte(self, wert, **labels):
+        schluessel = tuple(labels[n] for n in self.labels)
+        index = bisect.bisect_left(self.grenzen, wert)
+        with self._lock:
+            eintrag = self._werte.get(schluessel)
+            if eintrag is None:
+                eintrag = self._werte[schluessel] = [[0] * len(self.grenzen), 0.0, 0]
+            if index < len(self.grenzen):
+                eintrag[0][index] += 1
+            eintrag[1] += wert
+            eintrag[2] += 1
+
+    def proben(self):
+        with self._lock:
+            werte = sorted((s, (list(e[0]), e[1], e[2])) for s, e in self._werte.items())
+        for schluessel, (buckets, summe, anzahl) in werte:
+            paare = list(zip(self.labels, schluessel))
+            kumuliert = 0
+            for grenze, n in zip(self.grenzen, buckets):
+                kumuliert += n
+                yield f"{self.name}_bucket", paare + [("le", _zahl(grenze))], kumuliert
+            yield f"{self.name}_bucket", paare + [("le", "+Inf")], anzahl
+            yield f"{self.name}_sum", paare, summe
+            yield f"{self.name}_count", paare, anzahl
+
+
+class Metriken:
+
+    def __init__(self):
+        self._metriken = []
+        self._sammler = []
+        self.verzeichnis = None
+        self._abgelegt = None
+        self._stopp = None
+
+    def zaehler(self, name, hilfe, labels=()):
+        zaehler = Zaehler(name, hilfe, labels)
+        self._metriken.append(zaehler)
+        return zaehler
+
+    def histogramm(self, name, hilfe, labels=(), grenzen=STANDARD_GRENZEN):
+        histogramm = Histogramm(name, hilfe, labels, grenzen)
+        self._metriken.append(histogramm)
+        return histogramm
+
+    def sammler(self, funktion):
+        # `funktion` wird erst beim Abruf aufgerufen und liefert Tupel
+        # (name, typ, hilfe, {labelname: wert} oder None, wert)
+        self._sammler.append(funktion)
+        return funktion
+
+    def _familien(self):
+        # Stand dieses Prozesses: (name, typ, hilfe, [(name, labelpaare, wert)])
+        familien = [(m.name, m.typ, m.hilfe, list(m.proben())) for m in self._metriken]
+        gesammelt = {}
+        for funktion in self._sammler:
+            for name, typ, hilfe, labels, wert in funktion():
+                familie = gesammelt.setdefault(name, (name, typ, hilfe, []))
+                familie[3].append((name, list((labels or {}).items()), wert))
+        return familien + list(gesammelt.values())
+
+    def exposition(self):
+        familien = self._familien() if self.verzeichnis is None else self.summen()
+        zeilen = []
+        for name, typ, hilfe, proben in familien:
+            zeilen.append(f"# HELP {name} {hilfe}")
+            zeilen.append(f"# TYPE {name} {typ}")
+            for probe, paare, wert in proben:
+                zeilen.append(f"{probe}{_labels(paare)} {_zahl(wert)}")
+        return "\n".join(zeilen) + "\n"
+
+    # Mehrere Prozesse
+
+    def teile(self, verzeichnis):
+        # Im Hauptprozess vor dem fork aufrufen; Stände eines früheren Laufs
+        # werden gelöscht, sonst zählten sie mit
+        os.makedirs(verzeichnis, exist_ok=True)
+        for pfad in glob.glob(os.path.join(verzeichnis, "metriken-*.json")):
+            os.remove(pfad)
+        self.verzeichnis = verzeichnis
+
+    def _datei(self, pid):
+        return os.path.join(self.verzeichnis, f"metriken-{pid}.json")
+
+    def _schreibe(self, pfad, familien):
+        # Atomar ersetzen, damit andere Prozesse nie eine halbe Datei lesen
+        temp = f"{pfad}.{threading.get_ident()}.tmp"
+        with open(temp, "w", encoding="utf-8") as datei:
+            json.dump(familien, datei, ensure_ascii=False)
+        os.replace(temp, pfad)
+
+    def lege_ab(self):
+        # Eigenen Stand ins gemeinsame Verzeichnis schreiben (nur bei Änderung)
+        if self.verzeichnis is None:
+            return
+        familien = self._familien()
+        if familien != self._abgelegt:
+            self._schreibe(self._datei(os.getpid()), familien)
+            self._abgelegt = familien
+
+    def summen(self):
+        # Stände aller Worker zusammengefasst; eigener Stand zuvor aktualisiert
+        self.lege_ab()
+        familien = {}
+        for pfad in sorted(glob.glob(os.path.join(self.verzeichnis, "metriken-*.json"))):
+            pid = os.path.basename(pfad)[len("metriken-"):-len(".json")]
+            try:
+                with open(pfad, encoding="utf-8") as datei:
+                    stand = json.load(datei)
+            except (OSError, ValueError):
+                continue
+            for name, typ, hilfe, proben in stand:
+                werte = familien.setdefault(name, (typ, hilfe, {}))[2]
+                for probe, paare, wert in proben:
+                    paare = tuple(map(tuple, paare))
+                    if typ == "gauge":
+                        paare += (("worker", pid),)
+                    werte[(probe, paare)] = werte.get((probe, paare), 0) + wert
+        return [(name, typ, hilfe, [(probe, paare, wert) for (probe, paare), wert in werte.items()])
+                for name, (typ, hilfe, werte) in familien.items()]
+
+    def starte_abgleich(self, intervall=1.0):
+        # Im Worker nach dem fork: Stand regelmäßig ablegen, damit auch Worker,
+        # die /metrics gerade nicht beantworten, aktuell in der Summe stehen
+        if self.verzeichnis is None:
+            return
+        self._abgelegt = None
+        self._stopp = threading.Event()
+
+        def schleife(stopp):
+            while not stopp.wait(intervall):
+                try:
+                    self.lege_ab()
+                except OSError as e:
+                    logger.warning("Metriken konnten nicht abgelegt werden: %s", e)
+
+        threading.Thread(target=schleife, args=(self._stopp,), name="metriken", daemon=True).start()
+
+    def beende_abgleich(self):
+        # Beim Beenden des Workers: letzter Stand, damit seine Zähler erhalten bleiben
+        if self._stopp is not None:
+            self._stopp.set()
+        self.lege_ab()
+
+    def prozess_beendet(self, pid):
+        # Im Hauptprozess, wenn ein Worker beendet ist: Zähler und Histogramme
+        # bleiben in der Summe, seine Momentanwerte entfallen
+        if self.verzeichnis is None:
+            return
+        pfad = self._datei(pid)
+        try:
+            with open(pfad, encoding="utf-8") as datei:
+                stand = json.load(datei)
+        except (OSError, ValueError):
+            return
+        self._schreibe(pfad, [familie for familie in stand if familie[1] != "gauge"])
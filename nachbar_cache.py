@@ -0,0 +1,144 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from direktmandate import DIREKTMANDATE, runde_auf_summe
+from llm_cache import normierte_eingabe
+from wahlkreisdaten import PARTEIEN
+
+# Ähnlichkeits-Cache für die Direktmandate aus dem LLM: Umfragen ändern sich
+# zwischen zwei Veröffentlichungen meist nur um ein bis zwei Punkte, daher
+# werden gespeicherte Antworten auch für nahe Eingaben genutzt. Nah heißt: jede
+# Partei weicht um höchstens `toleranz` Prozentpunkte ab (Maximumsnorm).
+#
+# Index: Gitter mit Zellbreite `toleranz` über die GITTER_PARTEIEN; jeder
+# Nachbar liegt in der eigenen oder einer angrenzenden Zelle (3^4 = 81 Zellen),
+# die Kandidaten werden dann über alle 8 Parteien auf einmal geprüft. Die
+# Vektoren liegen in einem festen Array, verdrängt wird der am längsten nicht
+# genutzte Eintrag.
+
+GITTER_PARTEIEN = ("CDU", "B90/Grüne", "AfD", "SPD")
+_GITTER_SPALTEN = [PARTEIEN.index(p) for p in GITTER_PARTEIEN]
+# Zellen als eine ganze Zahl (Stellenwertsystem), damit die 81 Nachbarzellen
+# ohne Tupelbildung gefunden werden
+_BASIS = 1 << 20
+_VERSAETZE = [sum(v * _BASIS ** i for i, v in enumerate(versatz))
+              for versatz in itertools.product((-1, 0, 1), repeat=len(GITTER_PARTEIEN))]
+
+
+class NachbarCache:
+
+    def __init__(self, toleranz=1.0, max_eintraege=50_000, nachbarn=4):
+        self.toleranz = toleranz
+        self.max_eintraege = max_eintraege
+        self.nachbarn = nachbarn
+        self._vektoren = np.zeros((max_eintraege, len(PARTEIEN)))
+        self._werte = [None] * max_eintraege
+        self._zellen = {}
+        self._zelle_von = [None] * max_eintraege
+        self._schluessel_von = [None] * max_eintraege
+        # Schlüssel (Eingabe als Tupel) -> Platz, in LRU-Reihenfolge
+        self._plaetze = OrderedDict()
+        self._frei = list(range(max_eintraege - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.treffer = 0
+        self.fehlzugriffe = 0
+        self.verdraengungen = 0
+
+    def _zelle(self, vektor):
+        return sum(int(vektor[spalte] // self.toleranz) * _BASIS ** i for i, spalte in enumerate(_GITTER_SPALTEN))
+
+    def speichere(self, eingabe, direktmandate):
+        if self.toleranz <= 0:
+            return
+        vektor = normierte_eingabe(eingabe)
+        schluessel = tuple(vektor)
+        with self._lock:
+            platz = self._plaetze.get(schluessel)
+            if platz is None:
+                if not self._frei:
+                    self._entferne(next(iter(self._plaetze)))
+                    self.verdraengungen += 1
+                platz = self._frei.pop()
+                self._plaetze[schluessel] = platz
+                self._vektoren[platz] = vektor
+                zelle = self._zelle(vektor)
+                self._zellen.setdefault(zelle, set()).add(platz)
+                self._zelle_von[platz] = zelle
+                self._schluessel_von[platz] = schluessel
+            self._plaetze.move_to_end(schluessel)
+            self._werte[platz] = [direktmandate.get(p, 0) for p in PARTEIEN]
+
+    def _entferne(self, schluessel):
+        platz = self._plaetze.pop(schluessel)
+        zelle = self._zelle_von[platz]
+        plaetze = self._zellen[zelle]
+        plaetze.discard(platz)
+        if not plaetze:
+            del self._zellen[zelle]
+        self._werte[platz] = self._zelle_von[platz] = self._schluessel_von[platz] = None
+        self._frei.append(platz)
+
+    def _kandidaten(self, vektor):
+        # Plätze im Umkreis von `toleranz`, nach Abstand sortiert, höchstens `nachbarn`
+        basis = self._zelle(vektor)
+        zellen = self._zellen
+        plaetze = []
+        for versatz in _VERSAETZE:
+            zelle = zellen.get(basis + versatz)
+            if zelle:
+                plaetze.extend(zelle)
+        if not plaetze:
+            return [], None
+        plaetze = np.fromiter(plaetze, dtype=np.intp, count=len(plaetze))
+        abstand = np.abs(self._vektoren[plaetze] - vektor).max(axis=1)
+        nah = abstand <= self.toleranz + 1e-9
+        plaetze, abstand = plaetze[nah], abstand[nah]
+        reihenfolge = np.argsort(abstand, kind="stable")[:self.nachbarn]
+        return plaetze[reihenfolge], abstand[reihenfolge]
+
+    def hat_nachbarn(self, eingabe):
+        # Ohne Zähler und LRU-Reihenfolge zu verändern
+        if self.toleranz <= 0:
+            return False
+        with self._lock:
+            return len(self._kandidaten(np.array(normierte_eingabe(eingabe), dtype=float))[0]) > 0
+
+    def suche(self, eingabe):
+        # Liefert (Direktmandate, Anzahl Nachbarn, größter Abstand) oder None.
+        # Bei mehreren Nachbarn wird nach inversem Abstand gemittelt und wieder
+        # auf 70 ganze Mandate gerundet.
+        if self.toleranz <= 0:
+            return None
+        vektor = np.array(normierte_eingabe(eingabe), dtype=float)
+        with self._lock:
+            plaetze, abstand = self._kandidaten(vektor)
+            if not len(plaetze):
+                self.fehlzugriffe += 1
+                return None
+            self.treffer += 1
+            werte = np.array([self._werte[p] for p in plaetze], dtype=float)
+            for platz in plaetze:
+                self._plaetze.move_to_end(self._schluessel_von[platz])
+        if abstand[0] == 0:
+            mittel = werte[0]
+        else:
+            gewichte = 1 / abstand
+            mittel = gewichte @ werte / gewichte.sum()
+        direktmandate = runde_auf_summe(mittel, int(round(werte[0].sum())) or DIREKTMANDATE)
+        return dict(zip(PARTEIEN, direktmandate.tolist())), len(plaetze), float(abstand.max())
+
+    def statistik(self):
+        with self._lock:
+            return {
+                "eintraege": len(self._plaetze),
+                "max_eintraege": self.max_eintraege,
+                "toleranz": self.toleranz,
+                "nachbarn": self.nachbarn,
+                "zellen": len(self._zellen),
+                "treffer": self.treffer,
+                "fehlzugriffe": self.fehlzugriffe,
+                "verdraengungen": self.verdraengungen,
+            }
@@ -1,66 +1,208 @@
-from flask import Flask, request, render_template_string
-from openai import OpenAI
+import time
+
+# Beginn des Imports, Bezugspunkt für die Startzeiten unter /metrics
+_IMPORT_START = time.perf_counter()
+
+from flask import Flask, request, jsonify, Response, stream_with_context, url_for, g, has_request_context
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from jinja2 import DictLoader
 import os
 from dotenv import load_dotenv
+from contextlib import contextmanager
+import asyncio
+import gzip
+import hashlib
 import json
-import math
-import re
+import logging
+import tempfile
+import threading
+from sitzverteilung import (HINWEIS_OHNE_SITZE, STANDARD_VERFAHREN, VERFAHREN, berechne_verteilung,
+                            analysiere_schwellen, vergleiche_verfahren)
+from wahlkreisdaten import PARTEIEN
+from direktmandate import schaetze_direktmandate
+from llm_cache import LLMCache, kontext_hash
+from nachbar_cache import NachbarCache
+from llm_dienst import LLMDienst
+from batch import werte_aus, lies_szenario
+from simulation import begrenze_prozesse, simuliere, fasse_zusammen
+from koalitionen import analysiere_koalitionen, koalitionswahrscheinlichkeiten
+from prompt import PROTOKOLLE, AntwortFehler, TokenVerbrauch, baue_anfrage, lies_antwort, system_prompt_fuer
+from metriken import Metriken
+from llm_schutz import LLMSchutz, Leistungsschalter, SchalterOffen, FristUeberschritten
+from zulassung import GeteilteBudgets, Tokenbucket, Zulassung, ZulassungAbgelehnt
+import kalibrierung
+import server
+from stichproben import konsens, pruefe_stichprobe
+from umfragen import ENGINE_VERSION_LOKAL, Umfragespeicher
 
 # .env laden (falls vorhanden)
 load_dotenv()
 
-# OpenAI-Client initialisieren
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Frist je gpt-4o-Anfrage in Sekunden (inkl. Hedging und Wiederholungen des Clients)
+LLM_FRIST = float(os.getenv("LLM_FRIST", 20))
+
+# Nach der ersten beantworteten Anfrage openai laden und den Client anlegen,
+# damit die erste gpt-4o-Anfrage nicht darauf warten muss (0 = erst bei Bedarf)
+LLM_VORWAERMEN = os.getenv("LLM_VORWAERMEN", "1") == "1"
+
+
+def erzeuge_llm_client():
+    # openai (mit pydantic und httpx) kostet beim Import mehrere hundert
+    # Millisekunden und wird daher erst hier geladen, nicht beim Start
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None,
+                       timeout=LLM_FRIST)
+
+
+# OpenAI-Client (asynchron) für alle Anfragen, höchstens LLM_MAX_PARALLEL gleichzeitig.
+# OPENAI_BASE_URL lenkt die Anfragen um, z. B. auf den Stub für Lasttests.
+llm_dienst = LLMDienst(erzeuge_llm_client, max_parallel=int(os.getenv("LLM_MAX_PARALLEL", 8)))
+
+# Zweiter Aufruf, wenn der erste länger als das LLM_HEDGE_PERZENTIL der letzten
+# Antwortzeiten braucht (0 = aus); Leistungsschalter nach LLM_SCHALTER_FEHLER
+# Fehlern in Folge für LLM_SCHALTER_PAUSE Sekunden
+llm_schutz = LLMSchutz(
+    frist=LLM_FRIST,
+    hedge_perzentil=float(os.getenv("LLM_HEDGE_PERZENTIL", 95)),
+    hedge_start=float(os.getenv("LLM_HEDGE_START", 2.0)),
+    schalter=Leistungsschalter(
+        fehler_schwelle=int(os.getenv("LLM_SCHALTER_FEHLER", 5)),
+        pause=float(os.getenv("LLM_SCHALTER_PAUSE", 30)),
+    ),
+)
+
+# Budget beim Anbieter: LLM_RPM Anfragen und LLM_TPM Tokens je Minute, Bursts
+# bis LLM_BURST_SEKUNDEN; die Tokens je Anfrage werden aus den bisherigen
+# Antworten gemittelt (anfangs LLM_TOKENS_JE_ANFRAGE). Die Buckets liegen in
+# LLM_BUDGET_PFAD und gelten damit für alle Worker des Hosts ("" = je Prozess).
+# Höchstens LLM_WARTESCHLANGE Anfragen warten (je Worker), davon
+# LLM_WARTESCHLANGE_JE_CLIENT je Client, jeweils bis LLM_MAX_WARTEZEIT
+# Sekunden; danach 429 bzw. die Ersatzquelle.
+LLM_RPM = float(os.getenv("LLM_RPM", 500))
+LLM_TPM = float(os.getenv("LLM_TPM", 30000))
+LLM_BURST_SEKUNDEN = float(os.getenv("LLM_BURST_SEKUNDEN", 10))
+LLM_TOKENS_JE_ANFRAGE = float(os.getenv("LLM_TOKENS_JE_ANFRAGE", 2000))
+LLM_BUDGET_PFAD = os.getenv("LLM_BUDGET_PFAD", "llm_budget.sqlite3")
+geteilte_budgets = GeteilteBudgets(LLM_BUDGET_PFAD) if LLM_BUDGET_PFAD else None
+
+
+def _bucket(name, rate, kapazitaet):
+    if geteilte_budgets is None:
+        return Tokenbucket(rate, kapazitaet)
+    return geteilte_budgets.bucket(name, rate, kapazitaet)
+
+
+zulassung = Zulassung(
+    budgets=[
+        (_bucket("anfragen", LLM_RPM / 60, max(1.0, LLM_RPM / 60 * LLM_BURST_SEKUNDEN)),
+         lambda: aufrufe_je_anfrage()),
+        (_bucket("tokens", LLM_TPM / 60, max(LLM_TOKENS_JE_ANFRAGE, LLM_TPM / 60 * LLM_BURST_SEKUNDEN)),
+         lambda: (token_verbrauch.tokens_je_anfrage() or LLM_TOKENS_JE_ANFRAGE) * aufrufe_je_anfrage()),
+    ],
+    max_warteschlange=int(os.getenv("LLM_WARTESCHLANGE", 32)),
+    max_je_client=int(os.getenv("LLM_WARTESCHLANGE_JE_CLIENT", 4)),
+    max_wartezeit=float(os.getenv("LLM_MAX_WARTEZEIT", 5)),
+    **({"transaktion": geteilte_budgets.transaktion} if geteilte_budgets else {}),
+)
+# Hedge-Aufrufe nur, wenn niemand wartet und das Budget reicht
+llm_schutz.hedge_erlaubt = zulassung.nimm_sofort
 
 app = Flask(__name__)
 
+# Quelle der Direktmandate: "llm" (gpt-4o), "local" (Swing-Modell auf Basis
+# der Landtagswahl 2021) oder "local-then-llm" (gpt-4o, bei Fehlern lokal)
+ENGINES = ("llm", "local", "local-then-llm")
+DIREKTMANDATE_ENGINE = os.getenv("DIREKTMANDATE_ENGINE", "llm")
+
+# Ersatzquelle für "llm", solange der Leistungsschalter offen ist, die Frist
+# überschritten wird oder die Zulassung ablehnt: "local" oder "" (dann
+# Fehlermeldung bzw. 429 mit Retry-After)
+LLM_FALLBACK = os.getenv("LLM_FALLBACK", "local")
+
+LLM_MODELL = "gpt-4o"
+LLM_TEMPERATUR = 0.3
+
+# "kompakt": kurzer Prompt mit JSON-Schema-Antwort, "text": ursprünglicher Freitext-Prompt
+LLM_PROTOKOLL = os.getenv("LLM_PROTOKOLL", "kompakt")
+if LLM_PROTOKOLL not in PROTOKOLLE:
+    raise ValueError(f"Unbekanntes LLM-Protokoll: {LLM_PROTOKOLL}")
+
+# Ensemble (optional): LLM_STICHPROBEN Antworten je Prognose, Konsens per
+# Median. Standard ist 1, also eine Antwort wie bisher, mit unveränderten
+# Cache-Schlüsseln. Mit k > 1 kostet jede Prognose etwa k-mal so viele
+# Completion-Tokens, dauert länger und belegt eigene Cache-Einträge; mindestens
+# die Hälfte der Stichproben muss gültig sein, sonst schlägt die Anfrage fehl.
+# "n": alle in einem Aufruf über den Parameter n; "parallel": gleichzeitige
+# Einzelaufrufe. Lehnt der Anbieter n ab, wird automatisch auf "parallel"
+# gewechselt.
+LLM_STICHPROBEN = max(1, int(os.getenv("LLM_STICHPROBEN", 1)))
+LLM_STICHPROBEN_ART = os.getenv("LLM_STICHPROBEN_ART", "n")
+if LLM_STICHPROBEN_ART not in ("n", "parallel"):
+    raise ValueError(f"Unbekannte Art der Stichproben: {LLM_STICHPROBEN_ART}")
+_stichproben_art = {"art": LLM_STICHPROBEN_ART}
+
+
+def aufrufe_je_anfrage():
+    # API-Aufrufe, die eine Prognose beim Anbieter kostet
+    return LLM_STICHPROBEN if _stichproben_art["art"] == "parallel" else 1
+
+
+# Zweistufige Antwort: sofort eine lokale Schätzung, das gpt-4o-Ergebnis wird
+# per Server-Sent Events nachgeladen
+PROGNOSE_STREAMING = os.getenv("PROGNOSE_STREAMING", "0") == "1"
+# Den Stream öffnet nur eine signierte Freigabe aus POST /prognose, sonst
+# könnte jede GET-Anfrage einen bezahlten Aufruf starten. Der Schlüssel
+# entsteht im Hauptprozess (preload) und gilt damit für alle Worker; bei
+# mehreren Hosts STREAM_SCHLUESSEL setzen.
+STREAM_GUELTIGKEIT = int(os.getenv("STREAM_GUELTIGKEIT", 60))
+stream_freigabe = URLSafeTimedSerializer(os.getenv("STREAM_SCHLUESSEL") or os.urandom(32).hex(),
+                                         salt="prognose-stream")
+
+# Parallele Direktmandate-Anfragen je Batch-Anfrage
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", 4))
+
+# gzip-Stufe für HTML-Antworten (0 = aus)
+HTML_KOMPRESSION = int(os.getenv("HTML_KOMPRESSION", 6))
+
+# Eine strukturierte Logzeile (JSON) je Anfrage mit den Dauern der einzelnen Stufen
+ANFRAGE_LOG = os.getenv("ANFRAGE_LOG", "0") == "1"
+
+logger = logging.getLogger(__name__)
+if ANFRAGE_LOG:
+    logging.basicConfig(level=logging.INFO)
+
+# Metriken im Prometheus-Format unter /metrics. Im Produktionsbetrieb legen
+# die Worker ihre Stände in METRIKEN_VERZEICHNIS ab (Standard: neues
+# temporäres Verzeichnis), /metrics zeigt die Summe aller Worker.
+METRIKEN_VERZEICHNIS = os.getenv("METRIKEN_VERZEICHNIS", "")
+metriken = Metriken()
+anfrage_dauer = metriken.histogramm(
+    "http_anfrage_sekunden", "Dauer der HTTP-Anfragen", ("pfad", "methode", "status"))
+stufen_dauer = metriken.histogramm(
+    "prognose_stufe_sekunden", "Dauer der einzelnen Stufen einer Prognose", ("stufe",))
+llm_fehler = metriken.zaehler(
+    "llm_fehler_gesamt", "Fehlgeschlagene Aufrufe der OpenAI-API")
+llm_fallbacks = metriken.zaehler(
+    "llm_fallback_gesamt", "Anfragen, die wegen offenem Schalter oder Frist lokal beantwortet wurden")
+llm_parse_fehler = metriken.zaehler(
+    "llm_parse_fehler_gesamt", "LLM-Antworten, aus denen keine Direktmandate gelesen werden konnten")
+eingabe_abgelehnt = metriken.zaehler(
+    "eingabe_abgelehnt_gesamt", "Abgelehnte Eingaben", ("grund",))
+groessenschritte = metriken.zaehler(
+    "sitzverteilung_groessenschritte_gesamt",
+    "Schritte von der Mindestgröße bis zur endgültigen Größe des Landtags (Ausgleichsmandate)")
+berechnungen = metriken.zaehler(
+    "sitzverteilung_berechnungen_gesamt", "Berechnete Sitzverteilungen")
+zulassung_wartezeit = metriken.histogramm(
+    "llm_zulassung_wartezeit_sekunden", "Wartezeit in der Warteschlange vor dem LLM-Aufruf")
+
 # Minimaler HTML-Code mit horizontalem Layout
 html_template = """
 <!doctype html>
 <html>
 <head>
   <title>Sitzverteilung BW 2026</title>
-  <style>
-    body {
-      display: flex;
-      justify-content: center;
-      align-items: flex-start;
-      flex-direction: column;
-      min-height: 100vh;
-      font-family: Arial, sans-serif;
-      text-align: center;
-      padding-top: 0;
-    }
-    .container {
-      display: flex;
-      justify-content: center;
-      align-items: flex-start;
-      gap: 50px;
-      margin-top: 20px;
-    }
-    form {
-      width: 280px;
-      text-align: left;
-    }
-    form input[type="number"] {
-      width: 100%;
-      padding: 5px;
-    }
-    table {
-      border-collapse: collapse;
-      width: 100%;
-    }
-    table, th, td {
-      border: 1px solid #444;
-    }
-    th, td {
-      padding: 8px 12px;
-    }
-    .result-box {
-      width: 340px;
-      text-align: left;
-    }
-  </style>
+  <link rel="stylesheet" href="{{ stylesheet_url }}">
 </head>
 <body>
   <h2>Schätzung der Sitzverteilung im Landtag von Baden-Württemberg<br>aufgrund Prognosen zur Landtagswahl 2026</h2>
@@ -71,292 +213,880 @@ html_template = """
         <label>{{party}} (%):</label><br>
         <input name="{{party}}" type="number" min="0" max="100" required><br><br>
       {% endfor %}
+      <label>Direktmandate:</label><br>
+      <select name="engine">
+        {% for option, text in [("llm", "gpt-4o"), ("local", "Lokales Swing-Modell"), ("local-then-llm", "gpt-4o, ersatzweise lokal")] %}
+          <option value="{{ option }}" {% if option == engine %}selected{% endif %}>{{ text }}</option>
+        {% endfor %}
+      </select><br><br>
       <input type="submit" value="Absenden">
     </form>
 
     {% if result %}
-      <div class="result-box">
-        <h3>Ergebnis:</h3>
-        <table>
-          <tr>
-            <th>Partei</th>
-            <th>Zweitstimmen (%)</th>
-            <th>Sitze</th>
-          </tr>
-          {% for party in ["CDU", "B90/Grüne", "AfD", "SPD", "Linke", "FDP", "BSW"] %}
-          <tr>
-            <td>{{ party }}</td>
-            <td>{{ eingabe[party] if eingabe and party in eingabe else "-" }}</td>
-            <td>{{ result.get(party, 0) }}</td>
-          </tr>
-          {% endfor %}
-          <tr>
-            <td><strong>Gesamt</strong></td>
-            <td>100</td>
-            <td><strong>{{ result.get("Gesamtzahl der Sitze", "?") }}</strong></td>
-          </tr>
-        </table>
-
-        <p><strong>Hinweis:</strong> {{ result['Hinweis'] }}</p>
-      </div>
+      {% include "ergebnis.html" %}
     {% endif %}
   </div>
+
+  {% if stream_url %}
+  <script>
+    // Vorläufiges Ergebnis durch das nachgeladene gpt-4o-Ergebnis ersetzen
+    (function () {
+      var quelle = new EventSource({{ stream_url|tojson }});
+      quelle.addEventListener("ergebnis", function (ereignis) {
+        document.querySelector(".result-box").outerHTML = ereignis.data;
+        quelle.close();
+      });
+      // Abgewiesen (z. B. Budget erschöpft): vorläufige Schätzung bleibt stehen
+      quelle.addEventListener("fehler", function (ereignis) {
+        var fehler = JSON.parse(ereignis.data);
+        document.querySelector(".result-box p:last-child").textContent = "Hinweis: " + fehler.hinweis;
+        quelle.close();
+      });
+      quelle.onerror = function () {
+        quelle.close();
+      };
+    })();
+  </script>
+  {% endif %}
 </body>
 </html>
 """
 
-# system_prompt
-system_prompt = """
-Du bist ein Prognosetool zur Schätzung der Direktmandate bei der Landtagswahl Baden-Württemberg 2026. Grundlage ist eine Wahlprognose mit Zweitstimmenanteilen in Prozent.
-
-Aufgabe:
-Schätze, wie viele der 70 Direktmandate (Mehrheitswahl) jede Partei in den 70 Wahlkreisen von Baden-Württemberg gewinnt. Gehe vereinfachend davon aus, dass Erst- und Zweitstimmen gleich verteilt sind.
-
-Datenbasis:
-Nutze typische regionale Muster der Bundestagswahl 2025. 
-Die folgende Tabelle enthält die Bundestagswahlzweitstimmenverteilung in den 37 Bundestagswahlkreisen in BW (in Dezimalwerten):
-
-Wahlkreis,CDU,B90/Grüne,AfD,SPD,Linke,FDP,BSW,Sonstige
-Baden-Württemberg,0.32,0.14,0.2,0.14,0.07,0.06,0.04,0.04
-Stuttgart I,0.26,0.25,0.09,0.15,0.11,0.07,0.03,0.03
-Stuttgart II,0.27,0.17,0.14,0.16,0.11,0.06,0.05,0.04
-Böblingen,0.33,0.14,0.18,0.14,0.06,0.07,0.04,0.04
-Esslingen,0.33,0.15,0.16,0.16,0.07,0.06,0.04,0.04
-Nürtingen,0.34,0.14,0.18,0.14,0.06,0.07,0.04,0.04
-Göppingen,0.33,0.09,0.23,0.14,0.05,0.06,0.04,0.04
-Waiblingen,0.33,0.13,0.19,0.15,0.06,0.07,0.04,0.04
-Ludwigsburg,0.32,0.15,0.17,0.15,0.07,0.06,0.04,0.04
-Neckar-Zaber,0.33,0.12,0.2,0.14,0.05,0.06,0.04,0.05
-Heilbronn,0.29,0.09,0.25,0.14,0.06,0.06,0.04,0.05
-Schwäbisch Hall - Hohenlohe,0.32,0.1,0.25,0.13,0.05,0.06,0.04,0.05
-Backnang - Schwäisch Gmünd,0.33,0.11,0.23,0.14,0.06,0.05,0.04,0.04
-Aalen - Heidenheim,0.35,0.09,0.23,0.14,0.05,0.05,0.04,0.04
-Karlsruhe-Stadt,0.22,0.24,0.14,0.16,0.11,0.05,0.04,0.04
-Karlsruhe-Land,0.33,0.13,0.19,0.15,0.06,0.06,0.04,0.04
-Rastatt,0.33,0.11,0.23,0.14,0.05,0.05,0.04,0.04
-Heidelberg,0.26,0.22,0.12,0.17,0.1,0.06,0.03,0.04
-Mannheim,0.23,0.16,0.18,0.18,0.11,0.05,0.05,0.04
-Odenwald - Tauber,0.36,0.08,0.24,0.13,0.05,0.05,0.04,0.05
-Rhein-Neckar,0.31,0.12,0.21,0.16,0.06,0.06,0.04,0.04
-Bruchsal - Schwetzingen,0.32,0.11,0.22,0.14,0.06,0.05,0.04,0.05
-Pforzheim,0.3,0.11,0.25,0.13,0.05,0.06,0.04,0.04
-Calw,0.34,0.09,0.26,0.12,0.05,0.06,0.04,0.05
-Freiburg,0.22,0.27,0.1,0.15,0.14,0.04,0.04,0.04
-Lörrach - Müllheim,0.29,0.15,0.18,0.16,0.07,0.05,0.04,0.05
-Emmendingen- Lahr,0.32,0.13,0.19,0.16,0.06,0.05,0.04,0.05
-Offenburg,0.34,0.11,0.22,0.13,0.06,0.05,0.05,0.05
-Rottweil - Tuttlingen,0.34,0.08,0.27,0.11,0.05,0.06,0.05,0.05
-Schwarzwald-Baar,0.34,0.1,0.24,0.13,0.05,0.05,0.04,0.05
-Konstanz,0.3,0.17,0.18,0.13,0.07,0.06,0.04,0.04
-Waldshut,0.34,0.14,0.19,0.14,0.06,0.05,0.04,0.05
-Reutlingen,0.33,0.12,0.21,0.13,0.06,0.06,0.05,0.04
-Tübingen,0.29,0.19,0.16,0.14,0.1,0.05,0.04,0.04
-Ulm,0.34,0.14,0.19,0.13,0.06,0.05,0.04,0.04
-Biberach,0.38,0.1,0.23,0.1,0.05,0.05,0.04,0.05
-Bodensee,0.35,0.14,0.19,0.13,0.06,0.06,0.04,0.04
-Ravensburg,0.35,0.13,0.19,0.12,0.06,0.05,0.04,0.05
-Zollernalb - Sigmaringen,0.37,0.08,0.26,0.11,0.05,0.05,0.04,0.04
-
-Hier als Hilfestellung das Ergebnis der Landtagswahl nach (70) Wahlkreisen:
-Wahlkreis,"Wahljahr","Wahlbeteiligung". "GRÜNE","CDU","AfD","SPD","FDP","Linke","Sonstige"
-01 Stuttgart I,2021,69.4,44.8,17.9,3.3,9.4,10.1,7.5,7.0
-02 Stuttgart II,2021,69.9,39.8,21.7,4.9,10.0,12.9,4.4,6.3
-03 Stuttgart III,2021,59.9,33.9,24.3,8.0,12.2,10.6,4.8,6.2
-04 Stuttgart IV,2021,59.6,35.6,21.5,5.8,13.2,9.7,7.0,7.0
-05 Böblingen,2021,63.3,31.4,25.3,9.4,13.1,11.4,2.3,7.0
-06 Leonberg,2021,68.7,32.7,26.0,8.2,10.6,11.7,2.3,8.5
-07 Esslingen,2021,65.6,35.7,23.8,7.2,14.2,9.4,3.8,6.0
-08 Kirchheim,2021,67.3,33.1,24.4,9.5,12.6,10.3,2.8,7.2
-09 Nürtingen,2021,67.7,38.8,21.6,9.1,9.2,11.6,2.6,7.2
-10 Göppingen,2021,60.0,28.8,26.5,12.3,12.3,8.9,2.1,9.1
-11 Geislingen,2021,65.6,27.5,27.9,11.5,14.4,10.3,2.3,6.0
-12 Ludwigsburg,2021,64.2,34.6,22.2,8.7,12.1,11.2,4.2,7.1
-13 Vaihingen,2021,69.2,34.9,24.8,8.6,9.2,11.1,2.7,8.7
-14 Bietigheim-Bissingen,2021,66.6,34.2,24.5,9.2,10.6,10.9,2.8,7.8
-15 Waiblingen,2021,65.2,30.0,25.1,8.1,10.8,13.3,3.1,9.6
-16 Schorndorf,2021,67.7,29.7,24.2,9.9,10.4,16.3,2.6,6.8
-17 Backnang,2021,64.0,24.0,23.2,12.1,19.0,10.5,2.4,8.7
-18 Heilbronn,2021,60.3,30.0,23.0,12.0,11.6,12.3,3.6,7.6
-19 Eppingen,2021,65.4,26.3,24.5,13.7,11.1,13.4,2.6,8.3
-20 Neckarsulm,2021,64.5,27.4,25.0,13.9,12.7,9.9,3.0,8.1
-21 Hohenlohe,2021,62.9,28.7,24.4,14.1,11.9,10.9,2.8,7.2
-22 Schwäbisch Hall,2021,61.5,28.7,23.2,12.5,11.3,13.1,3.3,7.8
-23 Main-Tauber,2021,63.8,27.1,29.5,10.6,10.4,8.4,2.4,11.4
-24 Heidenheim,2021,60.1,25.8,22.4,11.4,20.2,7.6,2.6,10.0
-25 Schwäbisch Gmünd,2021,64.1,30.1,25.8,12.0,10.8,10.8,3.4,7.0
-26 Aalen,2021,63.9,25.0,29.8,9.5,10.0,9.1,2.7,13.9
-27 Karlsruhe I,2021,63.9,39.1,17.5,6.7,11.8,8.2,6.9,9.8
-28 Karlsruhe II,2021,58.9,38.6,18.4,7.5,12.0,7.3,6.7,9.4
-29 Bruchsal,2021,63.8,26.3,27.1,13.2,11.8,9.7,2.6,9.3
-30 Bretten,2021,65.9,32.0,23.0,11.2,10.8,11.4,2.8,8.7
-31 Ettlingen,2021,67.6,33.5,24.2,9.5,11.8,10.2,2.8,7.9
-32 Rastatt,2021,59.7,30.3,23.8,12.6,13.6,8.0,2.8,8.9
-33 Baden-Baden,2021,63.4,32.6,27.8,8.9,11.1,8.8,2.7,8.1
-34 Heidelberg,2021,67.3,41.7,15.3,5.2,12.7,7.0,8.4,9.8
-35 Mannheim I,2021,51.3,27.8,15.2,12.7,21.7,6.7,6.2,9.7
-36 Mannheim II,2021,61.8,35.9,16.7,7.9,15.9,9.3,5.5,8.7
-37 Wiesloch,2021,63.4,29.7,26.6,11.2,12.1,9.4,2.8,8.3
-38 Neckar-Odenwald,2021,62.1,23.7,31.6,12.3,12.2,7.9,2.4,9.9
-39 Weinheim,2021,67.5,35.6,22.6,7.9,13.4,8.6,3.6,8.4
-40 Schwetzingen,2021,62.0,31.3,23.6,10.4,14.8,8.2,3.1,8.5
-41 Sinsheim,2021,63.4,29.3,25.9,11.0,13.8,9.1,2.9,8.1
-42 Pforzheim,2021,54.0,26.2,20.1,15.8,10.1,16.1,3.3,8.3
-43 Calw,2021,63.7,27.1,28.8,13.5,7.8,10.0,2.7,10.1
-44 Enz,2021,66.3,30.9,19.5,12.9,9.5,17.0,2.3,7.9
-45 Freudenstadt,2021,62.2,24.7,27.3,13.2,8.4,14.8,2.2,9.4
-46 Freiburg I,2021,70.6,40.2,19.4,5.1,11.2,7.5,6.8,9.8
-47 Freiburg II,2021,64.5,40.3,13.3,5.8,12.7,5.9,11.2,10.9
-48 Breisgau,2021,66.2,37.7,23.9,7.0,10.3,9.0,3.7,8.3
-49 Emmendingen,2021,65.0,36.2,21.8,7.2,11.5,10.1,3.4,9.8
-50 Lahr,2021,61.0,33.1,24.5,10.0,10.4,10.2,2.6,9.2
-51 Offenburg,2021,61.8,36.8,25.4,8.3,8.6,8.9,2.9,9.0
-52 Kehl,2021,61.4,31.4,27.1,9.7,8.7,9.4,2.6,11.0
-53 Rottweil,2021,64.3,26.0,26.7,12.8,7.3,16.2,2.6,8.3
-54 Villingen-Schwenningen,2021,60.6,34.6,22.5,11.3,9.1,12.2,2.4,7.8
-55 Tuttlingen-Donaueschingen,2021,60.2,28.1,29.3,12.9,6.9,13.4,2.6,6.8
-56 Konstanz,2021,63.2,42.1,18.2,5.8,8.4,12.1,5.4,8.1
-57 Singen,2021,58.5,32.1,21.5,11.3,12.3,11.7,3.0,8.1
-58 Lörrach,2021,60.0,35.8,21.4,7.9,12.6,10.3,3.0,9.0
-59 Waldshut,2021,56.6,37.1,22.9,9.9,9.6,10.2,2.7,7.6
-60 Reutlingen,2021,63.6,36.2,22.0,9.5,10.2,11.3,3.7,7.1
-61 Hechingen-Münsingen,2021,64.5,31.6,25.0,12.2,8.9,12.6,2.6,7.1
-62 Tübingen,2021,70.5,39.0,20.5,6.5,11.6,7.6,6.7,8.1
-63 Balingen,2021,61.5,26.5,32.6,12.2,7.8,10.0,2.4,8.5
-64 Ulm,2021,63.4,36.5,22.9,7.4,13.2,7.8,4.3,7.9
-65 Ehingen,2021,66.5,29.5,35.9,10.1,7.0,8.2,2.1,7.2
-66 Biberach,2021,65.1,28.9,34.1,10.0,5.8,8.1,2.2,10.9
-67 Bodensee,2021,67.1,36.8,21.9,8.6,8.5,13.3,3.1,7.8
-68 Wangen,2021,63.8,31.3,30.6,9.5,6.5,8.9,2.7,10.6
-69 Ravensburg,2021,65.3,33.1,23.7,8.7,8.2,11.5,3.4,11.4
-70 Sigmaringen,2021,63.3,32.6,27.8,11.2,6.2,12.1,2.4,7.6
-
-Hinweise:
-- Es gibt genau 70 Direktmandate.
-- Parteien, die flächig starke Regionen haben, gewinnen dort eher Direktmandate.
-- Gib ausschließlich ein korrektes JSON-Objekt zurück – ohne Text, Erklärungen oder Formatierungen.
-
-Beispielausgabe:
-{
-  "CDU": 60,
-  "B90/Grüne": 8,
-  "AfD": 2,
-  "SPD": 0,
-  "Linke": 0,
-  "FDP": 0,
-  "BSW": 0,
-  "Sonstige": 0
-}
+# Ergebnistabelle, wird für das Nachladen per Server-Sent Events auch einzeln gerendert
+ergebnis_template = """
+  <div class="result-box">
+    <h3>Ergebnis:</h3>
+    <table>
+      <tr>
+        <th>Partei</th>
+        <th>Zweitstimmen (%)</th>
+        <th>Sitze</th>
+        <th>Pp. für +1 / −1 Sitz</th>
+        {% if result.get("Stichproben") %}<th>Direktmandate (Spanne)</th>{% endif %}
+        {% for verfahren in result.get("Vergleich", {}).values() %}
+          <th>{{ verfahren.bezeichnung }}</th>
+        {% endfor %}
+      </tr>
+      {% for party in ["CDU", "B90/Grüne", "AfD", "SPD", "Linke", "FDP", "BSW"] %}
+      <tr>
+        <td>{{ party }}</td>
+        <td>{{ eingabe[party] if eingabe and party in eingabe else "-" }}</td>
+        <td>{{ result.get(party, 0) }}</td>
+        {% set schwelle = result.get("Schwellen", {}).get(party) %}
+        <td>
+          {% if schwelle %}
+            +{{ schwelle.plus_eins if schwelle.plus_eins is not none else "–" }} / {{ schwelle.minus_eins if schwelle.minus_eins is not none else "–" }}{% if schwelle.bestimmt_groesse %}*{% endif %}
+          {% else %}-{% endif %}
+        </td>
+        {% if result.get("Stichproben") %}
+          {% set bereich = result["Stichproben"].spanne[party] %}
+          <td>{{ bereich[0] }}{% if bereich[1] != bereich[0] %}–{{ bereich[1] }}{% endif %}</td>
+        {% endif %}
+        {% for verfahren in result.get("Vergleich", {}).values() %}
+          <td>{{ verfahren.sitze.get(party, 0) }}</td>
+        {% endfor %}
+      </tr>
+      {% endfor %}
+      <tr>
+        <td><strong>Gesamt</strong></td>
+        <td>100</td>
+        <td><strong>{{ result.get("Gesamtzahl der Sitze", "?") }}</strong></td>
+        <td></td>
+        {% if result.get("Stichproben") %}<td>70</td>{% endif %}
+        {% for verfahren in result.get("Vergleich", {}).values() %}
+          <td><strong>{{ verfahren.sitze["Gesamtzahl der Sitze"] }}</strong></td>
+        {% endfor %}
+      </tr>
+    </table>
+
+    {% if result.get("Schwellen", {}).values()|selectattr("bestimmt_groesse")|list %}
+      <p>* Die Direktmandate dieser Partei bestimmen die Größe des Landtags; ändert sich ihr Ergebnis, ändert sich auch die Zahl der Ausgleichsmandate.</p>
+    {% endif %}
+    {% if result.get("Vergleich") %}
+      <p>Sitze nach Sainte-Laguë (Landtagswahlrecht); weitere Spalten zum Vergleich mit denselben Direktmandaten.</p>
+    {% endif %}
+    {% if result.get("Koalitionen") %}
+      <h4>Mögliche Koalitionen (Mehrheit ab {{ result["Koalitionen"].mehrheit }} Sitzen)</h4>
+      <table>
+        <tr><th>Koalition</th><th>Sitze</th><th>Vorsprung</th></tr>
+        {% for koalition in result["Koalitionen"].minimal %}
+        <tr><td>{{ koalition.koalition }}</td><td>{{ koalition.sitze }}</td><td>+{{ koalition.vorsprung }}</td></tr>
+        {% endfor %}
+      </table>
+      <p>Nur Koalitionen ohne überzählige Partei; Vorsprung = Sitze über der Mehrheit.</p>
+    {% endif %}
+
+    <p><strong>Hinweis:</strong> {{ result['Hinweis'] }}</p>
+  </div>
 """
 
-# Berechnung auf Basis Largest Remainders + Ausgleichsmandate
+app.jinja_loader = DictLoader({"seite.html": html_template, "ergebnis.html": ergebnis_template})
 
+# Templates einmalig beim Start kompilieren
+seite_kompiliert = app.jinja_env.get_template("seite.html")
+ergebnis_kompiliert = app.jinja_env.get_template("ergebnis.html")
 
-def berechne_verteilung(eingabe, direktmandate):
-    # Nur Parteien ≥ 5 % (außer Sonstige)
-    parteien_mit_sitzen = [
-        p for p in eingabe if eingabe[p] >= 5 and p != "Sonstige"]
+# Stylesheet mit Inhalts-Hash im Namen, damit es dauerhaft gecacht werden kann
+with open(os.path.join(app.static_folder, "style.css"), "rb") as f:
+    stylesheet = f.read()
+STYLESHEET_HASH = hashlib.sha256(stylesheet).hexdigest()[:12]
+app.jinja_env.globals["stylesheet_url"] = f"/assets/style-{STYLESHEET_HASH}.css"
 
-    # Prozentuale Anteile der berücksichtigten Parteien (normiert)
-    gesamt_prozent = sum(eingabe[p] for p in parteien_mit_sitzen)
-    anteile = {p: eingabe[p] / gesamt_prozent for p in parteien_mit_sitzen}
 
-    grundsitze = 120
+@contextmanager
+def spanne(stufe):
+    # Misst eine Stufe fürs Histogramm und, innerhalb einer Anfrage, für die Logzeile
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        dauer = time.perf_counter() - start
+        stufen_dauer.beobachte(dauer, stufe=stufe)
+        if has_request_context():
+            spannen = g.setdefault("spannen", {})
+            spannen[stufe] = spannen.get(stufe, 0) + dauer
 
-    def saint_lague_verteilung(stimmen, sitzzahl):
-        teilerserie = [2 * i + 1 for i in range(sitzzahl * len(stimmen))]
-        quoten = []
 
-        for partei, stimmanteil in stimmen.items():
-            absolute_stimmen = stimmanteil * 1_000_000
-            for teiler in teilerserie[:sitzzahl]:
-                quoten.append((partei, absolute_stimmen / teiler))
+def rendere(template, **kontext):
+    with spanne("rendern"):
+        app.update_template_context(kontext)
+        return template.render(kontext)
 
-        quoten.sort(key=lambda x: x[1], reverse=True)
 
-        sitze = {p: 0 for p in stimmen}
-        for i in range(sitzzahl):
-            partei = quoten[i][0]
-            sitze[partei] += 1
+def akzeptiert_gzip():
+    # Mit q-Werten ausgewertet: "gzip;q=0" lehnt gzip ausdrücklich ab
+    return HTML_KOMPRESSION > 0 and request.accept_encodings["gzip"] > 0
 
-        return sitze
 
-    # Erste Verteilung mit 120 Sitzen
-    sitze_vor_rest = saint_lague_verteilung(anteile, grundsitze)
+@app.before_request
+def starte_messung():
+    g.start = time.perf_counter()
+
+
+# Sekunden ab Importbeginn: Import fertig, erste Anfrage beantwortet, LLM-Client bereit
+startzeiten = {"import": None, "erste_anfrage": None, "vorgewaermt": None}
+
+
+def vorwaermen():
+    try:
+        llm_dienst.vorwaermen()
+    except Exception as e:
+        logger.warning("Vorwärmen des LLM-Clients fehlgeschlagen: %s", e)
+        return
+    startzeiten["vorgewaermt"] = time.perf_counter() - _IMPORT_START
+
+
+def _erste_anfrage_beantwortet():
+    # Läuft erst, wenn die Antwort vollständig gesendet ist
+    if startzeiten["erste_anfrage"] is not None:
+        return
+    startzeiten["erste_anfrage"] = time.perf_counter() - _IMPORT_START
+    logger.info("Start: Import %.3f s, erste Anfrage nach %.3f s", startzeiten["import"], startzeiten["erste_anfrage"])
+    if LLM_VORWAERMEN and not llm_dienst.bereit:
+        threading.Thread(target=vorwaermen, name="llm-vorwaermen", daemon=True).start()
+
+
+@app.after_request
+def erfasse_anfrage(response):
+    # Läuft nach komprimiere (umgekehrte Reihenfolge), misst also inkl. gzip
+    dauer = time.perf_counter() - g.start
+    if startzeiten["erste_anfrage"] is None:
+        response.call_on_close(_erste_anfrage_beantwortet)
+    pfad = request.url_rule.rule if request.url_rule else "unbekannt"
+    anfrage_dauer.beobachte(dauer, pfad=pfad, methode=request.method, status=response.status_code)
+    if ANFRAGE_LOG:
+        logger.info(json.dumps({
+            "pfad": pfad,
+            "methode": request.method,
+            "status": response.status_code,
+            "dauer_ms": round(dauer * 1000, 2),
+            "stufen_ms": {k: round(v * 1000, 2) for k, v in g.get("spannen", {}).items()},
+            "engine": g.get("engine"),
+        }, ensure_ascii=False))
+    return response
+
+
+@app.after_request
+def komprimiere(response):
+    # HTML-Antworten komprimieren (nicht bei Streams oder bereits kodierten Antworten)
+    if (response.mimetype == "text/html" and not response.is_streamed
+            and "Content-Encoding" not in response.headers and akzeptiert_gzip()):
+        response.set_data(gzip.compress(response.get_data(), HTML_KOMPRESSION))
+        response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+# Cache für die Direktmandate aus gpt-4o (leerer Pfad: nur im Speicher)
+llm_cache = LLMCache(
+    kontext_hash(LLM_MODELL, LLM_TEMPERATUR,
+                 LLM_PROTOKOLL + ("" if LLM_STICHPROBEN == 1 else f"/stichproben={LLM_STICHPROBEN}")
+                 + "\n" + system_prompt_fuer(LLM_PROTOKOLL)),
+    pfad=os.getenv("LLM_CACHE_PFAD", "llm_cache.sqlite3"),
+    max_eintraege=int(os.getenv("LLM_CACHE_GROESSE", 1000)),
+    ttl=int(os.getenv("LLM_CACHE_TTL", 86400)),
+)
+
+# Ähnliche Eingaben (jede Partei höchstens NACHBAR_TOLERANZ Prozentpunkte
+# entfernt) nutzen gespeicherte gpt-4o-Antworten näherungsweise; 0 schaltet ab
+nachbar_cache = NachbarCache(
+    toleranz=float(os.getenv("NACHBAR_TOLERANZ", 1.0)),
+    max_eintraege=int(os.getenv("NACHBAR_GROESSE", 50000)),
+    nachbarn=int(os.getenv("NACHBAR_ANZAHL", 4)),
+)
+
+# Stand der Übernahme neuer Einträge aus der gemeinsamen Cache-Datei in den
+# Ähnlichkeits-Cache (Antworten anderer Worker), höchstens einmal je Sekunde
+_nachbar_abgleich = {"erstellt": 0.0, "zuletzt": 0.0}
+_nachbar_abgleich_lock = threading.Lock()
+
+
+def gleiche_nachbarn_ab(sofort=False):
+    jetzt = time.monotonic()
+    if not sofort and jetzt - _nachbar_abgleich["zuletzt"] < 1.0:
+        return
+    if not _nachbar_abgleich_lock.acquire(blocking=sofort):
+        return
+    try:
+        _nachbar_abgleich["zuletzt"] = jetzt
+        for erstellt, eingabe, wert in llm_cache.eintraege_seit(_nachbar_abgleich["erstellt"]):
+            nachbar_cache.speichere(eingabe, entpacke(wert)[0])
+            _nachbar_abgleich["erstellt"] = erstellt
+    finally:
+        _nachbar_abgleich_lock.release()
 
-    # Überhangmandate berechnen
-    ueberhang = {
-        p: max(0, direktmandate.get(p, 0) - sitze_vor_rest.get(p, 0))
-        for p in parteien_mit_sitzen
-    }
-    ges_ueberhang = sum(ueberhang.values())
 
-    # Neue Mindestgröße für den Landtag
-    min_sitze = max(grundsitze, sum(sitze_vor_rest.values()) + ges_ueberhang)
+def entpacke(wert):
+    # Eintrag im LLM-Cache: Direktmandate oder (mit Stichproben) Konsens und Streuung
+    if "direktmandate" in wert:
+        return wert["direktmandate"], wert["stichproben"]
+    return wert, None
 
-    # Wiederverteilung mit Anpassung bis Direktmandate abgedeckt sind
-    while True:
-        sitze = saint_lague_verteilung(anteile, min_sitze)
-        if all(sitze[p] >= direktmandate.get(p, 0) for p in parteien_mit_sitzen):
-            break
-        min_sitze += 1
 
-    # Restliche Parteien (auch < 5 %) auf 0 setzen
-    for p in eingabe:
-        if p != "Sonstige" and p not in sitze:
-            sitze[p] = 0
+token_verbrauch = TokenVerbrauch()
 
-    sitze["Sonstige"] = 0
-    sitze["Gesamtzahl der Sitze"] = sum(sitze.values())
 
-    return sitze
+def engine_version(engine):
+    # Ändert sich mit Modell, Temperatur und Prompt bzw. mit dem lokalen Modell
+    if engine == "local":
+        return ENGINE_VERSION_LOKAL
+    if engine == "llm":
+        return llm_cache.kontext
+    return f"{llm_cache.kontext}+{ENGINE_VERSION_LOKAL}"
+
+
+# Importierte Umfragereihen mit ihren Sitzprojektionen ("" = nur im Speicher)
+umfragespeicher = Umfragespeicher(os.getenv("UMFRAGEN_PFAD", "umfragen.sqlite3"), engine_version)
+
+
+@metriken.sammler
+def _llm_metriken():
+    tokens = token_verbrauch.statistik()
+    cache = llm_cache.statistik()
+    dienst = llm_dienst.statistik()
+    yield "llm_anfragen_gesamt", "counter", "Beantwortete LLM-Anfragen", None, tokens["anfragen"]
+    for art, schluessel in (("prompt", "prompt_tokens"), ("gecacht", "gecachte_tokens"), ("antwort", "antwort_tokens")):
+        yield "llm_tokens_gesamt", "counter", "Verbrauchte Tokens", {"art": art}, tokens[schluessel]
+    yield "llm_aktiv", "gauge", "Laufende LLM-Aufrufe", None, dienst["aktiv"]
+    yield "llm_zusammengefasst_gesamt", "counter", "Per Single-Flight zusammengefasste Anfragen", None, dienst["zusammengefasst"]
+    for ergebnis in ("treffer", "fehlzugriffe"):
+        yield "llm_cache_zugriffe_gesamt", "counter", "Zugriffe auf den LLM-Cache", {"ergebnis": ergebnis}, cache[ergebnis]
+    nachbarn = nachbar_cache.statistik()
+    for ergebnis in ("treffer", "fehlzugriffe"):
+        yield ("llm_nachbar_zugriffe_gesamt", "counter", "Zugriffe auf den Ähnlichkeits-Cache",
+               {"ergebnis": ergebnis}, nachbarn[ergebnis])
+    yield "llm_nachbar_eintraege", "gauge", "Einträge im Ähnlichkeits-Cache", None, nachbarn["eintraege"]
+    schutz = llm_schutz.statistik()
+    for zustand in ("geschlossen", "offen", "halboffen"):
+        yield ("llm_schalter_zustand", "gauge", "Zustand des Leistungsschalters (1 = aktiv)",
+               {"zustand": zustand}, int(schutz["schalter"]["zustand"] == zustand))
+    yield "llm_schalter_oeffnungen_gesamt", "counter", "Öffnungen des Leistungsschalters", None, schutz["schalter"]["oeffnungen"]
+    yield "llm_schalter_abgewiesen_gesamt", "counter", "Vom Leistungsschalter abgewiesene Anfragen", None, schutz["schalter"]["abgewiesen"]
+    yield "llm_hedge_gesamt", "counter", "Gestartete Hedge-Aufrufe", None, schutz["hedging"]["gestartet"]
+    yield "llm_hedge_gewonnen_gesamt", "counter", "Hedge-Aufrufe, die zuerst geantwortet haben", None, schutz["hedging"]["gewonnen"]
+    yield "llm_frist_ueberschritten_gesamt", "counter", "Anfragen über der Frist", None, schutz["fristen_ueberschritten"]
+    statistik = zulassung.statistik()
+    yield "llm_warteschlange", "gauge", "Auf Freigabe wartende LLM-Anfragen", None, statistik["wartend"]
+    for art, anzahl in statistik["zugelassen"].items():
+        yield "llm_zugelassen_gesamt", "counter", "Zugelassene LLM-Anfragen", {"art": art}, anzahl
+    for grund, anzahl in statistik["abgewiesen"].items():
+        yield "llm_abgewiesen_gesamt", "counter", "Von der Zulassung abgewiesene LLM-Anfragen", {"grund": grund}, anzahl
+    yield "llm_budget_erstattet_gesamt", "counter", "Zurückgegebenes Budget für nicht gestartete LLM-Aufrufe", None, statistik["erstattet"]
+    for budget, werte in zip(("anfragen", "tokens"), statistik["budgets"]):
+        yield "llm_budget_vorrat", "gauge", "Verfügbares Budget im Token-Bucket", {"budget": budget}, werte["vorrat"]
+    yield "llm_hedge_ohne_budget_gesamt", "counter", "Ausgelassene Hedge-Aufrufe mangels Budget", None, schutz["hedging"]["ohne_budget"]
+    yield "llm_client_bereit", "gauge", "LLM-Client angelegt (1) oder noch nicht geladen (0)", None, int(llm_dienst.bereit)
+
+
+@metriken.sammler
+def _startmetriken():
+    for phase, sekunden in startzeiten.items():
+        if sekunden is not None:
+            yield ("start_sekunden", "gauge", "Sekunden ab Importbeginn bis Import fertig, erste Antwort bzw. LLM-Client bereit",
+                   {"phase": phase}, round(sekunden, 4))
+
+
+# Die Startseite ist für alle Besucher gleich: einmal rendern, per ETag revalidieren
+_startseite = {}
+
+
+def baue_startseite():
+    with app.app_context():
+        html = rendere(seite_kompiliert, engine=DIREKTMANDATE_ENGINE).encode("utf-8")
+    etag = hashlib.sha256(html).hexdigest()[:16]
+    _startseite["html"] = (html, etag)
+    _startseite["gzip"] = (gzip.compress(html, HTML_KOMPRESSION or 6), etag + "-gz")
 
 
 @app.route("/", methods=["GET", "HEAD"])
 def index():
-    return render_template_string(html_template)
+    if not _startseite:
+        baue_startseite()
+
+    komprimiert = akzeptiert_gzip()
+    body, etag = _startseite["gzip" if komprimiert else "html"]
+    response = Response(body, mimetype="text/html")
+    if komprimiert:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@app.route("/assets/style-<fingerprint>.css", methods=["GET", "HEAD"])
+def stylesheet_datei(fingerprint):
+    if fingerprint != STYLESHEET_HASH:
+        return Response(status=404)
+    response = Response(stylesheet, mimetype="text/css")
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+def frage_direktmandate_llm(eingabe):
+    # Liefert die Direktmandate und einen Zusatz für den Hinweis
+    with spanne("cache"):
+        schluessel = llm_cache.schluessel(eingabe)
+        wert = llm_cache.hole(schluessel)
+    if wert is not None:
+        return _mit_streuung(*entpacke(wert))
+    with spanne("nachbarn"):
+        gleiche_nachbarn_ab()
+        naeherung = nachbar_cache.suche(eingabe)
+    if naeherung is not None:
+        direktmandate, anzahl, abstand = naeherung
+        quelle = "einer ähnlichen gpt-4o-Antwort" if anzahl == 1 else f"{anzahl} ähnlichen gpt-4o-Antworten"
+        return direktmandate, f" Direktmandate angenähert aus {quelle} (Abweichung ≤ {abstand:g} Prozentpunkt{'' if abstand == 1 else 'e'})."
+
+    # Gleichzeitige Anfragen mit derselben Eingabe teilen sich einen Aufruf,
+    # wer sich anschließt, braucht kein eigenes Budget
+    llm_schutz.schalter.pruefe()
+    zugelassen = not llm_dienst.laeuft(schluessel)
+    if zugelassen:
+        with spanne("warteschlange"):
+            zulassung.betrete(client_kennung(), zulassung_wartezeit.beobachte)
+        # Während des Wartens fertig geworden: Ergebnis nehmen, Budget zurück
+        wert = llm_cache.hole(schluessel) if llm_cache.enthaelt(schluessel) else None
+        if wert is not None:
+            zulassung.erstatte()
+            return _mit_streuung(*entpacke(wert))
+    gestartet = []
+
+    def aufruf(client):
+        gestartet.append(True)
+        return _frage_llm(client, eingabe, schluessel)
+
+    try:
+        with spanne("llm"):
+            return _mit_streuung(*llm_dienst.anfrage(schluessel, aufruf))
+    finally:
+        # Einem inzwischen gestarteten gleichen Aufruf angeschlossen: Budget zurück
+        if zugelassen and not gestartet:
+            zulassung.erstatte()
+
+
+def _mit_streuung(direktmandate, streuung):
+    # Streuung für die Ergebnistabelle merken und im Hinweis zusammenfassen
+    if streuung is None:
+        return direktmandate, ""
+    if has_request_context():
+        g.stichproben = streuung
+    anzahl = streuung["stichproben"]
+    if anzahl < streuung["angefragt"]:
+        anzahl = f"{anzahl} von {streuung['angefragt']}"
+    return direktmandate, (f" Direktmandate als Median aus {anzahl} gpt-4o-Stichproben; diese vergeben im Mittel "
+                           f"{streuung['abweichung']:g} von 70 Wahlkreisen anders.")
+
+
+async def _frage_llm(client, eingabe, schluessel):
+    direktmandate, streuung = await llm_schutz.rufe(lambda: _versuch_llm(client, eingabe))
+    wert = direktmandate if streuung is None else {"direktmandate": direktmandate, "stichproben": streuung}
+    llm_cache.speichere(schluessel, wert, eingabe)
+    nachbar_cache.speichere(eingabe, direktmandate)
+    return direktmandate, streuung
+
+
+async def _versuch_llm(client, eingabe):
+    # Ein Versuch inkl. Auswertung, liefert (Direktmandate, Streuung oder None);
+    # läuft auf der Schleife des LLM-Dienstes, die Spannen landen daher nur im Histogramm
+    if LLM_STICHPROBEN == 1:
+        texte = await _rufe_openai(client, eingabe, 1)
+        try:
+            with spanne("json"):
+                return lies_antwort(texte[0], LLM_PROTOKOLL), None
+        except ValueError:
+            llm_parse_fehler.erhoehe()
+            raise
+
+    texte, fehler = await _stichproben(client, eingabe)
+    gueltig = []
+    with spanne("json"):
+        for text in texte:
+            try:
+                gueltig.append(pruefe_stichprobe(lies_antwort(text, LLM_PROTOKOLL)))
+            except ValueError as e:
+                llm_parse_fehler.erhoehe()
+                fehler.append(e)
+    if len(gueltig) < LLM_STICHPROBEN // 2 + 1:
+        if not gueltig and fehler:
+            raise fehler[0]
+        raise AntwortFehler(f"Nur {len(gueltig)} von {LLM_STICHPROBEN} Stichproben gültig.")
+    with spanne("konsens"):
+        return konsens(gueltig, LLM_STICHPROBEN)
+
+
+async def _stichproben(client, eingabe):
+    # Antworttexte aller Stichproben und Fehler einzelner Aufrufe
+    texte = []
+    if _stichproben_art["art"] == "n":
+        try:
+            texte = await _rufe_openai(client, eingabe, LLM_STICHPROBEN)
+        except Exception as e:
+            if getattr(e, "param", None) != "n":
+                raise
+            logger.warning("Parameter n abgelehnt (%s), Stichproben ab jetzt als Einzelaufrufe", e)
+            _stichproben_art["art"] = "parallel"
+    # Auch wenn der Anbieter n stillschweigend ignoriert: Rest einzeln nachfragen
+    fehlend = LLM_STICHPROBEN - len(texte)
+    fehler = []
+    if fehlend > 0:
+        for ergebnis in await asyncio.gather(*(_rufe_openai(client, eingabe, 1) for _ in range(fehlend)),
+                                             return_exceptions=True):
+            if isinstance(ergebnis, BaseException):
+                fehler.append(ergebnis)
+            else:
+                texte.extend(ergebnis)
+    return texte, fehler
+
+
+async def _rufe_openai(client, eingabe, n):
+    # Ein Aufruf der API, liefert die Texte aller n Antworten
+    start = time.perf_counter()
+    try:
+        with spanne("openai"):
+            response = await client.chat.completions.create(
+                model=LLM_MODELL,
+                temperature=LLM_TEMPERATUR,
+                **baue_anfrage(eingabe, LLM_PROTOKOLL),
+                **({"n": n} if n > 1 else {})
+            )
+    except Exception:
+        llm_fehler.erhoehe()
+        raise
+    token_verbrauch.erfasse(response.usage, LLM_PROTOKOLL, time.perf_counter() - start)
+    return [choice.message.content for choice in response.choices]
+
+
+def client_kennung():
+    # Erste Adresse aus X-Forwarded-For (Proxy der Plattform), sonst die
+    # Verbindung; Batch-Threads ohne Anfragekontext teilen sich einen Platz
+    if not has_request_context():
+        return "batch"
+    weitergeleitet = request.headers.get("X-Forwarded-For", "")
+    return weitergeleitet.split(",")[0].strip() or request.remote_addr or "unbekannt"
+
+
+def ueberlastet(e):
+    return jsonify({"fehler": f"Zu viele Anfragen an {LLM_MODELL}: {e}", "retry_after": e.retry_after}), 429, {
+        "Retry-After": str(e.retry_after)}
+
+
+def ermittle_direktmandate(eingabe, engine):
+    # Liefert die Direktmandate und einen Zusatz für den Hinweis
+    if engine == "local":
+        return schaetze_lokal(eingabe), " Direktmandate aus lokalem Swing-Modell."
+    if engine == "local-then-llm":
+        try:
+            return frage_direktmandate_llm(eingabe)
+        except Exception as e:
+            return schaetze_lokal(eingabe), f" gpt-4o nicht verfügbar ({e}), Direktmandate aus lokalem Swing-Modell."
+    try:
+        return frage_direktmandate_llm(eingabe)
+    except (SchalterOffen, FristUeberschritten, ZulassungAbgelehnt) as e:
+        # Nicht auf eine gestörte oder ausgelastete API warten, sondern die Ersatzquelle nutzen
+        if LLM_FALLBACK != "local":
+            raise
+        llm_fallbacks.erhoehe()
+        return schaetze_lokal(eingabe), f" gpt-4o nicht verfügbar ({e}), Direktmandate aus lokalem Swing-Modell."
+
+
+def schaetze_lokal(eingabe):
+    with spanne("lokal"):
+        return schaetze_direktmandate(eingabe)
+
+
+def lies_eingabe(werte):
+    return {party: int(werte[party]) for party in werte if party in PARTEIEN}
+
+
+def pruefe_eingabe(eingabe, engine):
+    # Gerundet, damit auch Umfragen mit Nachkommastellen (Batch) geprüft werden können
+    if round(sum(eingabe.values()), 6) != 100:
+        eingabe_abgelehnt.erhoehe(grund="summe")
+        return "Fehler: Die Summe der Werte muss genau 100 ergeben."
+    if engine not in ENGINES:
+        eingabe_abgelehnt.erhoehe(grund="engine")
+        return f"Fehler: Unbekannte Quelle für Direktmandate: {engine}"
+    return None
+
+
+def verteilung_mit_schwellen(eingabe, direktmandate):
+    # Sitze nach Sainte-Laguë, die übrigen Verfahren als Vergleichsspalten
+    with spanne("verteilung"):
+        vergleich = vergleiche_verfahren(eingabe, direktmandate)
+        details = vergleich.pop(STANDARD_VERFAHREN)
+        result_data = details["sitze"]
+        result_data["Schwellen"] = analysiere_schwellen(eingabe, direktmandate)
+        result_data["Vergleich"] = vergleich
+        result_data["Koalitionen"] = analysiere_koalitionen(result_data)
+    berechnungen.erhoehe()
+    groessenschritte.erhoehe(details["ausgleichsmandate"])
+    return result_data
+
+
+def erstelle_ergebnis(eingabe, engine):
+    g.pop("stichproben", None)
+    try:
+        direktmandate, quelle = ermittle_direktmandate(eingabe, engine)
+        result_data = verteilung_mit_schwellen(eingabe, direktmandate)
+        if g.get("stichproben"):
+            result_data["Stichproben"] = g.stichproben
+
+        result_data["Hinweis"] = "Diese Verteilung ist eine Schätzung." + quelle
+        if not result_data["Gesamtzahl der Sitze"]:
+            result_data["Hinweis"] = HINWEIS_OHNE_SITZE
+
+    except AntwortFehler as e:
+        result_data = {"Hinweis": f"Fehler: Ungültige Antwort von {LLM_MODELL}: {e}"}
+    except ZulassungAbgelehnt as e:
+        g.retry_after = e.retry_after
+        result_data = {"Hinweis": f"Fehler: Zu viele Anfragen an {LLM_MODELL} ({e}), "
+                                  f"bitte in {e.retry_after} s erneut versuchen."}
+    except Exception as e:
+        result_data = {"Hinweis": f"Fehler bei API-Anfrage: {e}"}
+
+    return result_data
 
 
 @app.route("/prognose", methods=["POST"])
 def prognose():
-    eingabe = {party: int(request.form[party]) for party in request.form}
-    if sum(eingabe.values()) != 100:
-        return render_template_string(html_template, result={"Hinweis": "Fehler: Die Summe der Werte muss genau 100 ergeben."}, eingabe=eingabe)
+    with spanne("formular"):
+        engine = g.engine = request.form.get("engine", DIREKTMANDATE_ENGINE)
+        eingabe = lies_eingabe(request.form)
+        fehler = pruefe_eingabe(eingabe, engine)
+    if fehler:
+        return rendere(seite_kompiliert, result={"Hinweis": fehler}, eingabe=eingabe, engine=engine if engine in ENGINES else DIREKTMANDATE_ENGINE)
+
+    # Ohne gespeichertes oder ähnliches gpt-4o-Ergebnis zuerst die lokale Schätzung ausliefern
+    if (PROGNOSE_STREAMING and engine != "local" and not llm_cache.enthaelt(llm_cache.schluessel(eingabe))
+            and not nachbar_cache.hat_nachbarn(eingabe)):
+        result_data = verteilung_mit_schwellen(eingabe, schaetze_lokal(eingabe))
+        result_data["Hinweis"] = "Vorläufige Schätzung mit lokalem Swing-Modell, das Ergebnis von gpt-4o wird nachgeladen …"
+        stream_url = url_for("prognose_stream", freigabe=stream_freigabe.dumps([engine, eingabe]))
+        return rendere(seite_kompiliert, result=result_data, eingabe=eingabe, engine=engine, stream_url=stream_url)
+
+    result_data = erstelle_ergebnis(eingabe, engine)
+    html = rendere(seite_kompiliert, result=result_data, eingabe=eingabe, engine=engine)
+    if g.get("retry_after"):
+        return html, 429, {"Retry-After": str(g.retry_after)}
+    return html
+
+
+@app.route("/prognose/stream", methods=["GET"])
+def prognose_stream():
+    # Nur mit Freigabe aus POST /prognose, die dort geprüfte Eingabe steckt darin
+    try:
+        engine, eingabe = stream_freigabe.loads(request.args.get("freigabe", ""), max_age=STREAM_GUELTIGKEIT)
+    except BadSignature:
+        return Response("Freigabe fehlt oder ist abgelaufen.", status=403, mimetype="text/plain")
+
+    def ereignisse():
+        # Kommentarzeile öffnet den Stream sofort, das Ergebnis folgt als Ereignis
+        yield ": warte auf gpt-4o\n\n"
+        result_data = erstelle_ergebnis(eingabe, engine)
+        if g.get("retry_after"):
+            # Status und Retry-After sind schon gesendet: Abweisung als eigenes Ereignis
+            fehler = {"hinweis": result_data["Hinweis"], "retry_after": g.retry_after}
+            yield f"event: fehler\ndata: {json.dumps(fehler, ensure_ascii=False)}\n\n"
+            return
+        html = rendere(ergebnis_kompiliert, result=result_data, eingabe=eingabe)
+        yield "event: ergebnis\n" + "".join(f"data: {zeile}\n" for zeile in html.strip().splitlines()) + "\n"
+
+    return Response(stream_with_context(ereignisse()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/api/prognose/batch", methods=["POST"])
+def prognose_batch():
+    # JSON-Array von Szenarien oder NDJSON (ein Szenario je Zeile, Antwort ebenso)
+    if request.mimetype == "application/x-ndjson":
+        zeilen = (zeile for zeile in request.stream if zeile.strip())
+        ergebnisse = werte_aus(zeilen, ermittle_direktmandate, pruefe_eingabe,
+                               DIREKTMANDATE_ENGINE, BATCH_MAX_PARALLEL)
+        return Response(stream_with_context(json.dumps(e, ensure_ascii=False) + "\n" for e in ergebnisse),
+                        mimetype="application/x-ndjson")
+
+    szenarien = request.get_json(silent=True)
+    if not isinstance(szenarien, list):
+        return jsonify({"fehler": "Erwartet wird ein JSON-Array von Szenarien."}), 400
+    ergebnisse = list(werte_aus(szenarien, ermittle_direktmandate, pruefe_eingabe,
+                                DIREKTMANDATE_ENGINE, BATCH_MAX_PARALLEL))
+    sitze = [[e["sitze"][p] for p in PARTEIEN] for e in ergebnisse if "sitze" in e]
+    return jsonify({
+        "anzahl": len(ergebnisse),
+        "fehler": sum(1 for e in ergebnisse if "fehler" in e),
+        "ergebnisse": ergebnisse,
+        # Anteil der Szenarien, in denen die Koalition eine Mehrheit hat
+        "koalitionen": koalitionswahrscheinlichkeiten(sitze) if sitze else [],
+    })
 
-    nutzer_prompt = f"Eingabeformat für die Prognose zur Landtagswahl Baden-Württemberg 2026 (Zweitstimmenanteile in Prozent):\n{eingabe}"
 
+@app.route("/api/simulation", methods=["POST"])
+def simulation():
+    # Monte-Carlo-Simulation: {"eingabe": {...}, "ziehungen": 100000, "stichprobe": 1000,
+    # "verteilung": "dirichlet", "direktmandate": "je_ziehung" | "fest", "seed": 1}
+    daten = request.get_json(silent=True)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": nutzer_prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1000
-        )
-        text_output = response.choices[0].message.content
-
-        json_block = re.search(r"\{.*\}", text_output, re.DOTALL)
-        if not json_block:
-            raise ValueError("Kein JSON-Block erkannt.")
-        cleaned = json_block.group(0).replace("'", '"')
-        gpt_result = json.loads(cleaned)
-
-        direktmandate = {p: gpt_result.get(p, 0) for p in [
-            "CDU", "B90/Grüne", "AfD", "SPD", "Linke", "FDP", "BSW", "Sonstige"]}
-        result_data = berechne_verteilung(eingabe, direktmandate)
-
-        result_data["Hinweis"] = "Diese Verteilung ist eine Schätzung."
+        _, eingabe, engine = lies_szenario(daten, DIREKTMANDATE_ENGINE)
+        fehler = pruefe_eingabe(eingabe, engine)
+        if fehler:
+            raise ValueError(fehler)
+        ziehungen = int(daten.get("ziehungen", 100_000))
+        stichprobe = int(daten.get("stichprobe", 1000))
+        verteilung = daten.get("verteilung", "dirichlet")
+        modus = daten.get("direktmandate", "je_ziehung")
+        if modus not in ("je_ziehung", "fest"):
+            raise ValueError(f"Unbekannter Modus für Direktmandate: {modus}")
+    except (ValueError, TypeError) as e:
+        return jsonify({"fehler": str(e)}), 400
 
+    # "je_ziehung": lokales Swing-Modell für jede Ziehung, "fest": einmal über die Engine
+    direktmandate = None
+    if modus == "fest":
+        try:
+            direktmandate, _ = ermittle_direktmandate(eingabe, engine)
+        except ZulassungAbgelehnt as e:
+            return ueberlastet(e)
+        except Exception as e:
+            return jsonify({"fehler": f"Fehler bei API-Anfrage: {e}"}), 502
+
+    try:
+        ergebnis = simuliere(eingabe, ziehungen, stichprobe, verteilung,
+                             direktmandate, daten.get("seed"))
+    except ValueError as e:
+        return jsonify({"fehler": str(e)}), 400
+    return jsonify(fasse_zusammen(*ergebnis))
+
+
+@app.route("/api/schwellen", methods=["POST"])
+def schwellen():
+    # Abstand je Partei zum nächsten Sitzgewinn/-verlust: {"eingabe": {...}, "engine": "local"}
+    try:
+        _, eingabe, engine = lies_szenario(request.get_json(silent=True), DIREKTMANDATE_ENGINE)
+    except (ValueError, TypeError) as e:
+        return jsonify({"fehler": str(e)}), 400
+    fehler = pruefe_eingabe(eingabe, engine)
+    if fehler:
+        return jsonify({"fehler": fehler}), 400
+    try:
+        direktmandate, _ = ermittle_direktmandate(eingabe, engine)
+    except ZulassungAbgelehnt as e:
+        return ueberlastet(e)
     except Exception as e:
-        result_data = {"Hinweis": f"Fehler bei API-Anfrage: {e}"}
+        return jsonify({"fehler": f"Fehler bei API-Anfrage: {e}"}), 502
+    sitze = berechne_verteilung(eingabe, direktmandate)
+    antwort = {
+        "sitze": sitze,
+        "direktmandate": direktmandate,
+        "schwellen": analysiere_schwellen(eingabe, direktmandate),
+    }
+    if not sitze["Gesamtzahl der Sitze"]:
+        antwort["hinweis"] = HINWEIS_OHNE_SITZE
+    return jsonify(antwort)
+
+
+@app.route("/api/verfahren", methods=["POST"])
+def verfahren_vergleich():
+    # Alle Verfahren nebeneinander: {"eingabe": {...}, "engine": "local",
+    # "verfahren": ["sainte-lague", "dhondt"]} (ohne "verfahren": alle)
+    daten = request.get_json(silent=True)
+    try:
+        _, eingabe, engine = lies_szenario(daten, DIREKTMANDATE_ENGINE)
+        verfahren = daten.get("verfahren") or list(VERFAHREN)
+        if isinstance(verfahren, str):
+            verfahren = [verfahren]
+        unbekannt = [v for v in verfahren if not isinstance(v, str) or v not in VERFAHREN]
+        if unbekannt:
+            raise ValueError(f"Unbekanntes Verfahren: {', '.join(map(str, unbekannt))}")
+    except (ValueError, TypeError) as e:
+        return jsonify({"fehler": str(e)}), 400
+    fehler = pruefe_eingabe(eingabe, engine)
+    if fehler:
+        return jsonify({"fehler": fehler}), 400
+    try:
+        direktmandate, _ = ermittle_direktmandate(eingabe, engine)
+    except ZulassungAbgelehnt as e:
+        return ueberlastet(e)
+    except Exception as e:
+        return jsonify({"fehler": f"Fehler bei API-Anfrage: {e}"}), 502
+
+    ergebnis = vergleiche_verfahren(eingabe, direktmandate, verfahren)
+    parteien = [p for p in PARTEIEN if p != "Sonstige"] + ["Gesamtzahl der Sitze"]
+    antwort = {
+        "direktmandate": direktmandate,
+        "verfahren": ergebnis,
+        # Eine Zeile je Partei, eine Spalte je Verfahren
+        "tabelle": [dict({"partei": p}, **{v: ergebnis[v]["sitze"].get(p, 0) for v in ergebnis}) for p in parteien],
+    }
+    if any("hinweis" in details for details in ergebnis.values()):
+        antwort["hinweis"] = HINWEIS_OHNE_SITZE
+    return jsonify(antwort)
+
+
+_backtests = None
+
+
+@app.route("/api/kalibrierung", methods=["GET"])
+def kalibrierung_bericht():
+    # Backtest der Swing-Modelle; ?ziel=sieger|mae, ?wahlkreise=1 für den Bericht je Wahlkreis.
+    # Die Daten werden beim ersten Aufruf geladen, die Rechnung selbst dauert Millisekunden.
+    global _backtests
+    ziel = request.args.get("ziel", "sieger")
+    if ziel not in kalibrierung.ZIELE:
+        return jsonify({"fehler": f"Unbekanntes Ziel: {ziel}"}), 400
+    if _backtests is None:
+        _backtests = kalibrierung.Backtests()
+    return jsonify(kalibrierung.kalibriere(ziel=ziel, wahlkreise=request.args.get("wahlkreise") == "1",
+                                           backtests=_backtests))
+
+
+@app.route("/api/umfragen/import", methods=["POST"])
+def umfragen_import():
+    # Umfragereihe als CSV (text/csv) oder NDJSON (application/x-ndjson);
+    # ?engine=local|llm|local-then-llm gilt für Zeilen ohne eigene Angabe
+    format = request.args.get("format") or ("ndjson" if request.mimetype == "application/x-ndjson" else "csv")
+    engine = request.args.get("engine", DIREKTMANDATE_ENGINE)
+    if engine not in ENGINES:
+        return jsonify({"fehler": f"Unbekannte Quelle für Direktmandate: {engine}"}), 400
+    try:
+        text = request.get_data().decode("utf-8-sig")
+        bericht = umfragespeicher.importiere(text, format, engine, ermittle_direktmandate, pruefe_eingabe,
+                                             BATCH_MAX_PARALLEL)
+    except ValueError as e:
+        return jsonify({"fehler": str(e)}), 400
+    return jsonify(bericht)
+
+
+@app.route("/api/umfragen/verlauf", methods=["GET"])
+def umfragen_verlauf():
+    # Sitzprojektionen im Zeitverlauf: ?institut=...&von=2025-01-01&bis=2026-03-08
+    return jsonify(umfragespeicher.verlauf(request.args.get("institut"), request.args.get("von"),
+                                           request.args.get("bis")))
+
+
+@app.route("/api/cache", methods=["GET"])
+def cache_statistik():
+    return jsonify(dict(llm_cache.statistik(), nachbarn=nachbar_cache.statistik()))
+
+
+@app.route("/api/llm", methods=["GET"])
+def llm_statistik():
+    # Die Werte gelten für den antwortenden Worker (prozess); mit mehreren
+    # Workern steht die Zulassung aller Worker zusätzlich unter zulassung_gesamt
+    antwort = dict(llm_dienst.statistik(), protokoll=LLM_PROTOKOLL, tokens=token_verbrauch.statistik(),
+                   stichproben={"anzahl": LLM_STICHPROBEN, "art": _stichproben_art["art"]},
+                   schutz=llm_schutz.statistik(), zulassung=zulassung.statistik(), prozess=os.getpid())
+    if metriken.verzeichnis is not None:
+        antwort["zulassung_gesamt"] = zulassung_aller_worker()
+    return jsonify(antwort)
+
+
+def zulassung_aller_worker():
+    # Aus den geteilten Metriken: Zähler summiert, Warteschlange je laufendem Worker
+    proben = {name: werte for name, _, _, werte in metriken.summen()}
+    wartend = {dict(paare)["worker"]: wert for _, paare, wert in proben.get("llm_warteschlange", [])}
+    return {
+        "worker": len(wartend),
+        "wartend": sum(wartend.values()),
+        "zugelassen": {dict(paare)["art"]: wert for _, paare, wert in proben.get("llm_zugelassen_gesamt", [])},
+        "abgewiesen": {dict(paare)["grund"]: wert for _, paare, wert in proben.get("llm_abgewiesen_gesamt", [])},
+    }
+
 
-    return render_template_string(html_template, result=result_data, eingabe=eingabe)
+@app.route("/metrics", methods=["GET"])
+def prometheus_metriken():
+    return Response(metriken.exposition(), mimetype="text/plain; version=0.0.4")
+
+
+def vorladen():
+    # Im Hauptprozess vor dem fork: was hier entsteht, teilen sich die Worker
+    # copy-on-write (Wahlkreisdaten und Templates liegen schon beim Import bereit)
+    global _backtests
+    baue_startseite()
+    schaetze_lokal({"CDU": 29, "B90/Grüne": 20, "AfD": 19, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 6})
+    _backtests = kalibrierung.Backtests()
+    gleiche_nachbarn_ab(sofort=True)
+    metriken.teile(METRIKEN_VERZEICHNIS or tempfile.mkdtemp(prefix="prognose-metriken-"))
+    # Die Simulationspools der Worker teilen sich die Kerne
+    begrenze_prozesse(server.verfuegbare_kerne() // server.worker_anzahl())
+    # openai bleibt hier ungeladen, sonst wartet der erste Start (Scale-to-zero)
+    # auf den Import; jeder Worker wärmt nach seiner ersten Antwort vor
+    # SQLite-Verbindungen dürfen einen fork nicht überdauern: im Hauptprozess
+    # schließen, jeder Worker öffnet in nach_fork() seine eigenen
+    schliesse_verbindungen()
+
+
+def schliesse_verbindungen():
+    llm_cache.schliesse()
+    umfragespeicher.schliesse()
+    if geteilte_budgets is not None:
+        geteilte_budgets.schliesse()
+
+
+def nach_fork():
+    llm_cache.verbinde()
+    umfragespeicher.verbinde()
+    if geteilte_budgets is not None:
+        geteilte_budgets.verbinde()
+    metriken.starte_abgleich()
+
+
+def beende():
+    # Beim Herunterfahren eines Workers: laufende LLM-Aufrufe abwarten, Client schließen
+    try:
+        llm_dienst.beende()
+    except Exception as e:
+        logger.warning("Beenden des LLM-Dienstes fehlgeschlagen: %s", e)
+    schliesse_verbindungen()
+    metriken.beende_abgleich()
 
 
-# if __name__ == "__main__":
-    # app.run(debug=True, port=5000)
+startzeiten["import"] = time.perf_counter() - _IMPORT_START
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))  # Port von Railway
-    app.run(debug=True, host="0.0.0.0", port=port)
+    if os.getenv("FLASK_DEBUG") == "1":
+        # Entwicklung: ein Prozess mit Reloader und Debugger
+        app.run(debug=True, host="0.0.0.0", port=port)
+    else:
+        server.starte_produktion(app, port, vorladen, nach_fork, beende, metriken.prozess_beendet)
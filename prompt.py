@@ -0,0 +1,193 @@
+import json
+import logging
+import re
+import threading
+
+from wahlkreisdaten import PARTEIEN, BTW25_TABELLE, LTW21_TABELLE, lies_btw25, lies_ltw21
+
+# Prompts und Antwortformat für die Schätzung der Direktmandate durch das LLM.
+#
+# Protokoll "kompakt": kurze, feste Tabellen im System-Prompt (stabiler Präfix,
+# damit das Prompt-Caching des Anbieters greift), nur die Prognose wechselt im
+# Nutzer-Prompt. Die Antwort wird per JSON-Schema erzwungen und geprüft.
+# Protokoll "text": der ursprüngliche Freitext-Prompt, Antwort per Regex.
+
+PROTOKOLLE = ("kompakt", "text")
+
+logger = logging.getLogger(__name__)
+
+
+class AntwortFehler(ValueError):
+    pass
+
+
+# Ursprünglicher Freitext-Prompt (Protokoll "text")
+system_prompt = f"""
+Du bist ein Prognosetool zur Schätzung der Direktmandate bei der Landtagswahl Baden-Württemberg 2026. Grundlage ist eine Wahlprognose mit Zweitstimmenanteilen in Prozent.
+
+Aufgabe:
+Schätze, wie viele der 70 Direktmandate (Mehrheitswahl) jede Partei in den 70 Wahlkreisen von Baden-Württemberg gewinnt. Gehe vereinfachend davon aus, dass Erst- und Zweitstimmen gleich verteilt sind.
+
+Datenbasis:
+Nutze typische regionale Muster der Bundestagswahl 2025. 
+Die folgende Tabelle enthält die Bundestagswahlzweitstimmenverteilung in den 37 Bundestagswahlkreisen in BW (in Dezimalwerten):
+
+{BTW25_TABELLE}
+
+Hier als Hilfestellung das Ergebnis der Landtagswahl nach (70) Wahlkreisen:
+{LTW21_TABELLE}
+
+Hinweise:
+- Es gibt genau 70 Direktmandate.
+- Parteien, die flächig starke Regionen haben, gewinnen dort eher Direktmandate.
+- Gib ausschließlich ein korrektes JSON-Objekt zurück – ohne Text, Erklärungen oder Formatierungen.
+
+Beispielausgabe:
+{{
+  "CDU": 60,
+  "B90/Grüne": 8,
+  "AfD": 2,
+  "SPD": 0,
+  "Linke": 0,
+  "FDP": 0,
+  "BSW": 0,
+  "Sonstige": 0
+}}
+"""
+
+def _tabelle(kopf, zeilen):
+    return "\n".join([kopf] + zeilen)
+
+
+def _zahl(wert):
+    # 7.0 -> "7", 7.5 -> "7.5"
+    return f"{wert:g}"
+
+
+def _kompakter_system_prompt():
+    btw_namen, btw_werte, btw_land = lies_btw25()
+    ltw_namen, ltw_werte = lies_ltw21()
+    ohne_bsw = [i for i, p in enumerate(PARTEIEN) if p != "BSW"]
+
+    btw = _tabelle(
+        "WK," + ",".join(PARTEIEN),
+        [",".join(["BW"] + [_zahl(x) for x in btw_land])]
+        + [",".join([name] + [_zahl(x) for x in werte]) for name, werte in zip(btw_namen, btw_werte)])
+    ltw = _tabelle(
+        "WK," + ",".join(PARTEIEN[i] for i in ohne_bsw),
+        [",".join([name] + [_zahl(werte[i]) for i in ohne_bsw]) for name, werte in zip(ltw_namen, ltw_werte)])
+
+    return f"""Schätze die Direktmandate der Landtagswahl Baden-Württemberg 2026: 70 Wahlkreise, Mehrheitswahl, Erststimmen = Zweitstimmen. Eingabe: Landesprognose in Prozent.
+Regionale Muster BTW 2025 (Prozent je Bundestagswahlkreis):
+{btw}
+LTW 2021 (Prozent je Landtagswahlkreis):
+{ltw}
+Parteien mit flächig starken Regionen gewinnen dort eher. Antworte mit der Zahl der Direktmandate je Partei, ganze Zahlen, Summe genau 70."""
+
+
+kompakter_system_prompt = _kompakter_system_prompt()
+
+# Antwort: genau die 8 Parteien als ganze Zahlen
+ANTWORT_SCHEMA = {
+    "type": "object",
+    "properties": {p: {"type": "integer"} for p in PARTEIEN},
+    "required": PARTEIEN,
+    "additionalProperties": False,
+}
+
+# Rund 8 Token je Partei (Schlüssel, Zahl, Trennzeichen) plus Klammern
+MAX_ANTWORT_TOKENS = 8 * len(PARTEIEN) + 16
+
+
+def system_prompt_fuer(protokoll):
+    return kompakter_system_prompt if protokoll == "kompakt" else system_prompt
+
+
+def baue_anfrage(eingabe, protokoll):
+    # Argumente für chat.completions.create (ohne Modell und Temperatur)
+    if protokoll == "text":
+        nutzer_prompt = f"Eingabeformat für die Prognose zur Landtagswahl Baden-Württemberg 2026 (Zweitstimmenanteile in Prozent):\n{eingabe}"
+        return {
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": nutzer_prompt}
+            ],
+            "max_tokens": 1000,
+        }
+    nutzer_prompt = ",".join(f"{p}={_zahl(eingabe.get(p, 0))}" for p in PARTEIEN)
+    return {
+        "messages": [
+            {"role": "system", "content": kompakter_system_prompt},
+            {"role": "user", "content": nutzer_prompt}
+        ],
+        "max_tokens": MAX_ANTWORT_TOKENS,
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": "direktmandate", "strict": True, "schema": ANTWORT_SCHEMA},
+        },
+    }
+
+
+def lies_antwort(text_output, protokoll):
+    if protokoll == "text":
+        json_block = re.search(r"\{.*\}", text_output, re.DOTALL)
+        if not json_block:
+            raise ValueError("Kein JSON-Block erkannt.")
+        cleaned = json_block.group(0).replace("'", '"')
+        gpt_result = json.loads(cleaned)
+        return {p: gpt_result.get(p, 0) for p in PARTEIEN}
+    return pruefe_direktmandate(text_output)
+
+
+def pruefe_direktmandate(text_output):
+    try:
+        daten = json.loads(text_output)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise AntwortFehler(f"Antwort ist kein JSON ({e}).")
+    if not isinstance(daten, dict) or set(daten) != set(PARTEIEN):
+        raise AntwortFehler("Antwort enthält nicht genau die 8 Parteien.")
+    if any(isinstance(v, bool) or not isinstance(v, int) or v < 0 for v in daten.values()):
+        raise AntwortFehler("Direktmandate müssen nichtnegative ganze Zahlen sein.")
+    if sum(daten.values()) != 70:
+        raise AntwortFehler(f"Summe der Direktmandate ist {sum(daten.values())} statt 70.")
+    return {p: daten[p] for p in PARTEIEN}
+
+
+class TokenVerbrauch:
+    # Summiert die Tokenzahlen aller LLM-Anfragen und protokolliert jede einzeln
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.anfragen = 0
+        self.prompt_tokens = 0
+        self.gecachte_tokens = 0
+        self.antwort_tokens = 0
+
+    def erfasse(self, usage, protokoll, dauer):
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        gecacht = getattr(details, "cached_tokens", 0) or 0
+        with self._lock:
+            self.anfragen += 1
+            self.prompt_tokens += usage.prompt_tokens
+            self.gecachte_tokens += gecacht
+            self.antwort_tokens += usage.completion_tokens
+        logger.info("LLM-Anfrage protokoll=%s prompt_tokens=%d gecacht=%d antwort_tokens=%d dauer_ms=%.0f",
+                    protokoll, usage.prompt_tokens, gecacht, usage.completion_tokens, dauer * 1000)
+
+    def tokens_je_anfrage(self):
+        # Mittlere Tokens (Prompt und Antwort) je Anfrage, None ohne Messung
+        with self._lock:
+            if not self.anfragen:
+                return None
+            return (self.prompt_tokens + self.antwort_tokens) / self.anfragen
+
+    def statistik(self):
+        with self._lock:
+            return {
+                "anfragen": self.anfragen,
+                "prompt_tokens": self.prompt_tokens,
+                "gecachte_tokens": self.gecachte_tokens,
+                "antwort_tokens": self.antwort_tokens,
+            }
@@ -0,0 +1,83 @@
+import gc
+import logging
+import os
+import signal
+import sys
+
+# Produktionsbetrieb: gunicorn mit vorab geforkten Workern (gthread, je Worker
+# mehrere Threads für die wartenden LLM-Aufrufe). Die App wird im
+# Hauptprozess geladen (preload), vorladen() füllt dort alles, was die Worker
+# teilen können; danach friert gc.freeze() die Objekte ein, damit der Garbage
+# Collector der Worker die gemeinsamen Seiten nicht anfasst und sie
+# copy-on-write geteilt bleiben. Nach dem fork öffnet jeder Worker eigene
+# Verbindungen (nach_fork), beim Beenden schließt er sie (beende). Ist ein
+# Worker beendet, erfährt der Hauptprozess das über kind_beendet(pid).
+#
+# SIGTERM (z. B. beim Deployment): keine neuen Verbindungen mehr, laufende
+# Anfragen dürfen bis WEB_GRACEFUL_TIMEOUT Sekunden fertig werden.
+#
+# Umgebung: WEB_CONCURRENCY (Worker, Standard: verfügbare Kerne), WEB_THREADS
+# (Threads je Worker), WEB_TIMEOUT (Sekunden, bis ein hängender Worker neu
+# gestartet wird; muss über LLM_FRIST plus Wartezeit liegen).
+# Ohne gunicorn (z. B. unter Windows) läuft der Werkzeug-Server mit Threads.
+
+logger = logging.getLogger(__name__)
+
+
+def verfuegbare_kerne():
+    # Kerne, auf denen der Prozess laufen darf (Container-Limits), sonst alle
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def worker_anzahl():
+    return int(os.getenv("WEB_CONCURRENCY") or verfuegbare_kerne())
+
+
+def einstellungen(port, nach_fork, beende, kind_beendet=None):
+    return {
+        "bind": f"0.0.0.0:{port}",
+        "workers": worker_anzahl(),
+        "worker_class": "gthread",
+        "threads": int(os.getenv("WEB_THREADS", 8)),
+        "preload_app": True,
+        "timeout": int(os.getenv("WEB_TIMEOUT", 60)),
+        "graceful_timeout": int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30)),
+        "keepalive": 5,
+        "post_fork": lambda server, worker: nach_fork(),
+        "worker_exit": lambda server, worker: beende(),
+        "child_exit": lambda server, worker: kind_beendet(worker.pid) if kind_beendet else None,
+    }
+
+
+def starte_produktion(app, port, vorladen, nach_fork, beende, kind_beendet=None):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # gunicorn fehlt oder läuft auf dieser Plattform nicht (fcntl)
+        logger.warning("gunicorn nicht verfügbar, starte Werkzeug mit Threads in einem Prozess")
+        return starte_einzeln(app, port, beende)
+
+    class Anwendung(BaseApplication):
+
+        def load_config(self):
+            for name, wert in einstellungen(port, nach_fork, beende, kind_beendet).items():
+                self.cfg.set(name, wert)
+
+        def load(self):
+            return app
+
+    vorladen()
+    gc.collect()
+    gc.freeze()
+    Anwendung().run()
+
+
+def starte_einzeln(app, port, beende):
+    # SIGTERM wie Strg+C behandeln, damit beende() auch hier läuft
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        app.run(host="0.0.0.0", port=port, threaded=True)
+    finally:
+        beende()
@@ -0,0 +1,205 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from direktmandate import schaetze_direktmandate_matrix
+from koalitionen import koalitionswahrscheinlichkeiten
+from sitzverteilung import GRUNDSITZE, STIMMEN_FAKTOR
+from wahlkreisdaten import PARTEIEN
+
+# Monte-Carlo-Simulation der Sitzverteilung: Die Umfrageanteile werden mit
+# ihrer Stichprobenunsicherheit gezogen, danach laufen 5-%-Hürde, Direktmandate
+# und Sainte-Laguë (inkl. Überhang und Ausgleich) für alle Ziehungen zugleich
+# auf NumPy-Arrays. Große Simulationen werden blockweise auf Prozesse verteilt.
+
+VERTEILUNGEN = ("dirichlet", "multinomial")
+MAX_ZIEHUNGEN = 1_000_000
+
+# Ziehungen je Block; begrenzt den Speicher für die Wahlkreismatrix (Block x 70 x 8)
+BLOCKGROESSE = 5000
+
+# Ab dieser Zahl von Ziehungen lohnt sich der Prozesspool
+MIN_ZIEHUNGEN_POOL = 50_000
+
+# Größe des Pools je Prozess; mit mehreren Web-Workern siehe begrenze_prozesse()
+SIMULATION_PROZESSE = int(os.getenv("SIMULATION_PROZESSE", os.cpu_count() or 1))
+
+_HUERDE = 5
+_MIT_SITZEN = np.array([p != "Sonstige" for p in PARTEIEN])
+_pool = None
+
+
+def ziehe_anteile(eingabe, ziehungen, stichprobe, verteilung, rng):
+    # Liefert (ziehungen, 8) Prozentwerte um die eingegebenen Anteile
+    p = np.array([float(eingabe.get(partei, 0)) for partei in PARTEIEN])
+    p = p / p.sum()
+    if verteilung == "dirichlet":
+        gamma = rng.standard_gamma(np.broadcast_to(p * stichprobe, (ziehungen, len(p))))
+        return 100 * gamma / gamma.sum(axis=1, keepdims=True)
+    if verteilung == "multinomial":
+        return 100 * rng.multinomial(stichprobe, p, size=ziehungen) / stichprobe
+    raise ValueError(f"Unbekannte Verteilung: {verteilung}")
+
+
+def saint_lague_matrix(anteile, sitzzahl):
+    # Sainte-Laguë für viele Zeilen zugleich (Sitzzahl je Zeile), mit denselben
+    # Höchstzahlen wie SainteLagueStrom. Start mit Standardrundung, danach wird
+    # je Durchlauf pro Zeile ein Sitz nach der höchsten offenen Höchstzahl
+    # ergänzt, nach der kleinsten vergebenen entzogen oder beides getauscht,
+    # bis die Sitze genau die ersten Höchstzahlen der Reihenfolge sind.
+    # Gleichstände wie im Strom: vergeben wird an die vordere Partei, entzogen
+    # bei der hinteren.
+    sitzzahl = np.broadcast_to(sitzzahl, anteile.shape[:1])
+    stimmen = anteile * STIMMEN_FAKTOR
+    sitze = np.floor(anteile * sitzzahl[:, None] + 0.5).astype(np.int64)
+    zeilen = np.arange(len(anteile))
+    letzte_spalte = anteile.shape[1] - 1
+    while True:
+        naechste = stimmen / (2 * sitze + 1)
+        with np.errstate(divide="ignore"):
+            letzte = np.where(sitze > 0, stimmen / (2 * sitze - 1), np.inf)
+        plus = naechste.argmax(axis=1)
+        minus = letzte_spalte - letzte[:, ::-1].argmin(axis=1)
+        q_plus = naechste[zeilen, plus]
+        q_minus = letzte[zeilen, minus]
+        differenz = sitzzahl - sitze.sum(axis=1)
+        # Offene Höchstzahl liegt vor einer vergebenen: Sitz tauschen
+        vertauscht = (q_plus > q_minus) | ((q_plus == q_minus) & (plus < minus))
+        ergaenzen = (differenz > 0) | ((differenz == 0) & vertauscht)
+        entziehen = (differenz < 0) | ((differenz == 0) & vertauscht)
+        if not (ergaenzen.any() or entziehen.any()):
+            return sitze
+        sitze[zeilen[ergaenzen], plus[ergaenzen]] += 1
+        sitze[zeilen[entziehen], minus[entziehen]] -= 1
+
+
+def raenge_matrix(anteile, direktmandate):
+    # Kleinste Sitzzahl je Zeile und Partei, ab der die Partei ihre
+    # Direktmandate durch Sainte-Laguë erreicht (0 ohne Direktmandate). Wie
+    # SainteLagueStrom.rang: gezählt werden die Höchstzahlen der anderen
+    # Parteien vor der benötigten, bei Gleichstand die der vorderen Parteien.
+    # Die Schätzung wird mit denselben Divisionen nachkorrigiert.
+    stimmen = anteile * STIMMEN_FAKTOR
+    benoetigt = np.where(stimmen > 0, direktmandate, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quotient = np.where(benoetigt > 0, stimmen / (2 * benoetigt - 1), np.inf)[:, :, None]
+        andere = stimmen[:, None, :]
+        anzahl = np.floor((andere / quotient + 1) / 2).astype(np.int64)
+    parteien = np.arange(anteile.shape[1])
+    vorher = parteien[None, :] < parteien[:, None]
+    zaehlen = (andere > 0) & (parteien[None, :] != parteien[:, None]) & np.isfinite(quotient)
+    anzahl = np.where(zaehlen, np.maximum(anzahl, 0), 0)
+
+    def davor(i):
+        q = andere / (2 * i + 1)
+        return zaehlen & ((q > quotient) | (vorher & (q == quotient)))
+
+    while True:
+        zu_viel = (anzahl > 0) & ~davor(np.maximum(anzahl - 1, 0))
+        if not zu_viel.any():
+            break
+        anzahl -= zu_viel
+    while True:
+        zu_wenig = davor(anzahl)
+        if not zu_wenig.any():
+            break
+        anzahl += zu_wenig
+    return benoetigt + anzahl.sum(axis=2)
+
+
+def verteile_matrix(prognosen, direktmandate):
+    # Entspricht berechne_verteilung für jede Zeile von `prognosen` (Prozent,
+    # Parteien in der Reihenfolge von PARTEIEN), auch bei Gleichständen
+    zugelassen = (prognosen >= _HUERDE) & _MIT_SITZEN
+    stimmen = np.where(zugelassen, prognosen, 0)
+    # Spaltenweise aufsummiert wie die Summe in _vorbereite, damit die
+    # normierten Anteile bitgenau übereinstimmen
+    summe = np.zeros(len(stimmen))
+    for spalte in stimmen.T:
+        summe = summe + spalte
+    summe = summe[:, None]
+    anteile = np.divide(stimmen, summe, out=np.zeros_like(stimmen), where=summe > 0)
+    # Ohne Partei über der Hürde bleibt der Landtag in dieser Ziehung leer
+    gueltig = summe[:, 0] > 0
+
+    grundverteilung = saint_lague_matrix(anteile, np.where(gueltig, GRUNDSITZE, 0))
+    ueberhang = np.where(zugelassen, np.maximum(direktmandate - grundverteilung, 0), 0)
+    min_sitze = GRUNDSITZE + ueberhang.sum(axis=1)
+    gesamt = np.maximum(min_sitze, raenge_matrix(anteile, direktmandate).max(axis=1))
+    gesamt = np.where(gueltig, gesamt, 0)
+    return saint_lague_matrix(anteile, gesamt), ueberhang.sum(axis=1)
+
+
+def _simuliere_block(eingabe, ziehungen, stichprobe, verteilung, direktmandate, seed):
+    rng = np.random.default_rng(seed)
+    prognosen = ziehe_anteile(eingabe, ziehungen, stichprobe, verteilung, rng)
+    if direktmandate is None:
+        # Direktmandate je Ziehung aus dem lokalen Swing-Modell
+        direkt = schaetze_direktmandate_matrix(prognosen)
+    else:
+        direkt = np.broadcast_to([direktmandate.get(p, 0) for p in PARTEIEN], prognosen.shape)
+    sitze, ueberhang = verteile_matrix(prognosen, direkt)
+    return prognosen.astype(np.float32), sitze.astype(np.int16), ueberhang.astype(np.int16)
+
+
+def simuliere(eingabe, ziehungen=100_000, stichprobe=1000, verteilung="dirichlet",
+              direktmandate=None, seed=None, prozesse=None):
+    # Liefert Anteile (Prozent), Sitze und Überhangmandate je Ziehung
+    if verteilung not in VERTEILUNGEN:
+        raise ValueError(f"Unbekannte Verteilung: {verteilung}")
+    if not 0 < ziehungen <= MAX_ZIEHUNGEN:
+        raise ValueError(f"Anzahl der Ziehungen muss zwischen 1 und {MAX_ZIEHUNGEN} liegen.")
+    bloecke = [min(BLOCKGROESSE, ziehungen - start) for start in range(0, ziehungen, BLOCKGROESSE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(bloecke))
+    auftraege = [(eingabe, n, stichprobe, verteilung, direktmandate, s) for n, s in zip(bloecke, seeds)]
+
+    prozesse = SIMULATION_PROZESSE if prozesse is None else prozesse
+    if prozesse > 1 and ziehungen >= MIN_ZIEHUNGEN_POOL:
+        teile = list(_prozesspool(prozesse).map(_simuliere_block, *zip(*auftraege)))
+    else:
+        teile = [_simuliere_block(*auftrag) for auftrag in auftraege]
+    return tuple(np.concatenate(spalte) for spalte in zip(*teile))
+
+
+def begrenze_prozesse(anzahl):
+    # Jeder Web-Worker hat seinen eigenen Pool: ohne ausdrückliches
+    # SIMULATION_PROZESSE erhält jeder nur seinen Anteil der Kerne
+    global SIMULATION_PROZESSE
+    if "SIMULATION_PROZESSE" not in os.environ:
+        SIMULATION_PROZESSE = max(1, anzahl)
+
+
+def _prozesspool(prozesse):
+    # "spawn" statt fork: die Web-Worker haben mehrere Threads (Anfragen,
+    # Ereignisschleife des LLM-Dienstes) und offene SQLite-Verbindungen, die
+    # ein fork samt gehaltener Locks in die Kinder kopieren würde
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=prozesse, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def fasse_zusammen(prognosen, sitze, ueberhang):
+    gesamt = sitze.sum(axis=1)
+    parteien = {}
+    for i, p in enumerate(PARTEIEN):
+        if p == "Sonstige":
+            continue
+        werte, anzahl = np.unique(sitze[:, i], return_counts=True)
+        parteien[p] = {
+            "sitze_mittel": round(float(sitze[:, i].mean()), 2),
+            "sitze_quantile": {f"{q}%": int(np.percentile(sitze[:, i], q)) for q in (5, 50, 95)},
+            "sitze_verteilung": {int(w): round(a / len(sitze), 5) for w, a in zip(werte, anzahl)},
+            "p_ueber_huerde": round(float((prognosen[:, i] >= _HUERDE).mean()), 5),
+        }
+    werte, anzahl = np.unique(gesamt, return_counts=True)
+    return {
+        "ziehungen": len(sitze),
+        "parteien": parteien,
+        "gesamtzahl_mittel": round(float(gesamt.mean()), 2),
+        "gesamtzahl_verteilung": {int(w): round(a / len(sitze), 5) for w, a in zip(werte, anzahl)},
+        "ueberhangmandate_mittel": round(float(ueberhang.mean()), 2),
+        "koalitionen": koalitionswahrscheinlichkeiten(sitze),
+    }
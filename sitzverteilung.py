@@ -0,0 +1,328 @@
+import heapq
+import math
+
+# Sitzzuteilung nach Sainte-Laguë (Höchstzahlverfahren mit Teilern 1, 3, 5, ...)
+# inkl. Überhang- und Ausgleichsmandaten für den Landtag von Baden-Württemberg.
+# Zum Vergleich stehen weitere Verfahren in VERFAHREN bereit (D'Hondt,
+# Hare-Niemeyer); alle teilen sich Hürde und Normierung der Anteile.
+
+GRUNDSITZE = 120
+
+# Anteile werden wie bisher auf eine Million "Stimmen" hochgerechnet, damit die
+# Quotienten (und damit auch Gleichstände) exakt der alten Berechnung entsprechen
+STIMMEN_FAKTOR = 1_000_000
+
+HINWEIS_OHNE_SITZE = "Keine Partei erreicht die 5-%-Hürde, es werden keine Sitze vergeben."
+
+
+class Hoechstzahlstrom:
+    # Vergibt die Sitze einzeln in der Reihenfolge der Höchstzahlen
+    # stimmen / (schritt * k + start) für den (k+1)-ten Sitz. Die Reihenfolge
+    # ist unabhängig von der Größe des Landtags, daher wird der bereits
+    # berechnete Teil bei einer Vergrößerung weiterverwendet.
+    # Gleichstände gehen an die Partei, die in den Anteilen zuerst steht.
+    # Mit `quelle` (Quotientenstrom) liest der Strom seine Höchstzahlen aus
+    # einem mit anderen Verfahren geteilten Strom statt aus einem eigenen Heap.
+
+    schritt = 2
+    start = 1
+
+    def __init__(self, anteile, quelle=None):
+        self.parteien = list(anteile)
+        self.stimmen = [anteile[p] * STIMMEN_FAKTOR for p in self.parteien]
+        self.reihenfolge = []
+        # Höchstzahlverfahren sind hausmonoton, die Größe wird direkt bestimmt
+        self.groessenschritte = 0
+        self._quelle = quelle
+        if quelle is not None:
+            quelle.lies(self)
+            return
+        self._heap = [(-s / self.start, i, 0) for i, s in enumerate(self.stimmen)]
+        heapq.heapify(self._heap)
+
+    def _erweitere(self, sitzzahl):
+        if self._quelle is not None:
+            while len(self.reihenfolge) < sitzzahl:
+                self._quelle.weiter()
+            return
+        while len(self.reihenfolge) < sitzzahl:
+            _, i, k = heapq.heappop(self._heap)
+            self.reihenfolge.append(i)
+            heapq.heappush(self._heap, (-self.stimmen[i] / (self.schritt * (k + 1) + self.start), i, k + 1))
+
+    def sitze(self, sitzzahl):
+        self._erweitere(sitzzahl)
+        zaehler = [0] * len(self.parteien)
+        for i in self.reihenfolge[:sitzzahl]:
+            zaehler[i] += 1
+        return dict(zip(self.parteien, zaehler))
+
+    def rang(self, partei, anzahl):
+        # Kleinste Sitzzahl, bei der `partei` mindestens `anzahl` Sitze erhält,
+        # direkt aus den Teilern berechnet (ohne die Sitze einzeln zu vergeben)
+        if anzahl <= 0:
+            return 0
+        p = self.parteien.index(partei)
+        if self.stimmen[p] <= 0:
+            raise ValueError(f"{partei} hat keine Stimmen und kann keine Sitze erhalten.")
+        quotient = self.stimmen[p] / (self.schritt * (anzahl - 1) + self.start)
+
+        rang = anzahl
+        for j, s in enumerate(self.stimmen):
+            if j != p:
+                rang += self._anzahl_vor(s, quotient, gleichstand_vorher=j < p)
+        return rang
+
+    def _anzahl_vor(self, stimmen, quotient, gleichstand_vorher):
+        # Anzahl der Quotienten stimmen / (schritt * i + start), die vor
+        # `quotient` einsortiert werden. Die Schätzung wird mit denselben
+        # Gleitkommadivisionen wie in der Zuteilung nachkorrigiert, damit
+        # Rundungsgrenzen exakt übereinstimmen.
+        if stimmen <= 0:
+            return 0
+
+        def davor(i):
+            q = stimmen / (self.schritt * i + self.start)
+            return q > quotient or (gleichstand_vorher and q == quotient)
+
+        n = max(0, int((stimmen / quotient - self.start + self.schritt) // self.schritt))
+        while n > 0 and not davor(n - 1):
+            n -= 1
+        while davor(n):
+            n += 1
+        return n
+
+    def mindestgroesse(self, direktmandate, untergrenze):
+        # Kleinste Sitzzahl ≥ untergrenze, bei der jede Partei ihre Direktmandate
+        # abdeckt. Hausmonoton, daher genügt das Maximum der Ränge.
+        groesse = untergrenze
+        for p in self.parteien:
+            benoetigt = direktmandate.get(p, 0)
+            if benoetigt > 0:
+                groesse = max(groesse, self.rang(p, math.ceil(benoetigt)))
+        return groesse
+
+
+class Quotientenstrom:
+    # Alle Höchstzahlen stimmen / d mit den Teilern d = 1, 2, 3, ... absteigend
+    # (Gleichstand: vordere Partei). Die Teiler von Sainte-Laguë (1, 3, 5, ...)
+    # und D'Hondt (1, 2, 3, ...) sind darin enthalten, und ihre Reihenfolgen
+    # sind genau die passenden Einträge dieses Stroms. Im Vergleich der
+    # Verfahren wird so jede Höchstzahl nur einmal berechnet und einsortiert.
+
+    def __init__(self, stimmen):
+        self.stimmen = stimmen
+        self._leser = []
+        self._heap = [(-s, i, 1) for i, s in enumerate(stimmen)]
+        heapq.heapify(self._heap)
+
+    def lies(self, strom):
+        # Höchstzahlstrom mit ganzzahligen Teilern schritt * k + start
+        self._leser.append((strom.reihenfolge, strom.schritt, strom.start))
+
+    def weiter(self):
+        _, i, d = heapq.heappop(self._heap)
+        for reihenfolge, schritt, start in self._leser:
+            if (d - start) % schritt == 0:
+                reihenfolge.append(i)
+        heapq.heappush(self._heap, (-self.stimmen[i] / (d + 1), i, d + 1))
+
+
+class SainteLagueStrom(Hoechstzahlstrom):
+    # Teiler 1, 3, 5, ...
+    schritt = 2
+    start = 1
+
+
+class DHondtStrom(Hoechstzahlstrom):
+    # Teiler 1, 2, 3, ...
+    schritt = 1
+    start = 1
+
+
+class HareNiemeyer:
+    # Größter Rest: jede Partei erhält den ganzzahligen Teil ihres Anteils, die
+    # restlichen Sitze gehen nach den größten Resten (bei Gleichstand an die
+    # zuerst genannte Partei). Nicht hausmonoton (Alabama-Paradoxon), daher wird
+    # die Größe für die Direktmandate schrittweise gesucht.
+
+    def __init__(self, anteile):
+        self.parteien = list(anteile)
+        self.anteile = [anteile[p] for p in self.parteien]
+        self.groessenschritte = 0
+
+    def sitze(self, sitzzahl):
+        ideal = [a * sitzzahl for a in self.anteile]
+        zaehler = [math.floor(x) for x in ideal]
+        rest = sitzzahl - sum(zaehler)
+        reihenfolge = sorted(range(len(ideal)), key=lambda i: ideal[i] - zaehler[i], reverse=True)
+        for i in reihenfolge[:rest]:
+            zaehler[i] += 1
+        return dict(zip(self.parteien, zaehler))
+
+    def mindestgroesse(self, direktmandate, untergrenze):
+        # Mehr als anteil * n + 1 Sitze sind bei n Sitzen nicht möglich, kleinere
+        # Größen werden daher übersprungen
+        groesse = untergrenze
+        for p, anteil in zip(self.parteien, self.anteile):
+            benoetigt = direktmandate.get(p, 0)
+            if benoetigt > 1 and anteil > 0:
+                groesse = max(groesse, math.floor((benoetigt - 1) / anteil))
+        while True:
+            sitze = self.sitze(groesse)
+            if all(sitze[p] >= direktmandate.get(p, 0) for p in self.parteien):
+                return groesse
+            groesse += 1
+            self.groessenschritte += 1
+
+
+# Registrierte Verfahren: Name -> (Bezeichnung, Klasse mit sitze() und mindestgroesse())
+VERFAHREN = {}
+STANDARD_VERFAHREN = "sainte-lague"
+
+
+def registriere_verfahren(name, bezeichnung, klasse):
+    VERFAHREN[name] = (bezeichnung, klasse)
+
+
+registriere_verfahren("sainte-lague", "Sainte-Laguë", SainteLagueStrom)
+registriere_verfahren("hare-niemeyer", "Hare-Niemeyer", HareNiemeyer)
+registriere_verfahren("dhondt", "D'Hondt", DHondtStrom)
+
+
+def berechne_verteilung(eingabe, direktmandate, verfahren=STANDARD_VERFAHREN):
+    return berechne_verteilung_details(eingabe, direktmandate, verfahren)["sitze"]
+
+
+def berechne_verteilung_details(eingabe, direktmandate, verfahren=STANDARD_VERFAHREN):
+    # Wie berechne_verteilung, zusätzlich mit Überhang- und Ausgleichsmandaten
+    return _details(_verteile(eingabe, direktmandate, verfahren))
+
+
+def vergleiche_verfahren(eingabe, direktmandate, verfahren=None):
+    # Alle (bzw. die genannten) Verfahren auf denselben normierten Anteilen;
+    # Höchstzahlverfahren lesen aus einem gemeinsamen Quotientenstrom
+    vorbereitung = _vorbereite(eingabe)
+    _, anteile, _ = vorbereitung
+    verfahren = verfahren or list(VERFAHREN)
+    quelle = Quotientenstrom([anteile[p] * STIMMEN_FAKTOR for p in anteile])
+    stroeme = {name: VERFAHREN[name][1](anteile, quelle) for name in verfahren
+               if name in VERFAHREN and issubclass(VERFAHREN[name][1], Hoechstzahlstrom)}
+    ergebnis = {}
+    for name in verfahren:
+        details = _details(_verteile(eingabe, direktmandate, name, vorbereitung, stroeme.get(name)))
+        # Größte Abweichung des Sitzanteils vom Stimmenanteil in Prozentpunkten
+        gesamt = details["sitze"]["Gesamtzahl der Sitze"]
+        details["abweichung_max"] = round(max(
+            (abs(details["sitze"][p] / gesamt - a) * 100 for p, a in anteile.items() if gesamt), default=0), 2)
+        details["bezeichnung"] = VERFAHREN[name][0]
+        if not gesamt:
+            details["hinweis"] = HINWEIS_OHNE_SITZE
+        ergebnis[name] = details
+    return ergebnis
+
+
+def _details(verteilung):
+    return {k: verteilung[k] for k in ("sitze", "ueberhang", "ueberhangmandate", "ausgleichsmandate")}
+
+
+def _vorbereite(eingabe):
+    # Nur Parteien ≥ 5 % (außer Sonstige)
+    parteien_mit_sitzen = [
+        p for p in eingabe if eingabe[p] >= 5 and p != "Sonstige"]
+
+    # Prozentuale Anteile der berücksichtigten Parteien (normiert)
+    gesamt_prozent = sum(eingabe[p] for p in parteien_mit_sitzen)
+    anteile = {p: eingabe[p] / gesamt_prozent for p in parteien_mit_sitzen}
+    return parteien_mit_sitzen, anteile, gesamt_prozent
+
+
+def _verteile(eingabe, direktmandate, verfahren=STANDARD_VERFAHREN, vorbereitung=None, strom=None):
+    if verfahren not in VERFAHREN:
+        raise ValueError(f"Unbekanntes Verfahren: {verfahren}")
+    parteien_mit_sitzen, anteile, gesamt_prozent = vorbereitung or _vorbereite(eingabe)
+
+    strom = strom or VERFAHREN[verfahren][1](anteile)
+
+    if parteien_mit_sitzen:
+        # Erste Verteilung mit 120 Sitzen
+        sitze_vor_rest = strom.sitze(GRUNDSITZE)
+
+        # Überhangmandate berechnen
+        ueberhang = {
+            p: max(0, direktmandate.get(p, 0) - sitze_vor_rest.get(p, 0))
+            for p in parteien_mit_sitzen
+        }
+        ges_ueberhang = sum(ueberhang.values())
+
+        # Neue Mindestgröße für den Landtag
+        min_sitze = max(GRUNDSITZE, sum(sitze_vor_rest.values()) + ges_ueberhang)
+
+        # Ausgleich: kleinste Sitzzahl, bei der alle Direktmandate abgedeckt sind
+        sitze = strom.sitze(strom.mindestgroesse(direktmandate, min_sitze))
+    else:
+        # Keine Partei über der Hürde: der Landtag bleibt leer (wie in der Simulation)
+        sitze, ueberhang, ges_ueberhang, min_sitze = {}, {}, 0, 0
+
+    # Restliche Parteien (auch < 5 %) auf 0 setzen
+    for p in eingabe:
+        if p != "Sonstige" and p not in sitze:
+            sitze[p] = 0
+
+    sitze["Sonstige"] = 0
+    sitze["Gesamtzahl der Sitze"] = sum(sitze.values())
+
+    return {
+        "sitze": sitze,
+        "ueberhang": ueberhang,
+        "ueberhangmandate": ges_ueberhang,
+        "ausgleichsmandate": sitze["Gesamtzahl der Sitze"] - min_sitze,
+        "mindestgroesse": min_sitze,
+        "strom": strom,
+        "gesamt_prozent": gesamt_prozent,
+    }
+
+
+def analysiere_schwellen(eingabe, direktmandate):
+    # Abstand jeder Partei zum nächsten Sitzgewinn bzw. -verlust in
+    # Prozentpunkten, abgelesen aus den Höchstzahlen der endgültigen Verteilung.
+    # Dabei bleiben die Stimmen der übrigen Parteien und die Größe des Landtags
+    # fest. Parteien, deren Direktmandate die Größe bestimmen, werden markiert:
+    # dort würde sich mit dem Ergebnis auch die Zahl der Ausgleichsmandate ändern.
+    verteilung = _verteile(eingabe, direktmandate)
+    strom = verteilung["strom"]
+    groesse = verteilung["sitze"]["Gesamtzahl der Sitze"]
+    sitze = strom.sitze(groesse)
+    prozentpunkte = verteilung["gesamt_prozent"] / STIMMEN_FAKTOR
+
+    # Kleinste vergebene und größte nicht mehr vergebene Höchstzahl je Partei
+    letzte = {p: v / (2 * sitze[p] - 1) for p, v in zip(strom.parteien, strom.stimmen) if sitze[p] > 0}
+    naechste = {p: v / (2 * sitze[p] + 1) for p, v in zip(strom.parteien, strom.stimmen)}
+
+    schwellen = {}
+    for p in eingabe:
+        if p == "Sonstige":
+            continue
+        if p not in sitze:
+            schwellen[p] = {"sitze": 0, "plus_eins": round(5 - eingabe[p], 2), "minus_eins": None,
+                            "abstand_huerde": round(eingabe[p] - 5, 2), "bestimmt_groesse": False}
+            continue
+        v = strom.stimmen[strom.parteien.index(p)]
+        andere_letzte = [q for partei, q in letzte.items() if partei != p]
+        andere_naechste = [q for partei, q in naechste.items() if partei != p]
+        plus = min(andere_letzte) * (2 * sitze[p] + 1) - v if andere_letzte else None
+        minus = max(andere_naechste) * (2 * sitze[p] - 1) - v if sitze[p] > 0 and andere_naechste else None
+        eintrag = {
+            "sitze": sitze[p],
+            "plus_eins": None if plus is None else round(plus * prozentpunkte, 2),
+            "minus_eins": None if minus is None else round(minus * prozentpunkte, 2),
+            "abstand_huerde": round(eingabe[p] - 5, 2),
+            "bestimmt_groesse": False,
+        }
+        benoetigt = direktmandate.get(p, 0)
+        if benoetigt > 0:
+            rang = strom.rang(p, math.ceil(benoetigt))
+            eintrag["bestimmt_groesse"] = rang == groesse and groesse > GRUNDSITZE
+            eintrag["spielraum_groesse"] = groesse - rang
+        schwellen[p] = eintrag
+    return schwellen
@@ -0,0 +1,40 @@
+import numpy as np
+
+from direktmandate import DIREKTMANDATE, runde_auf_summe
+from prompt import AntwortFehler
+from wahlkreisdaten import PARTEIEN
+
+# Ensemble aus mehreren Antworten des LLM zur selben Prognose: Bei
+# Temperatur > 0 schwankt die Verteilung der Direktmandate von Aufruf zu
+# Aufruf. Jede Stichprobe wird einzeln geprüft, der Konsens ist der Median je
+# Partei, wieder auf 70 ganze Mandate gebracht. Die Streuung zeigt, wie einig
+# sich die Stichproben waren.
+
+
+def pruefe_stichprobe(direktmandate):
+    # Auch für das Protokoll "text", das Summe und Typen sonst nicht prüft
+    werte = [direktmandate.get(p) for p in PARTEIEN]
+    if any(isinstance(v, bool) or not isinstance(v, int) or v < 0 for v in werte):
+        raise AntwortFehler("Direktmandate müssen nichtnegative ganze Zahlen sein.")
+    if sum(werte) != DIREKTMANDATE:
+        raise AntwortFehler(f"Summe der Direktmandate ist {sum(werte)} statt {DIREKTMANDATE}.")
+    return dict(zip(PARTEIEN, werte))
+
+
+def konsens(stichproben, angefragt=None):
+    # Liefert (Direktmandate, Streuung). Streuung: Anzahl gültiger Stichproben,
+    # Spanne (min, max) je Partei und die mittlere Zahl der Wahlkreise, die eine
+    # Stichprobe anders vergibt als der Konsens
+    werte = np.array([[s[p] for p in PARTEIEN] for s in stichproben], dtype=float)
+    mitte = np.median(werte, axis=0)
+    if mitte.sum() == 0:
+        # Median überall 0 (völlig uneinige Stichproben): Mittelwert statt Median
+        mitte = werte.mean(axis=0)
+    ergebnis = runde_auf_summe(mitte * DIREKTMANDATE / mitte.sum(), DIREKTMANDATE)
+    abweichung = np.abs(werte - ergebnis).sum(axis=1).mean() / 2
+    return dict(zip(PARTEIEN, ergebnis.tolist())), {
+        "stichproben": len(stichproben),
+        "angefragt": angefragt or len(stichproben),
+        "abweichung": round(float(abweichung), 2),
+        "spanne": {p: [int(lo), int(hi)] for p, lo, hi in zip(PARTEIEN, werte.min(axis=0), werte.max(axis=0))},
+    }
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Die Module liegen flach im Projektverzeichnis
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Tests, die die App importieren: keine SQLite-Dateien im Arbeitsverzeichnis,
+# kein Vorwärmen und ein Platzhalter statt eines echten API-Schlüssels
+for name, wert in {"OPENAI_API_KEY": "test", "LLM_CACHE_PFAD": "", "UMFRAGEN_PFAD": "",
+                   "LLM_BUDGET_PFAD": "", "LLM_VORWAERMEN": "0"}.items():
+    os.environ.setdefault(name, wert)
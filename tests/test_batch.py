@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+import prognose_tool_ltw26 as app_modul
+from sitzverteilung import berechne_verteilung
+from wahlkreisdaten import PARTEIEN
+
+UMFRAGE = {"CDU": 29, "B90/Grüne": 20, "AfD": 20, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 5}
+
+SZENARIEN = [
+    {"id": "a", "eingabe": UMFRAGE, "engine": "local"},
+    {"id": "summe", "eingabe": {**UMFRAGE, "CDU": 30}, "engine": "local"},
+    {"id": "partei", "eingabe": {**UMFRAGE, "Piraten": 0}, "engine": "local"},
+    {"id": "engine", "eingabe": UMFRAGE, "engine": "orakel"},
+    {"id": "b", "eingabe": UMFRAGE, "engine": "local"},
+]
+
+
+@pytest.fixture
+def client():
+    return app_modul.app.test_client()
+
+
+def pruefe_ergebnisse(ergebnisse):
+    assert [e["index"] for e in ergebnisse] == list(range(len(SZENARIEN)))
+    # Ein Szenario, das sich nicht lesen lässt, hat keine id, nur den Index
+    assert [e["id"] for e in ergebnisse] == ["a", "summe", None, "engine", "b"]
+    gut, summe, partei, engine, gleich = ergebnisse
+    direktmandate = app_modul.schaetze_lokal(UMFRAGE)
+    erwartet = berechne_verteilung(UMFRAGE, direktmandate)
+    assert gut["sitze"] == {p: erwartet[p] for p in PARTEIEN}
+    assert gut["gesamtzahl"] == erwartet["Gesamtzahl der Sitze"]
+    assert gut["direktmandate"] == direktmandate and gut["koalitionen"]
+    assert gleich["sitze"] == gut["sitze"]
+    assert "Summe" in summe["fehler"]
+    assert "Piraten" in partei["fehler"]
+    assert "orakel" in engine["fehler"]
+
+
+def test_json_array(client):
+    antwort = client.post("/api/prognose/batch", json=SZENARIEN)
+    assert antwort.status_code == 200
+    daten = antwort.get_json()
+    assert daten["anzahl"] == 5 and daten["fehler"] == 3
+    pruefe_ergebnisse(daten["ergebnisse"])
+    # Beide gültigen Szenarien sind gleich: ihre minimalen Koalitionen immer
+    assert [k["koalition"] for k in daten["koalitionen"]] == daten["ergebnisse"][0]["koalitionen"]
+    assert all(k["p_minimal"] == k["p_mehrheit"] == 1 for k in daten["koalitionen"])
+
+
+def test_json_ohne_array(client):
+    antwort = client.post("/api/prognose/batch", json={"eingabe": UMFRAGE})
+    assert antwort.status_code == 400
+
+
+def test_ndjson_mit_kaputter_zeile(client):
+    zeilen = [json.dumps(s) for s in SZENARIEN]
+    # Kaputte Zeile und Leerzeile zwischen den Szenarien
+    zeilen[2:2] = ['{"id": "kaputt", "eingabe": {', ""]
+    antwort = client.post("/api/prognose/batch", data="\n".join(zeilen) + "\n",
+                          content_type="application/x-ndjson")
+    assert antwort.status_code == 200 and antwort.mimetype == "application/x-ndjson"
+    ergebnisse = [json.loads(zeile) for zeile in antwort.get_data(as_text=True).splitlines()]
+    assert len(ergebnisse) == 6
+    kaputt = ergebnisse.pop(2)
+    assert kaputt["index"] == 2 and kaputt["id"] is None and kaputt["fehler"].startswith("Fehler:")
+    for index, ergebnis in enumerate(ergebnisse):
+        ergebnis["index"] = index
+    pruefe_ergebnisse(ergebnisse)
+
+
+def test_gleiche_szenarien_einmal_ermittelt(client, monkeypatch):
+    aufrufe = []
+
+    def zaehlend(eingabe, engine):
+        aufrufe.append(engine)
+        return app_modul.schaetze_lokal(eingabe), ""
+    monkeypatch.setattr(app_modul, "ermittle_direktmandate", zaehlend)
+    antwort = client.post("/api/prognose/batch", json=SZENARIEN)
+    assert antwort.get_json()["fehler"] == 3
+    assert aufrufe == ["local"]
@@ -0,0 +1,73 @@
+import gzip
+
+import pytest
+
+import prognose_tool_ltw26 as app_modul
+
+UMFRAGE = {"CDU": 29, "B90/Grüne": 20, "AfD": 20, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 5}
+
+
+@pytest.fixture
+def client():
+    return app_modul.app.test_client()
+
+
+def test_startseite_unkomprimiert_mit_etag(client):
+    antwort = client.get("/")
+    assert antwort.status_code == 200
+    assert "Content-Encoding" not in antwort.headers
+    assert "Accept-Encoding" in antwort.vary
+    assert antwort.headers["Cache-Control"] == "no-cache"
+    assert antwort.get_etag()[0] and b"<html" in antwort.data
+
+
+def test_startseite_gzip_mit_eigenem_etag(client):
+    klar = client.get("/")
+    antwort = client.get("/", headers={"Accept-Encoding": "gzip, deflate"})
+    assert antwort.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in antwort.vary
+    assert gzip.decompress(antwort.data) == klar.data
+    assert antwort.get_etag()[0] != klar.get_etag()[0]
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip;q=0", "identity, gzip;q=0", "br", ""])
+def test_ohne_gzip_unkomprimiert(client, accept_encoding):
+    antwort = client.get("/", headers={"Accept-Encoding": accept_encoding})
+    assert "Content-Encoding" not in antwort.headers
+    assert antwort.data == client.get("/").data
+    seite = client.post("/prognose", data={**UMFRAGE, "engine": "local"},
+                        headers={"Accept-Encoding": accept_encoding})
+    assert "Content-Encoding" not in seite.headers and b"result-box" in seite.data
+
+
+def test_if_none_match_304(client):
+    for accept_encoding in ("", "gzip"):
+        erste = client.get("/", headers={"Accept-Encoding": accept_encoding})
+        etag = erste.headers["ETag"]
+        antwort = client.get("/", headers={"Accept-Encoding": accept_encoding, "If-None-Match": etag})
+        assert antwort.status_code == 304 and antwort.data == b""
+        assert antwort.headers["ETag"] == etag and "Accept-Encoding" in antwort.vary
+        assert client.head("/", headers={"Accept-Encoding": accept_encoding,
+                                         "If-None-Match": etag}).status_code == 304
+    # ETag der gzip-Fassung passt nicht zur unkomprimierten
+    etag_gzip = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    antwort = client.get("/", headers={"If-None-Match": etag_gzip})
+    assert antwort.status_code == 200 and b"<html" in antwort.data
+
+
+def test_prognose_gzip_mit_vary(client):
+    seite = client.post("/prognose", data={**UMFRAGE, "engine": "local"}, headers={"Accept-Encoding": "gzip"})
+    assert seite.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in seite.vary
+    assert b"result-box" in gzip.decompress(seite.data)
+
+
+def test_stylesheet_mit_fingerabdruck(client):
+    url = app_modul.app.jinja_env.globals["stylesheet_url"]
+    assert url.encode() in client.get("/").data
+    antwort = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert antwort.status_code == 200 and antwort.mimetype == "text/css"
+    assert antwort.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert antwort.data == app_modul.stylesheet
+    # Alter Fingerabdruck nach einer Änderung am Stylesheet
+    assert client.get("/assets/style-000000000000.css").status_code == 404
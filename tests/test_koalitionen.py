@@ -0,0 +1,57 @@
+import random
+
+import numpy as np
+
+from koalitionen import (KOALITIONSPARTEIEN, MASKEN, analysiere_koalitionen, koalitionswahrscheinlichkeiten,
+                         minimale_koalitionen, werte_matrix)
+
+# CDU, B90/Grüne, AfD, SPD, Linke, FDP, BSW: 120 Sitze, Mehrheit ab 61
+SITZE = [50, 30, 20, 10, 9, 1, 0]
+
+
+def test_minimale_koalitionen_von_hand():
+    ergebnis = minimale_koalitionen([SITZE])[0]
+    assert [(k["koalition"], k["sitze"], k["vorsprung"]) for k in ergebnis] == [
+        ("CDU + B90/Grüne", 80, 19),
+        ("CDU + AfD", 70, 9),
+        ("CDU + SPD + Linke", 69, 8),
+        # Genau die Mehrheit
+        ("CDU + SPD + FDP", 61, 0),
+        ("B90/Grüne + AfD + SPD + Linke", 69, 8),
+        ("B90/Grüne + AfD + SPD + FDP", 61, 0),
+    ]
+    assert ergebnis[0]["parteien"] == ["CDU", "B90/Grüne"]
+
+
+def test_bitmasken_wie_einzeln_gerechnet():
+    # Gegen eine Schleife über alle Teilmengen, inkl. Parteien ohne Sitze
+    rng = random.Random(17)
+    zeilen = [[rng.choice((0, 0, 5, 10, 20, 31, 40)) for _ in KOALITIONSPARTEIEN] for _ in range(200)]
+    koalitionssitze, vorsprung, minimal = werte_matrix(zeilen)
+    for zeile, sitze, luecke, ist_minimal in zip(zeilen, koalitionssitze, vorsprung, minimal):
+        mehrheit = sum(zeile) // 2 + 1
+        for i, maske in enumerate(MASKEN):
+            mitglieder = [j for j in range(len(KOALITIONSPARTEIEN)) if maske >> j & 1]
+            summe = sum(zeile[j] for j in mitglieder)
+            erwartet = summe >= mehrheit and all(summe - zeile[j] < mehrheit for j in mitglieder)
+            assert (sitze[i], luecke[i], ist_minimal[i]) == (summe, summe - mehrheit, erwartet)
+
+
+def test_acht_spalten_und_dict():
+    # Sonstige (letzte Spalte) zählt nicht zu den Koalitionen
+    mit_sonstigen = minimale_koalitionen([SITZE + [0]])[0]
+    assert mit_sonstigen == minimale_koalitionen([SITZE])[0]
+    analyse = analysiere_koalitionen({**dict(zip(KOALITIONSPARTEIEN, SITZE)), "Gesamtzahl der Sitze": 120})
+    assert analyse["mehrheit"] == 61 and analyse["minimal"] == mit_sonstigen
+
+
+def test_wahrscheinlichkeiten_ueber_zeilen():
+    # Zweite Zeile: CDU und Grüne tauschen, CDU + AfD verliert die Mehrheit
+    zweite = [30, 50] + SITZE[2:]
+    werte = {k["koalition"]: k for k in koalitionswahrscheinlichkeiten(np.array([SITZE, zweite]))}
+    assert werte["CDU + B90/Grüne"]["p_minimal"] == 1
+    assert werte["CDU + AfD"]["p_mehrheit"] == 0.5 and werte["CDU + AfD"]["p_minimal"] == 0.5
+    assert werte["B90/Grüne + AfD"]["p_minimal"] == 0.5
+    assert "CDU + B90/Grüne + AfD" not in werte
+    # Koalitionen mit einer Partei ohne Sitze sind nie minimal
+    assert not any("BSW" in name for name in werte)
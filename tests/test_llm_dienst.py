@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+from llm_dienst import LLMDienst
+
+
+class ZaehlenderClient:
+
+    def __init__(self):
+        self.aufrufe = 0
+        self.freigabe = asyncio.Event()
+
+    async def frage(self, schluessel):
+        self.aufrufe += 1
+        await self.freigabe.wait()
+        return f"antwort {schluessel}"
+
+
+def warte_bis(bedingung, frist=5):
+    ende = time.monotonic() + frist
+    while not bedingung():
+        assert time.monotonic() < ende
+        time.sleep(0.005)
+
+
+def test_gleiche_anfragen_teilen_einen_aufruf():
+    client = ZaehlenderClient()
+    dienst = LLMDienst(lambda: client)
+    anzahl = 8
+    ergebnisse = []
+    threads = [threading.Thread(target=lambda: ergebnisse.append(
+        dienst.anfrage("a", lambda c: c.frage("a"), timeout=5))) for _ in range(anzahl)]
+    try:
+        for thread in threads:
+            thread.start()
+        # Erst freigeben, wenn sich alle angeschlossen haben
+        warte_bis(lambda: dienst.aufrufe + dienst.zusammengefasst == anzahl)
+        assert dienst.laeuft("a")
+        # Ein anderer Schlüssel bekommt einen eigenen Aufruf
+        andere = threading.Thread(target=lambda: ergebnisse.append(
+            dienst.anfrage("b", lambda c: c.frage("b"), timeout=5)))
+        andere.start()
+        warte_bis(lambda: client.aufrufe == 2)
+        dienst._schleife.call_soon_threadsafe(client.freigabe.set)
+        for thread in threads + [andere]:
+            thread.join(5)
+    finally:
+        dienst.beende()
+    assert sorted(ergebnisse) == ["antwort a"] * anzahl + ["antwort b"]
+    assert client.aufrufe == 2
+    assert dienst.statistik()["zusammengefasst"] == anzahl - 1
+    assert not dienst.laeuft("a")
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from llm_schutz import FristUeberschritten, Latenzfenster, Leistungsschalter, LLMSchutz, SchalterOffen
+
+
+class Uhr:
+
+    def __init__(self):
+        self.jetzt = 100.0
+
+    def __call__(self):
+        return self.jetzt
+
+
+def test_schalter_oeffnet_nach_fehlerschwelle_und_schliesst_nach_probe():
+    uhr = Uhr()
+    schalter = Leistungsschalter(fehler_schwelle=3, pause=30, uhr=uhr)
+    for _ in range(2):
+        schalter.erlaube()
+        schalter.fehler()
+    assert schalter.zustand == "geschlossen"
+    schalter.erlaube()
+    schalter.fehler()
+    assert schalter.zustand == "offen" and schalter.oeffnungen == 1
+    with pytest.raises(SchalterOffen):
+        schalter.pruefe()
+    uhr.jetzt += 29.9
+    with pytest.raises(SchalterOffen):
+        schalter.erlaube()
+
+    # Nach der Pause genau ein Probeaufruf
+    uhr.jetzt += 0.1
+    schalter.pruefe()
+    schalter.erlaube()
+    assert schalter.zustand == "halboffen"
+    with pytest.raises(SchalterOffen):
+        schalter.erlaube()
+    schalter.erfolg()
+    assert schalter.zustand == "geschlossen" and schalter.fehler_in_folge == 0
+    assert schalter.abgewiesen == 3
+
+
+def test_gescheiterte_probe_oeffnet_wieder():
+    uhr = Uhr()
+    schalter = Leistungsschalter(fehler_schwelle=1, pause=10, uhr=uhr)
+    schalter.fehler()
+    uhr.jetzt += 10
+    schalter.erlaube()
+    schalter.fehler()
+    assert schalter.zustand == "offen" and schalter.oeffnungen == 2
+    # Die Pause beginnt neu
+    uhr.jetzt += 5
+    with pytest.raises(SchalterOffen):
+        schalter.pruefe()
+    # Ein abgebrochener Probeaufruf gibt die Probe nur frei
+    uhr.jetzt += 5
+    schalter.erlaube()
+    schalter.abbruch()
+    assert schalter.zustand == "halboffen"
+    schalter.erlaube()
+
+
+def test_hedge_verzoegerung_aus_perzentil():
+    schutz = LLMSchutz(hedge_perzentil=90, hedge_start=2.0, fenster=Latenzfenster(mindestens=10))
+    for sekunden in range(1, 10):
+        schutz.fenster.erfasse(sekunden / 10)
+    assert schutz.hedge_verzoegerung() == 2.0
+    schutz.fenster.erfasse(1.0)
+    assert schutz.hedge_verzoegerung() == 1.0
+    assert LLMSchutz(hedge_perzentil=0).hedge_verzoegerung() is None
+
+
+def langsam_dann_schnell(dauern):
+    # Jeder Versuch dauert die nächste Zeit aus `dauern` und meldet seine Nummer
+    versuche = []
+
+    async def versuch():
+        nummer = len(versuche)
+        versuche.append(nummer)
+        await asyncio.sleep(dauern[nummer])
+        return nummer
+    return versuch, versuche
+
+
+def test_hedge_nach_verzoegerung_gewinnt():
+    schutz = LLMSchutz(frist=5, hedge_start=0.05)
+    versuch, versuche = langsam_dann_schnell([1.0, 0.0])
+    assert asyncio.run(schutz.rufe(versuch)) == 1
+    assert versuche == [0, 1]
+    assert schutz.hedges == schutz.hedges_gewonnen == 1
+
+
+def test_kein_hedge_vor_verzoegerung_oder_ohne_budget():
+    schutz = LLMSchutz(frist=5, hedge_start=0.5)
+    versuch, versuche = langsam_dann_schnell([0.01])
+    assert asyncio.run(schutz.rufe(versuch)) == 0
+    assert versuche == [0] and schutz.hedges == 0
+
+    schutz = LLMSchutz(frist=5, hedge_start=0.02, hedge_erlaubt=lambda: False)
+    versuch, versuche = langsam_dann_schnell([0.1])
+    assert asyncio.run(schutz.rufe(versuch)) == 0
+    assert versuche == [0] and schutz.hedges_ohne_budget == 1
+
+
+def test_frist_zaehlt_als_fehler():
+    schutz = LLMSchutz(frist=0.05, hedge_perzentil=0, schalter=Leistungsschalter(fehler_schwelle=1))
+    versuch, _ = langsam_dann_schnell([1.0])
+    with pytest.raises(FristUeberschritten):
+        asyncio.run(schutz.rufe(versuch))
+    assert schutz.fristen_ueberschritten == 1
+    assert schutz.schalter.zustand == "offen"
@@ -0,0 +1,99 @@
+import random
+
+import numpy as np
+import pytest
+
+from nachbar_cache import NachbarCache
+from wahlkreisdaten import PARTEIEN
+
+BASIS = {"CDU": 30, "B90/Grüne": 20, "AfD": 20, "SPD": 10, "Linke": 8, "FDP": 5, "BSW": 4, "Sonstige": 3}
+MANDATE = {"CDU": 60, "B90/Grüne": 10}
+
+
+def umfrage(**abweichung):
+    # BASIS mit geänderten Werten, B90/Grüne als Gruene
+    werte = dict(BASIS)
+    for name, wert in abweichung.items():
+        werte["B90/Grüne" if name == "Gruene" else name] = wert
+    return werte
+
+
+def test_exakter_treffer():
+    cache = NachbarCache()
+    cache.speichere(BASIS, MANDATE)
+    direktmandate, anzahl, abstand = cache.suche(BASIS)
+    assert direktmandate == {p: MANDATE.get(p, 0) for p in PARTEIEN}
+    assert (anzahl, abstand) == (1, 0.0)
+
+
+@pytest.mark.parametrize("eingabe, treffer", [
+    (umfrage(CDU=31, Gruene=19), True),
+    # Genau auf der Toleranz über eine Zellgrenze hinweg
+    (umfrage(CDU=29, SPD=11), True),
+    (umfrage(CDU=31.01), False),
+    (umfrage(AfD=18.9), False),
+    # Parteien außerhalb des Gitters werden ebenfalls geprüft
+    (umfrage(Linke=9.5), False),
+    (umfrage(Sonstige=4), True),
+])
+def test_toleranzgrenze(eingabe, treffer):
+    cache = NachbarCache(toleranz=1.0)
+    cache.speichere(BASIS, MANDATE)
+    assert (cache.suche(eingabe) is not None) == treffer
+    assert cache.hat_nachbarn(eingabe) == treffer
+
+
+def test_zellgrenzen():
+    # 29,99 und 30,5 liegen in benachbarten Zellen, 28,999 und 30,0 zwei Zellen auseinander
+    cache = NachbarCache(toleranz=1.0)
+    cache.speichere(umfrage(CDU=29.99), MANDATE)
+    assert cache.suche(umfrage(CDU=30.5))[2] == pytest.approx(0.51)
+    cache = NachbarCache(toleranz=1.0)
+    cache.speichere(umfrage(CDU=28.999), MANDATE)
+    assert cache.suche(umfrage(CDU=30.0)) is None
+
+
+@pytest.mark.parametrize("toleranz", [0.5, 1.0, 2.5])
+def test_gitter_wie_vollstaendige_suche(toleranz):
+    rng = random.Random(int(toleranz * 10))
+    cache = NachbarCache(toleranz=toleranz, nachbarn=1000)
+    gespeichert = []
+    for _ in range(400):
+        vektor = [round(rng.uniform(0, 40), 1) for _ in PARTEIEN]
+        cache.speichere(dict(zip(PARTEIEN, vektor)), MANDATE)
+        gespeichert.append(vektor)
+    gespeichert = np.array(gespeichert)
+    for _ in range(300):
+        anfrage = np.array([round(rng.uniform(0, 40), 1) for _ in PARTEIEN])
+        anfrage[:4] = gespeichert[rng.randrange(len(gespeichert)), :4] + [rng.uniform(-3, 3) for _ in range(4)]
+        erwartet = int((np.abs(gespeichert - anfrage).max(axis=1) <= toleranz + 1e-9).sum())
+        ergebnis = cache.suche(dict(zip(PARTEIEN, anfrage.tolist())))
+        assert (0 if ergebnis is None else ergebnis[1]) == erwartet
+
+
+def test_mittel_nach_inversem_abstand():
+    cache = NachbarCache(toleranz=1.0)
+    cache.speichere(umfrage(CDU=30.5), {"CDU": 60, "B90/Grüne": 10})
+    cache.speichere(umfrage(CDU=31), {"CDU": 54, "B90/Grüne": 16})
+    # Abstände 0,5 und 1: Gewichte 2 und 1
+    direktmandate, anzahl, abstand = cache.suche(BASIS)
+    assert (direktmandate["CDU"], direktmandate["B90/Grüne"], anzahl, abstand) == (58, 12, 2, 1.0)
+    assert sum(direktmandate.values()) == 70
+
+
+def test_hoechstens_n_nachbarn_und_lru():
+    cache = NachbarCache(toleranz=1.0, max_eintraege=3, nachbarn=2)
+    for cdu in (30.1, 30.2, 30.3):
+        cache.speichere(umfrage(CDU=cdu), MANDATE)
+    assert cache.suche(BASIS)[1] == 2
+    # 30,1 und 30,2 wurden eben genutzt, verdrängt wird 30,3
+    cache.speichere(umfrage(CDU=35), MANDATE)
+    assert cache.verdraengungen == 1
+    assert cache.suche(umfrage(CDU=31.25)) is None
+    assert cache.statistik()["eintraege"] == 3
+
+
+def test_toleranz_null_schaltet_ab():
+    cache = NachbarCache(toleranz=0)
+    cache.speichere(BASIS, MANDATE)
+    assert cache.suche(BASIS) is None and not cache.hat_nachbarn(BASIS)
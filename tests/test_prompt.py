@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from prompt import AntwortFehler, lies_antwort, pruefe_direktmandate
+from wahlkreisdaten import PARTEIEN
+
+GUELTIG = {"CDU": 55, "B90/Grüne": 12, "AfD": 3, "SPD": 0, "Linke": 0, "FDP": 0, "BSW": 0, "Sonstige": 0}
+
+
+def test_gueltige_antwort_in_parteireihenfolge():
+    text = json.dumps(dict(reversed(list(GUELTIG.items()))))
+    direktmandate = pruefe_direktmandate(text)
+    assert direktmandate == GUELTIG and list(direktmandate) == PARTEIEN
+    assert lies_antwort(text, "kompakt") == GUELTIG
+
+
+@pytest.mark.parametrize("text, meldung", [
+    ("", "kein JSON"),
+    ('{"CDU": 70', "kein JSON"),
+    (None, "kein JSON"),
+    ("[55, 12, 3, 0, 0, 0, 0, 0]", "genau die 8 Parteien"),
+    (json.dumps({p: w for p, w in GUELTIG.items() if p != "BSW"}), "genau die 8 Parteien"),
+    (json.dumps({**GUELTIG, "Piraten": 0}), "genau die 8 Parteien"),
+    (json.dumps({**{p: w for p, w in GUELTIG.items() if p != "Linke"}, "Die Linke": 0}), "genau die 8 Parteien"),
+    (json.dumps({**GUELTIG, "CDU": 55.0}), "ganze Zahlen"),
+    (json.dumps({**GUELTIG, "CDU": 54.5, "AfD": 3.5}), "ganze Zahlen"),
+    (json.dumps({**GUELTIG, "CDU": "55"}), "ganze Zahlen"),
+    (json.dumps({**GUELTIG, "CDU": None}), "ganze Zahlen"),
+    (json.dumps({**GUELTIG, "SPD": True, "CDU": 54}), "ganze Zahlen"),
+    (json.dumps({**GUELTIG, "CDU": 58, "SPD": -3}), "ganze Zahlen"),
+    (json.dumps({**GUELTIG, "CDU": 54}), "69 statt 70"),
+    (json.dumps({**GUELTIG, "CDU": 56}), "71 statt 70"),
+])
+def test_abgelehnte_antworten(text, meldung):
+    with pytest.raises(AntwortFehler, match=meldung):
+        pruefe_direktmandate(text)
+    with pytest.raises(ValueError):
+        lies_antwort(text, "kompakt")
@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+from simulation import verteile_matrix, ziehe_anteile
+from sitzverteilung import berechne_verteilung
+from wahlkreisdaten import PARTEIEN
+
+
+def skalar(prognose, direktmandate):
+    # Erwartete Zeile aus berechne_verteilung; ohne Partei über der Hürde bleibt
+    # der Landtag in der Simulation leer
+    eingabe = dict(zip(PARTEIEN, prognose))
+    if not any(eingabe[p] >= 5 for p in PARTEIEN[:-1]):
+        return [0] * len(PARTEIEN)
+    sitze = berechne_verteilung(eingabe, direktmandate)
+    return [sitze[p] for p in PARTEIEN]
+
+
+def zufaellige_direktmandate(rng):
+    direktmandate = dict.fromkeys(PARTEIEN[:-1], 0)
+    for _ in range(70):
+        direktmandate[rng.choice(PARTEIEN[:4])] += 1
+    # Gelegentlich alle Mandate bei einer Partei (viele Überhangmandate)
+    if rng.random() < 0.2:
+        direktmandate = {rng.choice(PARTEIEN[:5]): 70}
+    return direktmandate
+
+
+def pruefe_zeilen(prognosen, direktmandate):
+    direkt = np.array([[d.get(p, 0) for p in PARTEIEN] for d in direktmandate])
+    sitze, _ = verteile_matrix(prognosen, direkt)
+    for zeile, d, s in zip(prognosen.tolist(), direktmandate, sitze.tolist()):
+        assert s == skalar(zeile, d), (zeile, d)
+
+
+def test_gleichstand_wie_berechne_verteilung():
+    # Linke und AfD/SPD liegen bei den Höchstzahlen gleichauf
+    eingabe = {"CDU": 40, "B90/Grüne": 20, "AfD": 12, "SPD": 10, "Linke": 8, "FDP": 0, "BSW": 4, "Sonstige": 6}
+    direktmandate = {"CDU": 68, "B90/Grüne": 1, "Linke": 1}
+    prognosen = np.array([[eingabe[p] for p in PARTEIEN]], dtype=float)
+    pruefe_zeilen(prognosen, [direktmandate])
+    sitze, _ = verteile_matrix(prognosen, np.array([[direktmandate.get(p, 0) for p in PARTEIEN]]))
+    assert sitze[0, PARTEIEN.index("CDU")] == 68
+    assert sitze[0, PARTEIEN.index("Linke")] == 13
+
+
+@pytest.mark.parametrize("verteilung", ["multinomial", "dirichlet"])
+@pytest.mark.parametrize("stichprobe", [50, 100, 1000])
+def test_entspricht_berechne_verteilung(verteilung, stichprobe):
+    rng = random.Random(stichprobe)
+    eingabe = {"CDU": 31, "B90/Grüne": 20, "AfD": 19, "SPD": 10, "Linke": 7, "FDP": 5, "BSW": 4, "Sonstige": 4}
+    prognosen = ziehe_anteile(eingabe, 300, stichprobe, verteilung, np.random.default_rng(stichprobe))
+    pruefe_zeilen(prognosen, [zufaellige_direktmandate(rng) for _ in prognosen])
+
+
+def test_ganzzahlige_gleichstaende():
+    # Nur wenige runde Werte, damit Parteien exakt gleichauf liegen
+    rng = random.Random(2026)
+    zeilen = []
+    for _ in range(300):
+        werte = [rng.choice((0, 4, 5, 10, 12, 15, 20)) for _ in PARTEIEN[:-1]]
+        while sum(werte) > 100:
+            werte[rng.randrange(len(werte))] = 0
+        zeilen.append(werte + [100 - sum(werte)])
+    prognosen = np.array(zeilen, dtype=float)
+    pruefe_zeilen(prognosen, [zufaellige_direktmandate(rng) for _ in zeilen])
@@ -0,0 +1,154 @@
+import random
+
+import pytest
+
+from sitzverteilung import (HINWEIS_OHNE_SITZE, VERFAHREN, analysiere_schwellen, berechne_verteilung,
+                            vergleiche_verfahren)
+from wahlkreisdaten import PARTEIEN
+
+
+def hoechstzahl_verteilung(teiler):
+    # Alle Quotienten stabil sortiert (Gleichstand: vordere Partei)
+    def verteilung(stimmen, sitzzahl):
+        quoten = []
+        for partei, stimmanteil in stimmen.items():
+            for i in range(sitzzahl):
+                quoten.append((partei, stimmanteil * 1_000_000 / teiler(i)))
+        quoten.sort(key=lambda x: x[1], reverse=True)
+        sitze = {p: 0 for p in stimmen}
+        for partei, _ in quoten[:sitzzahl]:
+            sitze[partei] += 1
+        return sitze
+    return verteilung
+
+
+def hare_niemeyer_verteilung(anteile, sitzzahl):
+    # Ganzzahliger Teil, Rest nach den größten Resten (Gleichstand: vordere Partei)
+    sitze = {p: int(a * sitzzahl // 1) for p, a in anteile.items()}
+    reste = sorted(anteile, key=lambda p: anteile[p] * sitzzahl - sitze[p], reverse=True)
+    for p in reste[:sitzzahl - sum(sitze.values())]:
+        sitze[p] += 1
+    return sitze
+
+
+def alte_verteilung(eingabe, direktmandate, zuteilung=hoechstzahl_verteilung(lambda i: 2 * i + 1)):
+    # Ursprüngliche Berechnung (vor dem Höchstzahlstrom) als Referenz:
+    # Zuteilung je Größe komplett neu, Größe des Landtags Sitz für Sitz gesucht
+    parteien_mit_sitzen = [p for p in eingabe if eingabe[p] >= 5 and p != "Sonstige"]
+    gesamt_prozent = sum(eingabe[p] for p in parteien_mit_sitzen)
+    anteile = {p: eingabe[p] / gesamt_prozent for p in parteien_mit_sitzen}
+    saint_lague_verteilung = zuteilung
+
+    sitze_vor_rest = saint_lague_verteilung(anteile, 120)
+    ueberhang = sum(max(0, direktmandate.get(p, 0) - sitze_vor_rest[p]) for p in parteien_mit_sitzen)
+    min_sitze = max(120, sum(sitze_vor_rest.values()) + ueberhang)
+    while True:
+        sitze = saint_lague_verteilung(anteile, min_sitze)
+        if all(sitze[p] >= direktmandate.get(p, 0) for p in parteien_mit_sitzen):
+            break
+        min_sitze += 1
+    for p in eingabe:
+        if p != "Sonstige" and p not in sitze:
+            sitze[p] = 0
+    sitze["Sonstige"] = 0
+    sitze["Gesamtzahl der Sitze"] = sum(sitze.values())
+    return sitze
+
+
+def zufaellige_umfrage(rng, gleichstand):
+    # Mit gleichstand nur wenige runde Werte, damit Parteien exakt gleichauf liegen
+    if gleichstand:
+        werte = [rng.choice((0, 4, 5, 10, 15, 20)) for _ in PARTEIEN[:-1]]
+    else:
+        werte = [round(rng.uniform(0, 35), rng.choice((0, 1))) for _ in PARTEIEN[:-1]]
+    if sum(werte) > 100:
+        faktor = 100 / sum(werte)
+        werte = [int(w * faktor) for w in werte]
+    eingabe = dict(zip(PARTEIEN, werte + [round(100 - sum(werte), 1)]))
+    if not any(eingabe[p] >= 5 for p in PARTEIEN[:-1]):
+        eingabe["CDU"] += 5
+    return eingabe
+
+
+def zufaellige_direktmandate(rng, eingabe):
+    kandidaten = [p for p in PARTEIEN[:-1] if eingabe[p] > 0]
+    direktmandate = dict.fromkeys(kandidaten, 0)
+    for _ in range(70):
+        direktmandate[rng.choice(kandidaten)] += 1
+    # Gelegentlich alle Mandate bei einer Partei (viele Überhangmandate)
+    if rng.random() < 0.1:
+        direktmandate = {rng.choice(kandidaten): 70}
+    return direktmandate
+
+
+@pytest.mark.parametrize("gleichstand", [False, True])
+def test_entspricht_alter_berechnung(gleichstand):
+    rng = random.Random(2026 + gleichstand)
+    for _ in range(150):
+        eingabe = zufaellige_umfrage(rng, gleichstand)
+        direktmandate = zufaellige_direktmandate(rng, eingabe)
+        neu = berechne_verteilung(eingabe, direktmandate)
+        alt = alte_verteilung(eingabe, direktmandate)
+        assert list(neu.items()) == list(alt.items()), (eingabe, direktmandate)
+
+
+REFERENZEN = {
+    "dhondt": hoechstzahl_verteilung(lambda i: i + 1),
+    "hare-niemeyer": hare_niemeyer_verteilung,
+}
+
+
+@pytest.mark.parametrize("verfahren", sorted(REFERENZEN))
+@pytest.mark.parametrize("gleichstand", [False, True])
+def test_weitere_verfahren_wie_referenz(verfahren, gleichstand):
+    # Inkl. Gleichständen und vieler Überhangmandate (zufaellige_direktmandate)
+    rng = random.Random(2027 + gleichstand)
+    for _ in range(150):
+        eingabe = zufaellige_umfrage(rng, gleichstand)
+        direktmandate = zufaellige_direktmandate(rng, eingabe)
+        neu = berechne_verteilung(eingabe, direktmandate, verfahren)
+        alt = alte_verteilung(eingabe, direktmandate, REFERENZEN[verfahren])
+        assert list(neu.items()) == list(alt.items()), (eingabe, direktmandate)
+
+
+@pytest.mark.parametrize("verfahren", sorted(REFERENZEN))
+def test_gleichstand_weitere_verfahren(verfahren):
+    # 7 gleich starke Parteien: der 120. Sitz geht an die CDU, mit 70
+    # Direktmandaten der CDU entstehen Überhang- und Ausgleichsmandate
+    eingabe = dict.fromkeys(PARTEIEN[:-1], 14)
+    eingabe["Sonstige"] = 2
+    sitze = berechne_verteilung(eingabe, {}, verfahren)
+    assert sitze["CDU"] == 18 and sitze["BSW"] == 17
+    for direktmandate in ({}, {"CDU": 70}):
+        assert (list(berechne_verteilung(eingabe, direktmandate, verfahren).items())
+                == list(alte_verteilung(eingabe, direktmandate, REFERENZEN[verfahren]).items()))
+
+
+def test_gleichstand_geht_an_erste_partei():
+    # 7 gleich starke Parteien, 120 Sitze: 17 je Partei, der letzte Sitz geht an die CDU
+    eingabe = dict.fromkeys(PARTEIEN[:-1], 14)
+    eingabe["Sonstige"] = 2
+    sitze = berechne_verteilung(eingabe, {})
+    assert list(sitze.items()) == list(alte_verteilung(eingabe, {}).items())
+    assert sitze["CDU"] == 18 and sitze["BSW"] == 17
+
+
+@pytest.mark.parametrize("eingabe", [{"Sonstige": 100}, {"CDU": 4, "AfD": 4, "Sonstige": 92}])
+def test_ohne_partei_ueber_huerde(eingabe):
+    direktmandate = {"CDU": 35, "AfD": 35}
+    sitze = berechne_verteilung(eingabe, direktmandate)
+    assert sitze["Gesamtzahl der Sitze"] == 0
+    assert all(wert == 0 for wert in sitze.values())
+    schwellen = analysiere_schwellen(eingabe, direktmandate)
+    assert all(s["sitze"] == 0 and s["minus_eins"] is None for s in schwellen.values())
+
+
+def test_verfahren_ohne_partei_ueber_huerde():
+    eingabe = {"CDU": 4, "B90/Grüne": 4, "AfD": 4, "SPD": 4, "Sonstige": 84}
+    ergebnis = vergleiche_verfahren(eingabe, {"CDU": 70})
+    assert set(ergebnis) == set(VERFAHREN)
+    for details in ergebnis.values():
+        assert all(wert == 0 for wert in details["sitze"].values())
+        assert details["ueberhangmandate"] == details["ausgleichsmandate"] == 0
+        assert details["abweichung_max"] == 0
+        assert details["hinweis"] == HINWEIS_OHNE_SITZE
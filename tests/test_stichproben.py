@@ -0,0 +1,101 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+from direktmandate import DIREKTMANDATE
+from prompt import AntwortFehler
+from stichproben import konsens, pruefe_stichprobe
+from wahlkreisdaten import PARTEIEN
+
+
+def stichprobe(*werte):
+    # Direktmandate in der Reihenfolge von PARTEIEN, fehlende als 0
+    return dict(zip(PARTEIEN, list(werte) + [0] * (len(PARTEIEN) - len(werte))))
+
+
+def test_konsens_ist_median_je_partei():
+    direktmandate, streuung = konsens([stichprobe(60, 8, 2), stichprobe(58, 10, 2), stichprobe(62, 6, 2)])
+    assert direktmandate == stichprobe(60, 8, 2)
+    assert streuung["stichproben"] == streuung["angefragt"] == 3
+    assert streuung["spanne"]["CDU"] == [58, 62] and streuung["spanne"]["AfD"] == [2, 2]
+    # Zwei Stichproben vergeben je 2 Wahlkreise anders, eine keinen
+    assert streuung["abweichung"] == 1.33
+
+
+def test_konsens_wieder_auf_70_gerundet():
+    # Median 35 / 30 / 0 ergibt nur 65; hochgerechnet 37,69 / 32,31, der Rest geht an die CDU
+    direktmandate, _ = konsens([stichprobe(40, 30, 0), stichprobe(30, 40, 0), stichprobe(35, 25, 10)])
+    assert direktmandate == stichprobe(38, 32, 0)
+    assert sum(direktmandate.values()) == DIREKTMANDATE
+
+
+def test_konsens_ohne_median_nimmt_mittelwert():
+    # Völlig uneinig: der Median ist überall 0, je 23,33 als Mittelwert, der Rest an die vordere Partei
+    direktmandate, _ = konsens([stichprobe(70), stichprobe(0, 70), stichprobe(0, 0, 70)])
+    assert direktmandate == stichprobe(24, 23, 23)
+
+
+@pytest.mark.parametrize("werte", [
+    stichprobe(60, 8, 1),
+    stichprobe(60, 8, 3),
+    stichprobe(72, -2),
+    stichprobe(60.0, 8, 2),
+    {**stichprobe(69), "Sonstige": True},
+])
+def test_ungueltige_stichprobe(werte):
+    with pytest.raises(AntwortFehler):
+        pruefe_stichprobe(werte)
+
+
+class ZaehlenderClient:
+    # Liefert die Antworttexte der Reihe nach; mit ignoriert_n nur eine Antwort je Aufruf
+    def __init__(self, texte, ignoriert_n=False):
+        self.texte = iter(texte)
+        self.ignoriert_n = ignoriert_n
+        self.aufrufe = []
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    async def create(self, **argumente):
+        n = 1 if self.ignoriert_n else argumente.get("n", 1)
+        self.aufrufe.append(n)
+        choices = [types.SimpleNamespace(message=types.SimpleNamespace(content=next(self.texte))) for _ in range(n)]
+        return types.SimpleNamespace(choices=choices, usage=None)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    import prognose_tool_ltw26 as app
+    monkeypatch.setattr(app, "LLM_STICHPROBEN", 3)
+    monkeypatch.setitem(app._stichproben_art, "art", "n")
+    return app
+
+
+def versuch(app, client):
+    return asyncio.run(app._versuch_llm(client, {"CDU": 30, "B90/Grüne": 20, "AfD": 20, "SPD": 30}))
+
+
+GUELTIG = [json.dumps(stichprobe(60, 8, 2)), json.dumps(stichprobe(58, 10, 2))]
+
+
+def test_konsens_aus_mehrheit_gueltiger_stichproben(app):
+    direktmandate, streuung = versuch(app, ZaehlenderClient(GUELTIG + ["kein JSON"]))
+    assert direktmandate == stichprobe(59, 9, 2)
+    assert streuung["stichproben"] == 2 and streuung["angefragt"] == 3
+
+
+def test_fehlende_stichproben_einzeln_nachgefragt(app):
+    # Der Anbieter ignoriert n: zwei weitere Einzelaufrufe
+    client = ZaehlenderClient(GUELTIG + [json.dumps(stichprobe(62, 6, 2))], ignoriert_n=True)
+    direktmandate, streuung = versuch(app, client)
+    assert client.aufrufe == [1, 1, 1]
+    assert direktmandate == stichprobe(60, 8, 2) and streuung["stichproben"] == 3
+
+
+def test_zu_wenige_gueltige_stichproben(app):
+    with pytest.raises(AntwortFehler, match="Nur 1 von 3"):
+        versuch(app, ZaehlenderClient(GUELTIG[:1] + ["kein JSON", json.dumps(stichprobe(70, 1))]))
+    # Ohne gültige Stichprobe der erste Fehler selbst
+    with pytest.raises(AntwortFehler, match="kein JSON"):
+        versuch(app, ZaehlenderClient(["kein JSON", "[]", "{}"]))
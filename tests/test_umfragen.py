@@ -0,0 +1,121 @@
+import pytest
+
+import prognose_tool_ltw26 as app_modul
+from direktmandate import schaetze_direktmandate
+from sitzverteilung import berechne_verteilung
+from umfragen import ENGINE_VERSION_LOKAL, Umfragespeicher
+from wahlkreisdaten import PARTEIEN
+
+KOPF = "institut,datum," + ",".join(PARTEIEN) + "\n"
+
+
+def zeile(institut, datum, *werte):
+    return f"{institut},{datum}," + ",".join(str(w) for w in werte) + "\n"
+
+
+ERSTER_IMPORT = KOPF + "".join([
+    zeile("Forsa", "2025-11-20", 31, 20, 19, 10, 7, 5, 4, 4),
+    # Gleiche Anteile wie Forsa: dieselbe Projektion, nur einmal berechnet
+    zeile("Infratest", "2025-11-22", 31, 20, 19, 10, 7, 5, 4, 4),
+    zeile("INSA", "2025-12-01", 29, 21, 20, 10, 7, 5, 4, 4),
+])
+
+
+def pruefe(eingabe, engine):
+    if round(sum(eingabe.values()), 6) != 100:
+        return "Fehler: Die Summe der Werte muss genau 100 ergeben."
+    return None
+
+
+def ermittle(eingabe, engine):
+    return schaetze_direktmandate(eingabe), ""
+
+
+@pytest.fixture
+def speicher():
+    speicher = Umfragespeicher(None, lambda engine: ENGINE_VERSION_LOKAL)
+    yield speicher
+    speicher.schliesse()
+
+
+def importiere(speicher, text, format="csv"):
+    return speicher.importiere(text, format, "local", ermittle, pruefe)
+
+
+def test_import_und_erneuter_import(speicher):
+    bericht = importiere(speicher, ERSTER_IMPORT)
+    assert (bericht["zeilen"], bericht["neu"], bericht["berechnet"], bericht["wiederverwendet"]) == (3, 3, 2, 1)
+    assert bericht["fehler"] == []
+
+    # Unverändert, geändert, neu und eine neue Umfrage mit vorhandener Projektion
+    bericht = importiere(speicher, KOPF + "".join([
+        zeile("Forsa", "2025-11-20", 31, 20, 19, 10, 7, 5, 4, 4),
+        zeile("INSA", "2025-12-01", 30, 21, 19, 10, 7, 5, 4, 4),
+        zeile("Forsa", "2025-12-05", 28, 22, 20, 10, 7, 5, 4, 4),
+        zeile("YouGov", "2025-12-06", 29, 21, 20, 10, 7, 5, 4, 4),
+    ]))
+    assert {k: bericht[k] for k in ("unveraendert", "geaendert", "neu", "berechnet", "wiederverwendet")} == {
+        "unveraendert": 1, "geaendert": 1, "neu": 2, "berechnet": 2, "wiederverwendet": 1}
+    assert speicher.statistik() == {"umfragen": 5, "projektionen": 4}
+
+
+def test_doppelte_und_fehlerhafte_zeilen(speicher):
+    bericht = importiere(speicher, "\n".join([
+        '{"institut": "Forsa", "datum": "2025-11-20", "eingabe": {"CDU": 31, "B90/Grüne": 20, "AfD": 49}}',
+        # Spätere Zeile derselben Umfrage gewinnt, Sonstige wird auf 100 ergänzt
+        '{"institut": "Forsa", "datum": "2025-11-20", "eingabe": {"CDU": 30, "B90/Grüne": 20, "AfD": 45}}',
+        '{"institut": "Forsa", "datum": "20.11.2025", "eingabe": {"CDU": 100}}',
+        '{"institut": "", "datum": "2025-11-21", "eingabe": {"CDU": 100}}',
+        '{"institut": "INSA", "datum": "2025-11-21", "eingabe": {"CDU": 60, "AfD": 60}}',
+        '{"institut": "INSA", "datum": "2025-11-22", "eingabe": {"CDU": 60, "AfD": 30, "Sonstige": 20}}',
+        '{"institut": "INSA", "datum": ',
+    ]), "ndjson")
+    assert bericht["zeilen"] == 7 and bericht["neu"] == 1
+    assert [f["zeile"] for f in bericht["fehler"]] == [3, 4, 5, 6, 7]
+    assert "Negativer Anteil für Sonstige" in bericht["fehler"][2]["fehler"]
+    assert "Summe" in bericht["fehler"][3]["fehler"]
+    umfrage, = speicher.verlauf()["umfragen"]
+    assert umfrage["eingabe"] == {"CDU": 30, "B90/Grüne": 20, "AfD": 45, "Sonstige": 5}
+
+
+def test_import_fragt_nur_eigene_schluessel_ab(speicher):
+    importiere(speicher, ERSTER_IMPORT)
+    anweisungen = []
+    speicher._db.set_trace_callback(anweisungen.append)
+    importiere(speicher, KOPF + zeile("Forsa", "2025-12-05", 28, 22, 20, 10, 7, 5, 4, 4))
+    abfragen = [a for a in anweisungen if a.lstrip().upper().startswith("SELECT")]
+    assert len(abfragen) == 2 and all(" WHERE " in a for a in abfragen)
+
+
+def test_neue_engine_version_berechnet_neu():
+    version = {"lokal": "1"}
+    speicher = Umfragespeicher(None, lambda engine: version["lokal"])
+    importiere(speicher, ERSTER_IMPORT)
+    version["lokal"] = "2"
+    bericht = importiere(speicher, ERSTER_IMPORT)
+    assert (bericht["geaendert"], bericht["berechnet"]) == (3, 2)
+    speicher.schliesse()
+
+
+def test_verlauf_ueber_api(monkeypatch):
+    speicher = Umfragespeicher(None, app_modul.engine_version)
+    monkeypatch.setattr(app_modul, "umfragespeicher", speicher)
+    client = app_modul.app.test_client()
+    antwort = client.post("/api/umfragen/import?engine=local", data=ERSTER_IMPORT.encode(), content_type="text/csv")
+    assert antwort.status_code == 200 and antwort.get_json()["neu"] == 3
+    assert client.post("/api/umfragen/import?engine=orakel", data=b"").status_code == 400
+
+    verlauf = client.get("/api/umfragen/verlauf").get_json()
+    assert verlauf["anzahl"] == 3
+    assert [u["datum"] for u in verlauf["umfragen"]] == ["2025-11-20", "2025-11-22", "2025-12-01"]
+    insa = verlauf["umfragen"][2]
+    erwartet = berechne_verteilung(insa["eingabe"], schaetze_direktmandate(insa["eingabe"]))
+    assert insa["sitze"] == {p: erwartet[p] for p in PARTEIEN}
+    assert insa["mehrheit"] == insa["gesamtzahl"] // 2 + 1
+    assert verlauf["reihen"]["CDU"] == [u["sitze"]["CDU"] for u in verlauf["umfragen"]]
+
+    gefiltert = client.get("/api/umfragen/verlauf?institut=Forsa").get_json()
+    assert [u["institut"] for u in gefiltert["umfragen"]] == ["Forsa"]
+    gefiltert = client.get("/api/umfragen/verlauf?von=2025-11-21&bis=2025-11-30").get_json()
+    assert [u["institut"] for u in gefiltert["umfragen"]] == ["Infratest"]
+    speicher.schliesse()
@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+from zulassung import GeteilteBudgets, Tokenbucket, Zulassung, ZulassungAbgelehnt
+
+
+class Uhr:
+
+    def __init__(self):
+        self.jetzt = 1000.0
+
+    def __call__(self):
+        return self.jetzt
+
+
+def test_bucket_fuellt_nach_und_begrenzt_burst():
+    uhr = Uhr()
+    bucket = Tokenbucket(rate=2, kapazitaet=10, uhr=uhr)
+    assert bucket.wartezeit(10) == 0
+    bucket.nimm(10)
+    assert bucket.wartezeit(1) == 0.5
+    uhr.jetzt += 2
+    assert bucket.wartezeit(4) == 0
+    assert bucket.wartezeit(5) == 0.5
+    # Nach langer Pause nie mehr als die Kapazität (Burst)
+    uhr.jetzt += 3600
+    bucket.wartezeit(0)
+    assert bucket.vorrat == 10
+    # Kosten über der Kapazität zählen wie die Kapazität
+    assert bucket.wartezeit(25) == 0
+    bucket.nimm(25)
+    assert bucket.vorrat == 0
+
+
+def test_bucket_gib_hoechstens_bis_kapazitaet():
+    uhr = Uhr()
+    bucket = Tokenbucket(rate=1, kapazitaet=4, uhr=uhr)
+    bucket.nimm(3)
+    bucket.gib(2)
+    assert bucket.vorrat == 3
+    bucket.gib(5)
+    assert bucket.vorrat == 4
+
+
+def test_zulassung_weist_bei_leerem_bucket_nach_frist_ab():
+    uhr = Uhr()
+    zulassung = Zulassung([(Tokenbucket(rate=1, kapazitaet=2, uhr=uhr), 1)], max_wartezeit=0, uhr=uhr)
+    assert zulassung.betrete("a") == 0.0
+    assert zulassung.betrete("a") == 0.0
+    with pytest.raises(ZulassungAbgelehnt) as fehler:
+        zulassung.betrete("a")
+    assert fehler.value.grund == "frist" and fehler.value.retry_after >= 1
+    assert zulassung.wartend == 0
+    zulassung.erstatte()
+    assert zulassung.betrete("a") == 0.0
+    assert zulassung.statistik()["erstattet"] == 1
+
+
+def test_geteilte_budgets_zwischen_zwei_verbindungen(tmp_path):
+    # Zwei Verbindungen auf dieselbe Datei wie zwei Worker
+    pfad = str(tmp_path / "budget.sqlite3")
+    erste, zweite = GeteilteBudgets(pfad), GeteilteBudgets(pfad)
+    try:
+        zulassungen = [Zulassung([(budgets.bucket("anfragen", 0.001, 3), 1)], max_wartezeit=0,
+                                 transaktion=budgets.transaktion) for budgets in (erste, zweite)]
+        zulassungen[0].betrete("a")
+        zulassungen[1].betrete("b")
+        zulassungen[0].betrete("a")
+        # Der Vorrat von 3 ist verbraucht, auch für den anderen Worker
+        with pytest.raises(ZulassungAbgelehnt):
+            zulassungen[1].betrete("b")
+        zulassungen[0].erstatte()
+        assert zulassungen[1].betrete("b") == 0.0
+
+        # Hält ein Worker die Datei gesperrt, wird mit 429 abgewiesen statt mit einem Fehler
+        zweite.schliesse()
+        zweite._db = sqlite3.connect(pfad, timeout=0.05, isolation_level=None, check_same_thread=False)
+        erste._db.execute("BEGIN IMMEDIATE")
+        try:
+            with pytest.raises(ZulassungAbgelehnt) as fehler:
+                zulassungen[1].betrete("b")
+            assert fehler.value.grund == "gesperrt" and fehler.value.retry_after == 1
+            assert zulassungen[1].nimm_sofort() is False
+        finally:
+            erste._db.execute("COMMIT")
+        assert zulassungen[1].abgewiesen["gesperrt"] == 1
+    finally:
+        erste.schliesse()
+        zweite.schliesse()
@@ -0,0 +1,270 @@
+import argparse
+import csv
+import datetime
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from batch import lies_szenario, werte_aus
+from direktmandate import schaetze_direktmandate_matrix
+from llm_cache import normierte_eingabe
+from simulation import verteile_matrix
+from sitzverteilung import GRUNDSITZE
+from wahlkreisdaten import PARTEIEN
+
+# Umfragereihen (CSV oder NDJSON) in einem lokalen SQLite-Speicher. Eine
+# Umfrage ist durch Institut und Datum bestimmt; die Sitzprojektion wird unter
+# einem Hash aus Anteilen, Engine und Engine-Version abgelegt. Beim erneuten
+# Import werden nur neue oder geänderte Umfragen geschrieben und nur
+# Projektionen berechnet, deren Hash noch fehlt. Für die lokale Engine werden
+# die Direktmandate aller fehlenden Zeilen zugleich auf Arrays geschätzt.
+#
+# CSV:    institut,datum,CDU,B90/Grüne,AfD,SPD,Linke,FDP,BSW,Sonstige
+# NDJSON: {"institut": "...", "datum": "2025-11-20", "eingabe": {"CDU": 31, ...}}
+# Fehlt "Sonstige", wird der Rest auf 100 eingesetzt.
+
+# Version der lokalen Engine (Swing-Modell und Sitzverteilung); erhöhen, wenn
+# sich deren Ergebnisse ändern, damit gespeicherte Projektionen neu berechnet werden
+ENGINE_VERSION_LOKAL = "swing-ltw21-proportional/sainte-lague/1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS umfragen (
+    institut TEXT NOT NULL, datum TEXT NOT NULL, eingabe TEXT NOT NULL,
+    engine TEXT NOT NULL, schluessel TEXT NOT NULL, importiert REAL NOT NULL,
+    PRIMARY KEY (institut, datum));
+CREATE INDEX IF NOT EXISTS umfragen_datum ON umfragen (datum);
+CREATE TABLE IF NOT EXISTS projektionen (
+    schluessel TEXT PRIMARY KEY, sitze TEXT NOT NULL, direktmandate TEXT NOT NULL,
+    gesamtzahl INTEGER NOT NULL, erstellt REAL NOT NULL);
+"""
+
+# SQLite begrenzt die Parameter je Anweisung (ältere Versionen auf 999)
+_BLOCK = 400
+
+
+def _bloecke(werte):
+    werte = list(werte)
+    for start in range(0, len(werte), _BLOCK):
+        yield werte[start:start + _BLOCK]
+
+
+def lies_umfragen(text, format):
+    # Liefert je Zeile (zeilennummer, roh) mit roh im Szenario-Format von batch
+    if format == "csv":
+        for nummer, zeile in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+            institut = (zeile.pop("institut", None) or "").strip()
+            datum = (zeile.pop("datum", None) or "").strip()
+            try:
+                eingabe = {p: float(w) for p, w in zeile.items() if p is not None and w not in (None, "")}
+            except ValueError as e:
+                yield nummer, ValueError(f"Ungültiger Wert: {e}")
+                continue
+            yield nummer, {"institut": institut, "datum": datum, "eingabe": eingabe}
+    elif format == "ndjson":
+        for nummer, zeile in enumerate(text.splitlines(), start=1):
+            if zeile.strip():
+                try:
+                    yield nummer, json.loads(zeile)
+                except ValueError as e:
+                    yield nummer, ValueError(f"Kein gültiges JSON: {e}")
+    else:
+        raise ValueError(f"Unbekanntes Format: {format}")
+
+
+def _pruefe_umfrage(roh, engine):
+    _, eingabe, engine = lies_szenario(roh, engine)
+    institut = roh.get("institut")
+    if not isinstance(institut, str) or not institut.strip():
+        raise ValueError("Umfrage benötigt ein Institut.")
+    datum = datetime.date.fromisoformat(str(roh.get("datum"))).isoformat()
+    if "Sonstige" not in eingabe:
+        eingabe["Sonstige"] = round(100 - sum(eingabe.values()), 6)
+    negativ = [p for p, wert in eingabe.items() if wert < 0]
+    if negativ:
+        raise ValueError(f"Negativer Anteil für {', '.join(negativ)}")
+    # Reihenfolge wie im Formular, sie entscheidet bei Gleichständen in der Sitzverteilung
+    eingabe = {p: eingabe[p] for p in PARTEIEN if p in eingabe}
+    return institut.strip(), datum, eingabe, engine
+
+
+class Umfragespeicher:
+
+    def __init__(self, pfad, engine_version):
+        # engine_version(engine) liefert eine Zeichenkette, die sich ändert,
+        # sobald dieselbe Eingabe ein anderes Ergebnis liefern kann
+        self.engine_version = engine_version
+        self.pfad = pfad
+        self._lock = threading.Lock()
+        self._db = None
+        self.verbinde()
+
+    def verbinde(self):
+        # Eigene Verbindung je Prozess (nach einem fork erneut aufrufen); WAL,
+        # damit mehrere Worker gleichzeitig lesen, während einer importiert
+        self.schliesse()
+        self._db = sqlite3.connect(self.pfad or ":memory:", timeout=30, check_same_thread=False)
+        if self.pfad:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def schliesse(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def schluessel(self, eingabe, engine):
+        daten = json.dumps([engine, self.engine_version(engine), normierte_eingabe(eingabe)])
+        return hashlib.sha256(daten.encode("utf-8")).hexdigest()
+
+    def importiere(self, text, format, engine, ermittle_direktmandate, pruefe_eingabe, max_parallel=4):
+        start = time.perf_counter()
+        bericht = {"zeilen": 0, "neu": 0, "geaendert": 0, "unveraendert": 0,
+                   "berechnet": 0, "wiederverwendet": 0, "fehler": []}
+        umfragen = {}
+        for nummer, roh in lies_umfragen(text, format):
+            bericht["zeilen"] += 1
+            try:
+                if isinstance(roh, Exception):
+                    raise roh
+                institut, datum, eingabe, zeilen_engine = _pruefe_umfrage(roh, engine)
+            except (ValueError, TypeError) as e:
+                bericht["fehler"].append({"zeile": nummer, "fehler": str(e)})
+                continue
+            fehler = pruefe_eingabe(eingabe, zeilen_engine)
+            if fehler:
+                bericht["fehler"].append({"zeile": nummer, "fehler": fehler})
+                continue
+            # Spätere Zeilen derselben Umfrage ersetzen frühere
+            umfragen[(institut, datum)] = (eingabe, zeilen_engine, self.schluessel(eingabe, zeilen_engine))
+
+        # Nur die Schlüssel dieses Imports nachsehen, nicht den ganzen Bestand
+        vorhanden = {}
+        berechnet = set()
+        with self._lock:
+            for block in _bloecke(umfragen):
+                vorhanden.update(((i, d), s) for i, d, s in self._db.execute(
+                    "SELECT institut, datum, schluessel FROM umfragen WHERE (institut, datum) IN "
+                    f"(VALUES {', '.join(['(?, ?)'] * len(block))})", [wert for paar in block for wert in paar]))
+            for block in _bloecke({s for _, _, s in umfragen.values()}):
+                berechnet.update(s for (s,) in self._db.execute(
+                    f"SELECT schluessel FROM projektionen WHERE schluessel IN ({', '.join('?' * len(block))})", block))
+
+        geaendert = []
+        fehlend = {}
+        for (institut, datum), (eingabe, zeilen_engine, schluessel) in umfragen.items():
+            alt = vorhanden.get((institut, datum))
+            if alt == schluessel:
+                bericht["unveraendert"] += 1
+                continue
+            bericht["neu" if alt is None else "geaendert"] += 1
+            geaendert.append((institut, datum, json.dumps(eingabe), zeilen_engine, schluessel, time.time()))
+            if schluessel not in berechnet:
+                fehlend.setdefault(schluessel, (eingabe, zeilen_engine))
+        bericht["berechnet"] = len(fehlend)
+        bericht["wiederverwendet"] = len(umfragen) - bericht["unveraendert"] - len(fehlend)
+
+        projektionen, rechenfehler = self._berechne(fehlend, ermittle_direktmandate, pruefe_eingabe, max_parallel)
+        if rechenfehler:
+            # Umfragen ohne Projektion nicht speichern, beim nächsten Import erneut versuchen
+            bericht["fehler"].extend({"umfrage": [z[0], z[1]], "fehler": rechenfehler[z[4]]}
+                                     for z in geaendert if z[4] in rechenfehler)
+            geaendert = [z for z in geaendert if z[4] not in rechenfehler]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO projektionen VALUES (?, ?, ?, ?, ?)", projektionen)
+            self._db.executemany("INSERT OR REPLACE INTO umfragen VALUES (?, ?, ?, ?, ?, ?)", geaendert)
+        bericht["dauer_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return bericht
+
+    def _berechne(self, fehlend, ermittle_direktmandate, pruefe_eingabe, max_parallel):
+        jetzt = time.time()
+        projektionen = []
+        fehler = {}
+        lokal = [s for s, (_, engine) in fehlend.items() if engine == "local"]
+        if lokal:
+            # Direktmandate und Sitzverteilung aller lokalen Zeilen zugleich
+            prognosen = np.array([normierte_eingabe(fehlend[s][0]) for s in lokal], dtype=float)
+            direkt = schaetze_direktmandate_matrix(prognosen)
+            sitze, _ = verteile_matrix(prognosen, direkt)
+            for s, d, zeile in zip(lokal, direkt.tolist(), sitze.tolist()):
+                projektionen.append((s, json.dumps(dict(zip(PARTEIEN, zeile))),
+                                     json.dumps(dict(zip(PARTEIEN, d))), sum(zeile), jetzt))
+        andere = [s for s, (_, engine) in fehlend.items() if engine != "local"]
+        if andere:
+            szenarien = [{"id": s, "eingabe": fehlend[s][0], "engine": fehlend[s][1]} for s in andere]
+            for ergebnis in werte_aus(szenarien, ermittle_direktmandate, pruefe_eingabe, "local", max_parallel):
+                if "fehler" in ergebnis:
+                    fehler[ergebnis["id"]] = ergebnis["fehler"]
+                    continue
+                projektionen.append((ergebnis["id"], json.dumps(ergebnis["sitze"]),
+                                     json.dumps(ergebnis["direktmandate"]), ergebnis["gesamtzahl"], jetzt))
+        return projektionen, fehler
+
+    def verlauf(self, institut=None, von=None, bis=None):
+        # Sitzprojektionen nach Datum, dazu je Partei eine Reihe für Diagramme
+        bedingungen, werte = [], []
+        for spalte, vergleich, wert in (("institut", "=", institut), ("datum", ">=", von), ("datum", "<=", bis)):
+            if wert:
+                bedingungen.append(f"u.{spalte} {vergleich} ?")
+                werte.append(wert)
+        sql = ("SELECT u.datum, u.institut, u.engine, u.eingabe, p.sitze, p.gesamtzahl "
+               "FROM umfragen u JOIN projektionen p ON p.schluessel = u.schluessel")
+        if bedingungen:
+            sql += " WHERE " + " AND ".join(bedingungen)
+        with self._lock:
+            zeilen = self._db.execute(sql + " ORDER BY u.datum, u.institut", werte).fetchall()
+        umfragen = [{
+            "datum": datum,
+            "institut": institut,
+            "engine": engine,
+            "eingabe": json.loads(eingabe),
+            "sitze": json.loads(sitze),
+            "gesamtzahl": gesamtzahl,
+            "mehrheit": gesamtzahl // 2 + 1,
+        } for datum, institut, engine, eingabe, sitze, gesamtzahl in zeilen]
+        return {
+            "anzahl": len(umfragen),
+            "umfragen": umfragen,
+            "reihen": {p: [u["sitze"].get(p, 0) for u in umfragen] for p in PARTEIEN if p != "Sonstige"},
+            "grundsitze": GRUNDSITZE,
+        }
+
+    def statistik(self):
+        with self._lock:
+            umfragen, = self._db.execute("SELECT COUNT(*) FROM umfragen").fetchone()
+            projektionen, = self._db.execute("SELECT COUNT(*) FROM projektionen").fetchone()
+        return {"umfragen": umfragen, "projektionen": projektionen}
+
+
+def main():
+    # Import ohne laufende App, nur mit der lokalen Engine
+    parser = argparse.ArgumentParser(description="Umfragereihe importieren (lokale Engine)")
+    parser.add_argument("datei")
+    parser.add_argument("--format", choices=("csv", "ndjson"))
+    parser.add_argument("--speicher", default="umfragen.sqlite3")
+    args = parser.parse_args()
+
+    from direktmandate import schaetze_direktmandate
+
+    format = args.format or ("ndjson" if args.datei.endswith((".ndjson", ".jsonl")) else "csv")
+    with open(args.datei, encoding="utf-8-sig") as datei:
+        text = datei.read()
+    speicher = Umfragespeicher(args.speicher, lambda engine: ENGINE_VERSION_LOKAL)
+
+    def pruefe(eingabe, engine):
+        if engine != "local":
+            return "Fehler: Ohne App nur mit der lokalen Engine."
+        if round(sum(eingabe.values()), 6) != 100:
+            return "Fehler: Die Summe der Werte muss genau 100 ergeben."
+        return None
+
+    bericht = speicher.importiere(text, format, "local", lambda e, _: (schaetze_direktmandate(e), ""), pruefe)
+    print(json.dumps(bericht, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import numpy as np
+
+# Wahlkreisdaten für die Schätzung der Direktmandate
+
+PARTEIEN = ["CDU", "B90/Grüne", "AfD", "SPD", "Linke", "FDP", "BSW", "Sonstige"]
+
+# Bundestagswahl 2025: Zweitstimmen in den Bundestagswahlkreisen in BW (Dezimalwerte)
+BTW25_TABELLE = """Wahlkreis,CDU,B90/Grüne,AfD,SPD,Linke,FDP,BSW,Sonstige
+Baden-Württemberg,0.32,0.14,0.2,0.14,0.07,0.06,0.04,0.04
+Stuttgart I,0.26,0.25,0.09,0.15,0.11,0.07,0.03,0.03
+Stuttgart II,0.27,0.17,0.14,0.16,0.11,0.06,0.05,0.04
+Böblingen,0.33,0.14,0.18,0.14,0.06,0.07,0.04,0.04
+Esslingen,0.33,0.15,0.16,0.16,0.07,0.06,0.04,0.04
+Nürtingen,0.34,0.14,0.18,0.14,0.06,0.07,0.04,0.04
+Göppingen,0.33,0.09,0.23,0.14,0.05,0.06,0.04,0.04
+Waiblingen,0.33,0.13,0.19,0.15,0.06,0.07,0.04,0.04
+Ludwigsburg,0.32,0.15,0.17,0.15,0.07,0.06,0.04,0.04
+Neckar-Zaber,0.33,0.12,0.2,0.14,0.05,0.06,0.04,0.05
+Heilbronn,0.29,0.09,0.25,0.14,0.06,0.06,0.04,0.05
+Schwäbisch Hall - Hohenlohe,0.32,0.1,0.25,0.13,0.05,0.06,0.04,0.05
+Backnang - Schwäisch Gmünd,0.33,0.11,0.23,0.14,0.06,0.05,0.04,0.04
+Aalen - Heidenheim,0.35,0.09,0.23,0.14,0.05,0.05,0.04,0.04
+Karlsruhe-Stadt,0.22,0.24,0.14,0.16,0.11,0.05,0.04,0.04
+Karlsruhe-Land,0.33,0.13,0.19,0.15,0.06,0.06,0.04,0.04
+Rastatt,0.33,0.11,0.23,0.14,0.05,0.05,0.04,0.04
+Heidelberg,0.26,0.22,0.12,0.17,0.1,0.06,0.03,0.04
+Mannheim,0.23,0.16,0.18,0.18,0.11,0.05,0.05,0.04
+Odenwald - Tauber,0.36,0.08,0.24,0.13,0.05,0.05,0.04,0.05
+Rhein-Neckar,0.31,0.12,0.21,0.16,0.06,0.06,0.04,0.04
+Bruchsal - Schwetzingen,0.32,0.11,0.22,0.14,0.06,0.05,0.04,0.05
+Pforzheim,0.3,0.11,0.25,0.13,0.05,0.06,0.04,0.04
+Calw,0.34,0.09,0.26,0.12,0.05,0.06,0.04,0.05
+Freiburg,0.22,0.27,0.1,0.15,0.14,0.04,0.04,0.04
+Lörrach - Müllheim,0.29,0.15,0.18,0.16,0.07,0.05,0.04,0.05
+Emmendingen- Lahr,0.32,0.13,0.19,0.16,0.06,0.05,0.04,0.05
+Offenburg,0.34,0.11,0.22,0.13,0.06,0.05,0.05,0.05
+Rottweil - Tuttlingen,0.34,0.08,0.27,0.11,0.05,0.06,0.05,0.05
+Schwarzwald-Baar,0.34,0.1,0.24,0.13,0.05,0.05,0.04,0.05
+Konstanz,0.3,0.17,0.18,0.13,0.07,0.06,0.04,0.04
+Waldshut,0.34,0.14,0.19,0.14,0.06,0.05,0.04,0.05
+Reutlingen,0.33,0.12,0.21,0.13,0.06,0.06,0.05,0.04
+Tübingen,0.29,0.19,0.16,0.14,0.1,0.05,0.04,0.04
+Ulm,0.34,0.14,0.19,0.13,0.06,0.05,0.04,0.04
+Biberach,0.38,0.1,0.23,0.1,0.05,0.05,0.04,0.05
+Bodensee,0.35,0.14,0.19,0.13,0.06,0.06,0.04,0.04
+Ravensburg,0.35,0.13,0.19,0.12,0.06,0.05,0.04,0.05
+Zollernalb - Sigmaringen,0.37,0.08,0.26,0.11,0.05,0.05,0.04,0.04"""
+
+# Landtagswahl 2021: Ergebnis nach den 70 Wahlkreisen (Prozent)
+LTW21_TABELLE = """Wahlkreis,"Wahljahr","Wahlbeteiligung". "GRÜNE","CDU","AfD","SPD","FDP","Linke","Sonstige"
+01 Stuttgart I,2021,69.4,44.8,17.9,3.3,9.4,10.1,7.5,7.0
+02 Stuttgart II,2021,69.9,39.8,21.7,4.9,10.0,12.9,4.4,6.3
+03 Stuttgart III,2021,59.9,33.9,24.3,8.0,12.2,10.6,4.8,6.2
+04 Stuttgart IV,2021,59.6,35.6,21.5,5.8,13.2,9.7,7.0,7.0
+05 Böblingen,2021,63.3,31.4,25.3,9.4,13.1,11.4,2.3,7.0
+06 Leonberg,2021,68.7,32.7,26.0,8.2,10.6,11.7,2.3,8.5
+07 Esslingen,2021,65.6,35.7,23.8,7.2,14.2,9.4,3.8,6.0
+08 Kirchheim,2021,67.3,33.1,24.4,9.5,12.6,10.3,2.8,7.2
+09 Nürtingen,2021,67.7,38.8,21.6,9.1,9.2,11.6,2.6,7.2
+10 Göppingen,2021,60.0,28.8,26.5,12.3,12.3,8.9,2.1,9.1
+11 Geislingen,2021,65.6,27.5,27.9,11.5,14.4,10.3,2.3,6.0
+12 Ludwigsburg,2021,64.2,34.6,22.2,8.7,12.1,11.2,4.2,7.1
+13 Vaihingen,2021,69.2,34.9,24.8,8.6,9.2,11.1,2.7,8.7
+14 Bietigheim-Bissingen,2021,66.6,34.2,24.5,9.2,10.6,10.9,2.8,7.8
+15 Waiblingen,2021,65.2,30.0,25.1,8.1,10.8,13.3,3.1,9.6
+16 Schorndorf,2021,67.7,29.7,24.2,9.9,10.4,16.3,2.6,6.8
+17 Backnang,2021,64.0,24.0,23.2,12.1,19.0,10.5,2.4,8.7
+18 Heilbronn,2021,60.3,30.0,23.0,12.0,11.6,12.3,3.6,7.6
+19 Eppingen,2021,65.4,26.3,24.5,13.7,11.1,13.4,2.6,8.3
+20 Neckarsulm,2021,64.5,27.4,25.0,13.9,12.7,9.9,3.0,8.1
+21 Hohenlohe,2021,62.9,28.7,24.4,14.1,11.9,10.9,2.8,7.2
+22 Schwäbisch Hall,2021,61.5,28.7,23.2,12.5,11.3,13.1,3.3,7.8
+23 Main-Tauber,2021,63.8,27.1,29.5,10.6,10.4,8.4,2.4,11.4
+24 Heidenheim,2021,60.1,25.8,22.4,11.4,20.2,7.6,2.6,10.0
+25 Schwäbisch Gmünd,2021,64.1,30.1,25.8,12.0,10.8,10.8,3.4,7.0
+26 Aalen,2021,63.9,25.0,29.8,9.5,10.0,9.1,2.7,13.9
+27 Karlsruhe I,2021,63.9,39.1,17.5,6.7,11.8,8.2,6.9,9.8
+28 Karlsruhe II,2021,58.9,38.6,18.4,7.5,12.0,7.3,6.7,9.4
+29 Bruchsal,2021,63.8,26.3,27.1,13.2,11.8,9.7,2.6,9.3
+30 Bretten,2021,65.9,32.0,23.0,11.2,10.8,11.4,2.8,8.7
+31 Ettlingen,2021,67.6,33.5,24.2,9.5,11.8,10.2,2.8,7.9
+32 Rastatt,2021,59.7,30.3,23.8,12.6,13.6,8.0,2.8,8.9
+33 Baden-Baden,2021,63.4,32.6,27.8,8.9,11.1,8.8,2.7,8.1
+34 Heidelberg,2021,67.3,41.7,15.3,5.2,12.7,7.0,8.4,9.8
+35 Mannheim I,2021,51.3,27.8,15.2,12.7,21.7,6.7,6.2,9.7
+36 Mannheim II,2021,61.8,35.9,16.7,7.9,15.9,9.3,5.5,8.7
+37 Wiesloch,2021,63.4,29.7,26.6,11.2,12.1,9.4,2.8,8.3
+38 Neckar-Odenwald,2021,62.1,23.7,31.6,12.3,12.2,7.9,2.4,9.9
+39 Weinheim,2021,67.5,35.6,22.6,7.9,13.4,8.6,3.6,8.4
+40 Schwetzingen,2021,62.0,31.3,23.6,10.4,14.8,8.2,3.1,8.5
+41 Sinsheim,2021,63.4,29.3,25.9,11.0,13.8,9.1,2.9,8.1
+42 Pforzheim,2021,54.0,26.2,20.1,15.8,10.1,16.1,3.3,8.3
+43 Calw,2021,63.7,27.1,28.8,13.5,7.8,10.0,2.7,10.1
+44 Enz,2021,66.3,30.9,19.5,12.9,9.5,17.0,2.3,7.9
+45 Freudenstadt,2021,62.2,24.7,27.3,13.2,8.4,14.8,2.2,9.4
+46 Freiburg I,2021,70.6,40.2,19.4,5.1,11.2,7.5,6.8,9.8
+47 Freiburg II,2021,64.5,40.3,13.3,5.8,12.7,5.9,11.2,10.9
+48 Breisgau,2021,66.2,37.7,23.9,7.0,10.3,9.0,3.7,8.3
+49 Emmendingen,2021,65.0,36.2,21.8,7.2,11.5,10.1,3.4,9.8
+50 Lahr,2021,61.0,33.1,24.5,10.0,10.4,10.2,2.6,9.2
+51 Offenburg,2021,61.8,36.8,25.4,8.3,8.6,8.9,2.9,9.0
+52 Kehl,2021,61.4,31.4,27.1,9.7,8.7,9.4,2.6,11.0
+53 Rottweil,2021,64.3,26.0,26.7,12.8,7.3,16.2,2.6,8.3
+54 Villingen-Schwenningen,2021,60.6,34.6,22.5,11.3,9.1,12.2,2.4,7.8
+55 Tuttlingen-Donaueschingen,2021,60.2,28.1,29.3,12.9,6.9,13.4,2.6,6.8
+56 Konstanz,2021,63.2,42.1,18.2,5.8,8.4,12.1,5.4,8.1
+57 Singen,2021,58.5,32.1,21.5,11.3,12.3,11.7,3.0,8.1
+58 Lörrach,2021,60.0,35.8,21.4,7.9,12.6,10.3,3.0,9.0
+59 Waldshut,2021,56.6,37.1,22.9,9.9,9.6,10.2,2.7,7.6
+60 Reutlingen,2021,63.6,36.2,22.0,9.5,10.2,11.3,3.7,7.1
+61 Hechingen-Münsingen,2021,64.5,31.6,25.0,12.2,8.9,12.6,2.6,7.1
+62 Tübingen,2021,70.5,39.0,20.5,6.5,11.6,7.6,6.7,8.1
+63 Balingen,2021,61.5,26.5,32.6,12.2,7.8,10.0,2.4,8.5
+64 Ulm,2021,63.4,36.5,22.9,7.4,13.2,7.8,4.3,7.9
+65 Ehingen,2021,66.5,29.5,35.9,10.1,7.0,8.2,2.1,7.2
+66 Biberach,2021,65.1,28.9,34.1,10.0,5.8,8.1,2.2,10.9
+67 Bodensee,2021,67.1,36.8,21.9,8.6,8.5,13.3,3.1,7.8
+68 Wangen,2021,63.8,31.3,30.6,9.5,6.5,8.9,2.7,10.6
+69 Ravensburg,2021,65.3,33.1,23.7,8.7,8.2,11.5,3.4,11.4
+70 Sigmaringen,2021,63.3,32.6,27.8,11.2,6.2,12.1,2.4,7.6"""
+
+# Spalten der Parteiergebnisse in LTW21_TABELLE (nach Wahljahr und Wahlbeteiligung)
+LTW21_SPALTEN = ["B90/Grüne", "CDU", "AfD", "SPD", "FDP", "Linke", "Sonstige"]
+
+# Amtliches Landesergebnis der Landtagswahl 2021 (Prozent, BSW trat nicht an)
+LTW21_LANDESERGEBNIS = {
+    "CDU": 24.1,
+    "B90/Grüne": 32.6,
+    "AfD": 9.7,
+    "SPD": 11.0,
+    "Linke": 3.6,
+    "FDP": 10.5,
+    "BSW": 0.0,
+    "Sonstige": 8.5,
+}
+
+
+# Zuordnung der 70 Landtags- zu den 38 Bundestagswahlkreisen: Anteil des
+# Landtagswahlkreises (Nummer), der im Bundestagswahlkreis liegt. Vereinfacht
+# nach Kreisen und Gemeinden; geteilte Wahlkreise mit geschätzten Anteilen.
+ZUORDNUNG_LTW_BTW = """LTW-Wahlkreis,BTW-Wahlkreis,Anteil
+1,Stuttgart I,1
+2,Stuttgart I,0.5
+2,Stuttgart II,0.5
+3,Stuttgart II,1
+4,Stuttgart I,0.5
+4,Stuttgart II,0.5
+5,Böblingen,1
+6,Böblingen,1
+7,Esslingen,1
+8,Nürtingen,1
+9,Nürtingen,0.7
+9,Esslingen,0.3
+10,Göppingen,1
+11,Göppingen,1
+12,Ludwigsburg,1
+13,Neckar-Zaber,1
+14,Ludwigsburg,0.5
+14,Neckar-Zaber,0.5
+15,Waiblingen,1
+16,Waiblingen,1
+17,Backnang - Schwäisch Gmünd,1
+18,Heilbronn,1
+19,Neckar-Zaber,0.5
+19,Heilbronn,0.5
+20,Heilbronn,1
+21,Schwäbisch Hall - Hohenlohe,1
+22,Schwäbisch Hall - Hohenlohe,1
+23,Odenwald - Tauber,1
+24,Aalen - Heidenheim,1
+25,Backnang - Schwäisch Gmünd,1
+26,Aalen - Heidenheim,1
+27,Karlsruhe-Stadt,1
+28,Karlsruhe-Stadt,1
+29,Bruchsal - Schwetzingen,1
+30,Karlsruhe-Land,1
+31,Karlsruhe-Land,1
+32,Rastatt,1
+33,Rastatt,1
+34,Heidelberg,1
+35,Mannheim,1
+36,Mannheim,1
+37,Heidelberg,0.5
+37,Rhein-Neckar,0.5
+38,Odenwald - Tauber,1
+39,Rhein-Neckar,1
+40,Bruchsal - Schwetzingen,1
+41,Rhein-Neckar,1
+42,Pforzheim,1
+43,Calw,1
+44,Pforzheim,1
+45,Calw,1
+46,Freiburg,1
+47,Freiburg,1
+48,Freiburg,0.5
+48,Lörrach - Müllheim,0.5
+49,Emmendingen- Lahr,1
+50,Emmendingen- Lahr,1
+51,Offenburg,1
+52,Offenburg,1
+53,Rottweil - Tuttlingen,1
+54,Schwarzwald-Baar,1
+55,Rottweil - Tuttlingen,0.6
+55,Schwarzwald-Baar,0.4
+56,Konstanz,1
+57,Konstanz,1
+58,Lörrach - Müllheim,1
+59,Waldshut,1
+60,Reutlingen,1
+61,Reutlingen,0.5
+61,Zollernalb - Sigmaringen,0.5
+62,Tübingen,1
+63,Zollernalb - Sigmaringen,1
+64,Ulm,1
+65,Ulm,0.5
+65,Biberach,0.5
+66,Biberach,1
+67,Bodensee,1
+68,Ravensburg,1
+69,Ravensburg,1
+70,Zollernalb - Sigmaringen,1"""
+
+def lies_ltw21(tabelle=LTW21_TABELLE):
+    # Liefert die Wahlkreisnamen und eine (70 x 8)-Matrix in der Reihenfolge
+    # von PARTEIEN. Parteien ohne Spalte (BSW) erhalten 0.
+    namen = []
+    werte = []
+    for zeile in tabelle.splitlines()[1:]:
+        felder = zeile.split(",")
+        namen.append(felder[0])
+        ergebnis = dict(zip(LTW21_SPALTEN, map(float, felder[3:])))
+        werte.append([ergebnis.get(p, 0.0) for p in PARTEIEN])
+    return namen, np.array(werte)
+
+
+def lies_btw25(tabelle=BTW25_TABELLE):
+    # Liefert die Wahlkreisnamen, eine (Wahlkreise x 8)-Matrix in Prozent und
+    # das Landesergebnis (erste Datenzeile) in der Reihenfolge von PARTEIEN
+    namen = []
+    werte = []
+    for zeile in tabelle.splitlines()[1:]:
+        felder = zeile.split(",")
+        namen.append(felder[0])
+        werte.append([round(float(x) * 100, 1) for x in felder[1:]])
+    return namen[1:], np.array(werte[1:]), np.array(werte[0])
+
+
+def lies_zuordnung(tabelle=ZUORDNUNG_LTW_BTW):
+    # Dünn besetzte Zuordnung als Koordinatenlisten: (BTW-Index, LTW-Index,
+    # Anteil) in der Reihenfolge von lies_btw25 bzw. lies_ltw21
+    btw_namen = lies_btw25()[0]
+    btw, ltw, anteil = [], [], []
+    for zeile in tabelle.splitlines()[1:]:
+        nummer, name, wert = zeile.split(",")
+        btw.append(btw_namen.index(name))
+        ltw.append(int(nummer) - 1)
+        anteil.append(float(wert))
+    return np.array(btw), np.array(ltw), np.array(anteil)
@@ -0,0 +1,313 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+
+# Zulassungskontrolle vor den LLM-Aufrufen: Token-Buckets für das Budget des
+# Anbieters (Anfragen und Tokens je Minute), eine begrenzte Warteschlange und
+# faire Reihenfolge zwischen Clients (Round Robin über die Clients, nicht über
+# die einzelnen Anfragen). Wer nicht innerhalb der maximalen Wartezeit an die
+# Reihe kommt oder keinen Platz mehr in der Warteschlange findet, wird sofort
+# mit einer Wartezeit für Retry-After abgewiesen, statt einen Worker zu
+# blockieren. Es gibt keinen eigenen Verteiler-Thread: Wartende wecken sich
+# selbst auf, sobald das Budget wieder reichen kann. Warteschlange und
+# Fairness gelten je Prozess; mit GeteilteBudgets teilen sich alle Worker eines
+# Hosts die Token-Buckets über eine SQLite-Datei. Ist diese Datei länger
+# gesperrt als ihr Timeout, wird ebenfalls mit Retry-After abgewiesen. Budget
+# für einen Aufruf, der dann doch nicht stattfindet (Ergebnis aus dem Cache
+# oder einem gleichzeitigen Aufruf), wird mit erstatte() zurückgegeben.
+
+
+class ZulassungAbgelehnt(Exception):
+
+    def __init__(self, nachricht, retry_after, grund):
+        super().__init__(nachricht)
+        self.retry_after = retry_after
+        self.grund = grund
+
+
+class Tokenbucket:
+
+    def __init__(self, rate, kapazitaet, uhr=time.monotonic):
+        # rate: Einheiten je Sekunde, kapazitaet: größter Vorrat (Burst)
+        self.rate = rate
+        self.kapazitaet = kapazitaet
+        self._uhr = uhr
+        self.vorrat = kapazitaet
+        self._stand = uhr()
+
+    def _fuelle(self):
+        jetzt = self._uhr()
+        self.vorrat = min(self.kapazitaet, self.vorrat + (jetzt - self._stand) * self.rate)
+        self._stand = jetzt
+
+    def wartezeit(self, kosten):
+        # Sekunden, bis `kosten` verfügbar sind (0: sofort)
+        self._fuelle()
+        kosten = min(kosten, self.kapazitaet)
+        return max(0.0, (kosten - self.vorrat) / self.rate)
+
+    def nimm(self, kosten):
+        self.vorrat -= min(kosten, self.kapazitaet)
+
+    def gib(self, kosten):
+        # Nicht genutztes Budget zurück, höchstens bis zur Kapazität
+        self._fuelle()
+        self.vorrat = min(self.kapazitaet, self.vorrat + min(kosten, self.kapazitaet))
+
+
+class GeteilteBudgets:
+    # Token-Buckets in einer SQLite-Datei für mehrere Prozesse. Prüfen und
+    # Abbuchen laufen in einer Transaktion (BEGIN IMMEDIATE), damit zwei Worker
+    # nicht dasselbe Budget verbrauchen. Nach einem fork muss jeder Prozess mit
+    # verbinde() eine eigene Verbindung öffnen.
+
+    def __init__(self, pfad):
+        self.pfad = pfad
+        self._lock = threading.RLock()
+        self._db = None
+        self.verbinde()
+
+    def verbinde(self):
+        self.schliesse()
+        self._db = sqlite3.connect(self.pfad, timeout=5, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, vorrat REAL, stand REAL)")
+
+    def schliesse(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @contextmanager
+    def transaktion(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except sqlite3.OperationalError:
+                # Schreiben gescheitert (z. B. gesperrt): nichts halb abbuchen
+                self._db.execute("ROLLBACK")
+                raise
+            finally:
+                # Auch bei einer Ablehnung: bereits abgebuchte Budgets anderer Wartender gelten
+                if self._db.in_transaction:
+                    self._db.execute("COMMIT")
+
+    def bucket(self, name, rate, kapazitaet):
+        return GeteilterTokenbucket(self, name, rate, kapazitaet)
+
+    def _lies(self, name):
+        return self._db.execute("SELECT vorrat, stand FROM buckets WHERE name = ?", (name,)).fetchone()
+
+    def _schreibe(self, name, vorrat, stand):
+        self._db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, vorrat, stand))
+
+
+class GeteilterTokenbucket(Tokenbucket):
+    # Wie Tokenbucket, der Vorrat liegt aber in GeteilteBudgets; Wanduhr statt
+    # monotonic, weil der Stand Neustarts überdauert
+
+    def __init__(self, budgets, name, rate, kapazitaet):
+        self._budgets = budgets
+        self.name = name
+        super().__init__(rate, kapazitaet, uhr=time.time)
+
+    def _fuelle(self):
+        with self._budgets._lock:
+            zeile = self._budgets._lies(self.name)
+        if zeile is not None:
+            self.vorrat, self._stand = zeile
+        super()._fuelle()
+
+    def nimm(self, kosten):
+        super().nimm(kosten)
+        with self._budgets._lock:
+            self._budgets._schreibe(self.name, self.vorrat, self._stand)
+
+    def gib(self, kosten):
+        super().gib(kosten)
+        with self._budgets._lock:
+            self._budgets._schreibe(self.name, self.vorrat, self._stand)
+
+
+class _Platz:
+
+    def __init__(self, client):
+        self.client = client
+        self.zugelassen = threading.Event()
+        self.eingereiht = time.perf_counter()
+
+
+class Zulassung:
+
+    def __init__(self, budgets, max_warteschlange=32, max_je_client=4, max_wartezeit=5.0, uhr=time.monotonic,
+                 transaktion=nullcontext):
+        # budgets: Liste von (Tokenbucket, kosten) mit kosten als Zahl oder
+        # Funktion ohne Argumente (z. B. mittlere Tokens je Anfrage);
+        # transaktion: umschließt Prüfen und Abbuchen (GeteilteBudgets.transaktion)
+        self.budgets = budgets
+        self._transaktion = transaktion
+        self.max_warteschlange = max_warteschlange
+        self.max_je_client = max_je_client
+        self.max_wartezeit = max_wartezeit
+        self._uhr = uhr
+        self._lock = threading.Lock()
+        # Client -> wartende Plätze; die Reihenfolge der Schlüssel ist der Round Robin
+        self._clients = OrderedDict()
+        self.wartend = 0
+        self.zugelassen = {"sofort": 0, "gewartet": 0}
+        self.abgewiesen = {"warteschlange": 0, "client": 0, "frist": 0, "gesperrt": 0}
+        self.erstattet = 0
+        self.wartezeit_summe = 0.0
+
+    @contextmanager
+    def _budgets(self):
+        # Unter dem Lock: Prüfen und Abbuchen in einer Transaktion. Bleibt die
+        # geteilte Datei gesperrt, wird abgewiesen wie bei fehlendem Budget
+        try:
+            with self._transaktion():
+                yield
+        except sqlite3.OperationalError as e:
+            self.abgewiesen["gesperrt"] += 1
+            raise ZulassungAbgelehnt("Budget für gpt-4o gerade gesperrt", 1, "gesperrt") from e
+
+    def _kosten(self):
+        return [(bucket, kosten() if callable(kosten) else kosten) for bucket, kosten in self.budgets]
+
+    def _wartezeit(self, kosten):
+        return max((bucket.wartezeit(k) for bucket, k in kosten), default=0.0)
+
+    def _nimm(self, kosten):
+        for bucket, k in kosten:
+            bucket.nimm(k)
+
+    def _retry_after(self, kosten):
+        # Grobe Schätzung: alle Wartenden vor dieser Anfrage plus sie selbst
+        je_anfrage = max((k / bucket.rate for bucket, k in kosten), default=0.0)
+        return max(1, math.ceil(self._wartezeit(kosten) + (self.wartend + 1) * je_anfrage))
+
+    def betrete(self, client, beobachte_wartezeit=None):
+        # Kehrt zurück, sobald die Anfrage das Budget nutzen darf, sonst ZulassungAbgelehnt
+        kosten = self._kosten()
+        with self._lock, self._budgets():
+            if not self._clients and self._wartezeit(kosten) == 0:
+                self._nimm(kosten)
+                self.zugelassen["sofort"] += 1
+                return 0.0
+            if self.wartend >= self.max_warteschlange:
+                self.abgewiesen["warteschlange"] += 1
+                raise ZulassungAbgelehnt("Warteschlange für gpt-4o voll", self._retry_after(kosten), "warteschlange")
+            if len(self._clients.get(client, ())) >= self.max_je_client:
+                self.abgewiesen["client"] += 1
+                raise ZulassungAbgelehnt("Zu viele wartende Anfragen von diesem Client",
+                                         self._retry_after(kosten), "client")
+            platz = _Platz(client)
+            self._clients.setdefault(client, deque()).append(platz)
+            self.wartend += 1
+
+        frist = self._uhr() + self.max_wartezeit
+        while True:
+            try:
+                with self._lock, self._budgets():
+                    self._verteile()
+                    if platz.zugelassen.is_set():
+                        break
+                    rest = frist - self._uhr()
+                    if rest <= 0:
+                        self._entferne(platz)
+                        self.abgewiesen["frist"] += 1
+                        raise ZulassungAbgelehnt(f"Keine Freigabe für gpt-4o innerhalb von {self.max_wartezeit:g} s",
+                                                 self._retry_after(self._kosten()), "frist")
+                    schlaf = min(rest, max(self._wartezeit(self._kosten()), 0.001))
+            except ZulassungAbgelehnt as e:
+                # Gesperrt: den Platz freigeben, außer er wurde schon zugelassen
+                if e.grund != "gesperrt":
+                    raise
+                with self._lock:
+                    if platz.zugelassen.is_set():
+                        break
+                    self._entferne(platz)
+                raise
+            if platz.zugelassen.wait(schlaf):
+                break
+        gewartet = time.perf_counter() - platz.eingereiht
+        with self._lock:
+            self.zugelassen["gewartet"] += 1
+            self.wartezeit_summe += gewartet
+        if beobachte_wartezeit:
+            beobachte_wartezeit(gewartet)
+        return gewartet
+
+    def _verteile(self):
+        # Unter dem Lock: solange das Budget reicht, den nächsten Client im
+        # Round Robin bedienen und ihn ans Ende stellen
+        while self._clients:
+            kosten = self._kosten()
+            if self._wartezeit(kosten) > 0:
+                return
+            client, plaetze = next(iter(self._clients.items()))
+            platz = plaetze.popleft()
+            if plaetze:
+                self._clients.move_to_end(client)
+            else:
+                del self._clients[client]
+            self.wartend -= 1
+            self._nimm(kosten)
+            platz.zugelassen.set()
+
+    def _entferne(self, platz):
+        plaetze = self._clients.get(platz.client)
+        if plaetze and platz in plaetze:
+            plaetze.remove(platz)
+            self.wartend -= 1
+            if not plaetze:
+                del self._clients[platz.client]
+
+    def nimm_sofort(self):
+        # Für Zusatzaufrufe (Hedging): nur wenn niemand wartet und das Budget reicht
+        kosten = self._kosten()
+        try:
+            with self._lock, self._transaktion():
+                if self._clients or self._wartezeit(kosten) > 0:
+                    return False
+                self._nimm(kosten)
+                return True
+        except sqlite3.OperationalError:
+            return False
+
+    def erstatte(self):
+        # Nach betrete(), wenn der Aufruf doch nicht stattfindet: die Kosten
+        # (aktuelle Schätzung wie beim Abbuchen) zurück und Wartende bedienen
+        kosten = self._kosten()
+        try:
+            with self._lock, self._transaktion():
+                for bucket, k in kosten:
+                    bucket.gib(k)
+                self._verteile()
+        except sqlite3.OperationalError:
+            return
+        with self._lock:
+            self.erstattet += 1
+
+    def statistik(self):
+        with self._lock:
+            for bucket, _ in self.budgets:
+                bucket.wartezeit(0)
+            gewartet = self.zugelassen["gewartet"]
+            return {
+                "wartend": self.wartend,
+                "clients_wartend": len(self._clients),
+                "max_warteschlange": self.max_warteschlange,
+                "max_je_client": self.max_je_client,
+                "max_wartezeit": self.max_wartezeit,
+                "zugelassen": dict(self.zugelassen),
+                "abgewiesen": dict(self.abgewiesen),
+                "erstattet": self.erstattet,
+                "wartezeit_mittel_ms": round(self.wartezeit_summe / gewartet * 1000, 1) if gewartet else None,
+                "budgets": [{"rate_je_minute": round(bucket.rate * 60, 2), "vorrat": round(bucket.vorrat, 2),
+                             "kapazitaet": bucket.kapazitaet} for bucket, _ in self.budgets],
+            }